@@ -0,0 +1,285 @@
+"""
+Care home and staff administration on the app's Postgres database.
+
+Subcommands:
+    python admin.py onboard "Oak House" --manager jsmith
+    python admin.py add-staff --care-home-id 3 apatel [--role manager]
+    python admin.py provision staff.csv [--workers 8] [--dry-run]
+    python admin.py api-key --care-home-id 3 "e-MAR sync" [--role manager]
+    python admin.py revoke-api-key 7
+
+`onboard` and `add-staff` prompt for the password. `provision` loads a
+whole group from a manifest, either a CSV with the columns
+care_home, username, password, role, or a YAML file:
+
+    care_homes:
+      - name: Oak House
+        users:
+          - {username: jsmith, password: "...", role: manager}
+          - {username: apatel, password: "...", role: staff}
+
+Care homes are matched by name and users by username, so a manifest can be
+re-run: anything already provisioned is left as it is. Passwords of new
+users are hashed in parallel across a process pool and everything is
+inserted in a single transaction.
+
+`api-key` creates a key for an integration using api.py and prints it
+once; only its hash is stored.
+
+DATABASE_URL and BCRYPT_ROUNDS are read from Streamlit secrets or the environment.
+"""
+import argparse
+import csv
+import getpass
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+from psycopg2.extras import execute_values
+
+from auth import ROLES, bcrypt_rounds, create_api_key, hash_password, revoke_api_key
+from database import get_connection, init_db
+
+
+class StaffEntry(NamedTuple):
+    care_home: str
+    username: str
+    password: str
+    role: str
+
+
+@dataclass
+class ProvisionReport:
+    homes_created: int = 0
+    homes_existing: int = 0
+    users_created: int = 0
+    users_existing: int = 0
+    seconds: float = 0.0
+    care_home_ids: dict = field(default_factory=dict)  # name -> id
+    warnings: list = field(default_factory=list)
+
+    def summary(self) -> str:
+        return (
+            f"{self.homes_created} care homes created ({self.homes_existing} already existed), "
+            f"{self.users_created} users created ({self.users_existing} already existed) "
+            f"in {self.seconds:.2f}s"
+        )
+
+
+# ---------------------------
+# Reading manifests
+# ---------------------------
+def read_manifest(path: str) -> list[StaffEntry]:
+    """Reads staff entries from a .csv or .yaml / .yml manifest."""
+    if path.lower().endswith((".yaml", ".yml")):
+        import yaml  # only needed for YAML manifests
+
+        with open(path, encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+        return [
+            StaffEntry(str(home["name"]), str(u["username"]), str(u["password"]), str(u.get("role", "staff")))
+            for home in data.get("care_homes", [])
+            for u in home.get("users") or []
+        ]
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return [
+            StaffEntry(row["care_home"], row["username"], row["password"], row.get("role") or "staff")
+            for row in csv.DictReader(f)
+        ]
+
+
+def validate_entries(entries: list[StaffEntry]) -> list[str]:
+    """Returns one message per problem; an empty list means the manifest can be loaded."""
+    errors = []
+    seen = {}
+    for n, entry in enumerate(entries, start=1):
+        if not entry.care_home.strip() or not entry.username.strip() or not entry.password:
+            errors.append(f"entry {n}: care home, username and password are required.")
+        if entry.role not in ROLES:
+            errors.append(f"entry {n} ({entry.username}): role must be one of {', '.join(ROLES)}.")
+        # Stripped, as provision() stores and looks usernames up.
+        username = entry.username.strip()
+        if username in seen:
+            errors.append(f"entry {n}: username '{username}' is already used by entry {seen[username]}.")
+        seen.setdefault(username, n)
+    return errors
+
+
+# ---------------------------
+# Provisioning
+# ---------------------------
+def _hash_all(passwords: list[str], rounds: int, workers: int | None) -> list[str]:
+    if len(passwords) <= 1:
+        return [hash_password(p, rounds) for p in passwords]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hash_password, passwords, [rounds] * len(passwords), chunksize=8))
+
+
+def provision(entries: list[StaffEntry], workers: int | None = None, dry_run: bool = False) -> ProvisionReport:
+    """
+    Creates any missing care homes and users from `entries` in one
+    transaction. Existing homes and usernames are left untouched.
+    """
+    report = ProvisionReport()
+    started = time.perf_counter()
+    home_names = sorted({e.care_home.strip() for e in entries})
+
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT name, id FROM care_homes WHERE name = ANY(%s)", (home_names,))
+        report.care_home_ids = dict(cur.fetchall())
+        cur.execute(
+            "SELECT username, care_home_id FROM users WHERE username = ANY(%s)",
+            ([e.username.strip() for e in entries],),
+        )
+        existing_users = dict(cur.fetchall())
+
+    new_homes = [name for name in home_names if name not in report.care_home_ids]
+    new_users = [e for e in entries if e.username.strip() not in existing_users]
+    report.homes_existing = len(home_names) - len(new_homes)
+    report.users_existing = len(entries) - len(new_users)
+    for e in entries:
+        home_id = existing_users.get(e.username.strip())
+        if home_id is not None and home_id != report.care_home_ids.get(e.care_home.strip()):
+            report.warnings.append(f"{e.username} already exists in care home {home_id}; not moved.")
+
+    if dry_run:
+        report.homes_created, report.users_created = len(new_homes), len(new_users)
+        report.seconds = time.perf_counter() - started
+        return report
+
+    # Hash before opening the write transaction so it stays short.
+    hashes = _hash_all([e.password for e in new_users], bcrypt_rounds(), workers)
+
+    with get_connection() as conn, conn.cursor() as cur:
+        if new_homes:
+            # Homes created meanwhile by another run are skipped, and counted as existing.
+            created = execute_values(
+                cur,
+                "INSERT INTO care_homes (name) VALUES %s ON CONFLICT (name) DO NOTHING RETURNING id",
+                [(name,) for name in new_homes],
+                fetch=True,
+                page_size=1000,
+            )
+            report.homes_created = len(created)
+            report.homes_existing += len(new_homes) - len(created)
+            cur.execute("SELECT name, id FROM care_homes WHERE name = ANY(%s)", (new_homes,))
+            report.care_home_ids.update(cur.fetchall())
+        if new_users:
+            created = execute_values(
+                cur,
+                """
+                INSERT INTO users (care_home_id, username, password_hash, role)
+                VALUES %s
+                ON CONFLICT (username) DO NOTHING
+                RETURNING username
+                """,
+                [
+                    (report.care_home_ids[e.care_home.strip()], e.username.strip(), password_hash, e.role)
+                    for e, password_hash in zip(new_users, hashes)
+                ],
+                fetch=True,
+                page_size=1000,
+            )
+            report.users_created = len(created)
+            report.users_existing += len(new_users) - len(created)
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+# ---------------------------
+# Command line
+# ---------------------------
+def _prompt_password() -> str:
+    password = getpass.getpass("Password: ")
+    if not password or password != getpass.getpass("Repeat password: "):
+        raise SystemExit("Passwords are empty or do not match.")
+    return password
+
+
+def _care_home_name(care_home_id: int) -> str:
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT name FROM care_homes WHERE id = %s", (care_home_id,))
+        row = cur.fetchone()
+    if row is None:
+        raise SystemExit(f"Care home {care_home_id} does not exist.")
+    return row[0]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Provision care homes and staff accounts.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    onboard = sub.add_parser("onboard", help="create a care home and its first manager")
+    onboard.add_argument("name", help="care home name")
+    onboard.add_argument("--manager", required=True, help="manager username")
+
+    add_staff = sub.add_parser("add-staff", help="add one user to an existing care home")
+    add_staff.add_argument("username")
+    add_staff.add_argument("--care-home-id", type=int, required=True)
+    add_staff.add_argument("--role", choices=ROLES, default="staff")
+
+    bulk = sub.add_parser("provision", help="create care homes and users from a CSV or YAML manifest")
+    bulk.add_argument("path", help="manifest file (.csv, .yaml or .yml)")
+    bulk.add_argument("--workers", type=int, default=None, help="hashing processes (default: one per CPU)")
+    bulk.add_argument("--dry-run", action="store_true", help="validate and report only; create nothing")
+
+    api_key = sub.add_parser("api-key", help="create an API key for an integration (api.py)")
+    api_key.add_argument("name", help="what the key is for, e.g. the system using it")
+    api_key.add_argument("--care-home-id", type=int, required=True)
+    api_key.add_argument("--role", choices=ROLES, default="staff")
+
+    revoke = sub.add_parser("revoke-api-key", help="revoke an API key by its ID")
+    revoke.add_argument("key_id", type=int)
+
+    args = parser.parse_args(argv)
+    init_db()
+
+    if args.command == "api-key":
+        print("=== Create API Key ===")
+        home_name = _care_home_name(args.care_home_id)
+        key_id, key = create_api_key(args.care_home_id, args.name, args.role)
+        print(f"✅ API key {key_id} ({args.role}) for {home_name}: {args.name}")
+        print(f"\n{key}\n\nStore it now; it cannot be shown again.")
+        return 0
+    if args.command == "revoke-api-key":
+        print("=== Revoke API Key ===")
+        if not revoke_api_key(args.key_id):
+            print(f"❌ API key {args.key_id} does not exist or is already revoked.")
+            return 1
+        print(f"✅ API key {args.key_id} revoked; API processes stop accepting it within a minute.")
+        return 0
+
+    if args.command == "onboard":
+        print("=== Care Home Onboarding ===")
+        entries = [StaffEntry(args.name, args.manager, _prompt_password(), "manager")]
+    elif args.command == "add-staff":
+        print("=== Add Staff User ===")
+        entries = [StaffEntry(_care_home_name(args.care_home_id), args.username, _prompt_password(), args.role)]
+    else:
+        if not os.path.exists(args.path):
+            raise SystemExit(f"File not found: {args.path}")
+        print("=== Provision Care Homes and Staff ===")
+        entries = read_manifest(args.path)
+
+    errors = validate_entries(entries)
+    if errors:
+        for message in errors:
+            print(f"❌ {message}")
+        return 1
+
+    report = provision(entries, workers=getattr(args, "workers", None), dry_run=getattr(args, "dry_run", False))
+    for message in report.warnings:
+        print(f"⚠️ {message}")
+    print(("\n(dry run) " if getattr(args, "dry_run", False) else "\n✅ ") + report.summary())
+    for name in sorted({e.care_home.strip() for e in entries}):
+        if name in report.care_home_ids:
+            print(f"Care home ID {report.care_home_ids[name]}: {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
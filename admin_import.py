@@ -0,0 +1,265 @@
+"""
+Bulk import of historical incidents when onboarding a care home.
+
+Reads CSV or JSONL files whose columns / keys use the same labels as the
+report form ("Incident ID", "Incident date", "Resident identifier", ...),
+validates every row with the form's rules and loads valid rows in batches
+with multi-row INSERTs. Rows whose incident ID already exists are skipped,
+so an interrupted import can simply be run again; rows without an ID get
+one derived from their content, so they too are the same on every run.
+
+Usage:
+    python admin_import.py incidents.csv --care-home-id 3 [--batch-size 1000] [--dry-run]
+
+DATABASE_URL is read from Streamlit secrets or the environment.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from database import get_connection, init_db
+from incidents import (
+    ID_SUFFIX_ALPHABET,
+    ID_SUFFIX_LENGTH,
+    INCIDENT_TEXT_LABELS,
+    Incident,
+    insert_incidents,
+    validate_incident,
+)
+from query_cache import get_query_cache
+
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y")
+TIME_FORMATS = ("%H:%M:%S", "%H:%M")
+TIMESTAMP_FORMATS = (
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+)
+
+# Fields that identify an incident when a row has no Incident ID (see derived_incident_id).
+IDENTIFYING_LABELS = (
+    "Incident date",
+    "Incident time",
+    "Resident identifier",
+    "Category",
+    "Location",
+    "Incident account",
+    "Reported by (name)",
+)
+
+
+@dataclass
+class ImportReport:
+    rows_read: int = 0
+    inserted: int = 0
+    already_stored: int = 0
+    duplicates_in_file: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+    errors: list = field(default_factory=list)  # (line number, incident ID, message)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.rows_read} rows read in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s): "
+            f"{self.inserted} inserted, {self.already_stored} already stored, "
+            f"{self.duplicates_in_file} duplicated in file, {self.invalid} invalid"
+        )
+
+
+# ---------------------------
+# Reading and normalising rows
+# ---------------------------
+def read_rows(path: str):
+    """
+    Yields (line number, row dict, error) from a .csv or .jsonl file. A
+    JSONL line that is not a JSON object yields an empty row and the
+    error, so it is reported with the other invalid rows.
+    """
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield line_no, {}, f"Not valid JSON: {exc.msg} at character {exc.pos + 1}."
+                    continue
+                if isinstance(row, dict):
+                    yield line_no, row, None
+                else:
+                    yield line_no, {}, "Each line must be a JSON object keyed by the report form's labels."
+    else:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row, None
+
+
+def _parse(value, formats, kind):
+    for fmt in formats:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"{kind} '{value}' is not in a recognised format.")
+
+
+def _text(row: dict, label: str) -> str:
+    value = row.get(label)
+    return "" if value is None else str(value).strip()
+
+
+def derived_incident_id(record: dict, submitted: datetime | None) -> str:
+    """
+    An ID for a row that has none, shaped like generate_incident_id()'s but
+    with the suffix taken from a hash of the row's identifying fields, so
+    re-running an import gives the row the same ID and it is not stored twice.
+    """
+    identity = json.dumps([str(record.get(label) or "") for label in IDENTIFYING_LABELS])
+    digest = int.from_bytes(hashlib.sha256(identity.encode("utf-8")).digest()[:8], "big")
+    suffix = ""
+    for _ in range(ID_SUFFIX_LENGTH):
+        digest, n = divmod(digest, len(ID_SUFFIX_ALPHABET))
+        suffix += ID_SUFFIX_ALPHABET[n]
+    return (submitted or datetime.min).strftime("CSI-%Y%m%d-%H%M%S-") + suffix
+
+
+def normalise_row(row: dict) -> tuple[dict, list[str]]:
+    """
+    Converts an imported row into a complete incident record, filling the
+    defaults the report form would have set. Returns (record, parse errors).
+    """
+    errors = []
+    record = {label: _text(row, label) for label in INCIDENT_TEXT_LABELS}
+
+    def parse_into(label, formats, kind, convert):
+        raw = _text(row, label)
+        if not raw:
+            return None
+        try:
+            return convert(_parse(raw, formats, kind))
+        except ValueError as exc:
+            errors.append(f"{label}: {exc}")
+            return None
+
+    incident_date = parse_into("Incident date", DATE_FORMATS, "Date", datetime.date)
+    incident_time = parse_into("Incident time", TIME_FORMATS, "Time", datetime.time)
+    submitted = parse_into("Submitted timestamp", TIMESTAMP_FORMATS, "Timestamp", lambda d: d)
+    if incident_date is None and not errors:
+        errors.append("Incident date is required.")
+    if submitted is None and incident_date is not None:
+        submitted = datetime.combine(incident_date, incident_time or datetime.min.time())
+
+    record["Incident date"] = incident_date
+    record["Incident time"] = incident_time
+    record["Date of birth"] = parse_into("Date of birth", DATE_FORMATS, "Date", datetime.date)
+    record["Submitted timestamp"] = submitted
+    record["Sign-off timestamp"] = parse_into("Sign-off timestamp", TIMESTAMP_FORMATS, "Timestamp", lambda d: d)
+
+    record["Incident ID"] = _text(row, "Incident ID") or derived_incident_id(record, submitted)
+    record["Harm / injury sustained"] = _text(row, "Harm / injury sustained").capitalize()
+    if record["Harm / injury sustained"] == "No" and not record["Harm / injury details"]:
+        record["Harm / injury details"] = "No harm or injury sustained"
+    confirmed = _text(row, "Audit integrity confirmation").lower() in ("confirmed", "yes", "true")
+    record["Audit integrity confirmation"] = "Confirmed" if confirmed else ""
+    record["Management review status"] = _text(row, "Management review status") or "Pending"
+    if record["Management review status"] not in ("Pending", "Completed"):
+        errors.append("Management review status must be Pending or Completed.")
+
+    return record, errors
+
+
+# ---------------------------
+# Loading
+# ---------------------------
+def _load_batch(care_home_id: int, batch: list[Incident], report: ImportReport) -> None:
+    with get_connection() as conn, conn.cursor() as cur:
+        inserted = insert_incidents(cur, care_home_id, batch, skip_existing=True)
+    report.inserted += len(inserted)
+    report.already_stored += len(batch) - len(inserted)
+
+
+def import_incidents(care_home_id: int, path: str, batch_size: int = 1000, dry_run: bool = False) -> ImportReport:
+    """
+    Validates and loads every row of `path` into one care home. Invalid rows are skipped and
+    listed in the report; each batch commits on its own.
+    """
+    report = ImportReport()
+    seen_ids = set()
+    batch = []
+    started = time.perf_counter()
+
+    for line_no, row, read_error in read_rows(path):
+        report.rows_read += 1
+        if read_error:
+            report.invalid += 1
+            report.errors.append((line_no, "", read_error))
+            continue
+        record, errors = normalise_row(row)
+        errors += validate_incident(record)
+        if errors:
+            report.invalid += 1
+            report.errors.extend((line_no, record["Incident ID"], e) for e in errors)
+            continue
+        if record["Incident ID"] in seen_ids:
+            report.duplicates_in_file += 1
+            continue
+        seen_ids.add(record["Incident ID"])
+
+        try:
+            incident = Incident.from_record(record)
+        except ValueError as exc:
+            report.invalid += 1
+            report.errors.append((line_no, record["Incident ID"], str(exc)))
+            continue
+        batch.append(incident)
+        if len(batch) >= batch_size:
+            if not dry_run:
+                _load_batch(care_home_id, batch, report)
+            batch = []
+
+    if batch and not dry_run:
+        _load_batch(care_home_id, batch, report)
+
+    report.seconds = time.perf_counter() - started
+    if report.inserted:
+        get_query_cache().invalidate(care_home_id)
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import historical incidents from CSV or JSONL.")
+    parser.add_argument("path", help="CSV or JSONL file keyed by the report form's column labels")
+    parser.add_argument("--care-home-id", type=int, required=True, help="care home the incidents belong to")
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per INSERT / commit (default 1000)")
+    parser.add_argument("--dry-run", action="store_true", help="validate only; load nothing")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.path):
+        raise SystemExit(f"File not found: {args.path}")
+
+    init_db()
+    print("=== Import Incidents ===")
+    report = import_incidents(args.care_home_id, args.path, batch_size=args.batch_size, dry_run=args.dry_run)
+
+    for line_no, incident_id, message in report.errors:
+        print(f"❌ line {line_no} ({incident_id}): {message}")
+    print(("\n(dry run) " if args.dry_run else "\n") + report.summary())
+    return 1 if report.invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# analytics.py
+"""
+Trend queries for the analytics page.
+
+Everything here reads one care home's rows of incident_daily_rollup
+(migrations/0005), which the database keeps current as incidents are
+inserted and reviewed. Query cost depends on the date window and the
+number of categories / locations, not on how many incidents have ever
+been recorded.
+"""
+from datetime import date
+
+import pandas as pd
+
+from database import get_connection
+from query_cache import cached_read
+
+
+def _rollup_frame(sql: str, params: tuple) -> pd.DataFrame:
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        cols = [desc[0] for desc in cur.description]
+    return pd.DataFrame(rows, columns=cols)
+
+
+@cached_read
+def incident_totals(care_home_id: int, date_from: date, date_to: date) -> dict:
+    """Headline figures for the window."""
+    df = _rollup_frame(
+        """
+        SELECT
+            coalesce(sum(incidents), 0) AS incidents,
+            coalesce(sum(harm_incidents), 0) AS harm_incidents,
+            coalesce(sum(reviews_completed), 0) AS reviews_completed,
+            coalesce(sum(review_seconds_total), 0) AS review_seconds_total
+        FROM incident_daily_rollup
+        WHERE care_home_id = %s AND day BETWEEN %s AND %s
+        """,
+        (care_home_id, date_from, date_to),
+    )
+    totals = df.iloc[0].to_dict()
+    reviews = totals["reviews_completed"]
+    totals["average_review_hours"] = totals["review_seconds_total"] / reviews / 3600 if reviews else None
+    return totals
+
+
+@cached_read
+def monthly_counts_by_category(care_home_id: int, date_from: date, date_to: date) -> pd.DataFrame:
+    """Incidents per month (rows) and category (columns)."""
+    df = _rollup_frame(
+        """
+        SELECT date_trunc('month', day)::date AS month, category, sum(incidents) AS incidents
+        FROM incident_daily_rollup
+        WHERE care_home_id = %s AND day BETWEEN %s AND %s
+        GROUP BY 1, 2
+        """,
+        (care_home_id, date_from, date_to),
+    )
+    if df.empty:
+        return df
+    return df.pivot_table(index="month", columns="category", values="incidents", fill_value=0).sort_index()
+
+
+@cached_read
+def severity_by_location(care_home_id: int, date_from: date, date_to: date) -> pd.DataFrame:
+    """Incidents per location (rows) and severity (columns), busiest locations first."""
+    df = _rollup_frame(
+        """
+        SELECT location, severity, sum(incidents) AS incidents
+        FROM incident_daily_rollup
+        WHERE care_home_id = %s AND day BETWEEN %s AND %s
+        GROUP BY 1, 2
+        """,
+        (care_home_id, date_from, date_to),
+    )
+    if df.empty:
+        return df
+    pivot = df.pivot_table(index="location", columns="severity", values="incidents", fill_value=0)
+    return pivot.loc[pivot.sum(axis=1).sort_values(ascending=False).index]
+
+
+@cached_read
+def monthly_review_turnaround(care_home_id: int, date_from: date, date_to: date) -> pd.DataFrame:
+    """Completed reviews and average hours from submission to sign-off, per month."""
+    df = _rollup_frame(
+        """
+        SELECT
+            date_trunc('month', day)::date AS month,
+            sum(reviews_completed) AS reviews_completed,
+            sum(review_seconds_total) / nullif(sum(reviews_completed), 0) / 3600.0 AS average_review_hours
+        FROM incident_daily_rollup
+        WHERE care_home_id = %s AND day BETWEEN %s AND %s
+        GROUP BY 1
+        ORDER BY 1
+        """,
+        (care_home_id, date_from, date_to),
+    )
+    return df.set_index("month") if not df.empty else df
@@ -0,0 +1,369 @@
+"""
+HTTP / JSON API for integrations (e-MAR, rostering) alongside the Streamlit app.
+
+An ASGI application (Starlette) over the same data layer as the pages:
+submissions are checked with the report form's rules, listings use the
+keyset pagination and query cache of the inspection page, and reviews the
+same version check. The data layer is psycopg2, which blocks, so each call
+runs in a worker thread; at most DB_POOL_MAX run at once, and further
+requests wait on the event loop rather than holding a thread while they
+wait for a connection.
+
+Endpoints (fields are the incidents table's column names):
+    GET  /v1/incidents                       ?status= &severity= &date_from= &date_to= &search= &limit= &after=
+    POST /v1/incidents                       submit one incident
+    GET  /v1/incidents/{incident_id}
+    POST /v1/incidents/{incident_id}/review  managers only
+
+Requests authenticate with `Authorization: Bearer <key>` (see
+`admin.py api-key`). A key belongs to one care home; staff keys can
+submit, list and read, manager keys can also review. Responses of 1 kB or
+more are gzip-compressed for clients that accept it. GET responses carry
+an ETag, and a request sending it back in If-None-Match gets an empty 304.
+
+Submissions are written straight to Postgres, not through the app's write
+queue, so the response says whether the incident was stored. A client may
+send its own incident_id; resubmitting it returns the stored incident
+(200) instead of creating a second one (201).
+
+Usage:
+    python api.py [--host 127.0.0.1] [--port 8000] [--workers 1]
+
+or any ASGI server: `uvicorn api:app`. DATABASE_URL and the pool and
+cache settings are read from Streamlit secrets or the environment.
+"""
+import argparse
+import base64
+import binascii
+import contextlib
+import hashlib
+import json
+import sys
+from datetime import date, datetime, time
+
+import anyio
+import psycopg2
+import uvicorn
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from auth import ApiKey, authenticate_api_key
+from database import PoolTimeout, get_connection, get_setting, init_db
+from incidents import (
+    COLUMN_LABELS,
+    INCIDENT_COLUMNS,
+    INCIDENT_LABELS,
+    SEVERITIES,
+    SIGNOFF_DECISIONS,
+    Incident,
+    IncidentFilters,
+    ReviewConflict,
+    StoredIncident,
+    generate_incident_id,
+    get_incident_record,
+    insert_incidents,
+    list_incidents,
+    require_text,
+    update_management_review,
+    validate_incident,
+)
+from instrumentation import set_page
+from query_cache import get_query_cache
+
+MAX_PAGE_SIZE = 250
+MAX_BODY_BYTES = 64 * 1024
+REVIEW_STATUSES = ("Pending", "Completed")
+
+# A submission sets the reporting fields; the management fields start
+# blank until the incident is reviewed.
+SUBMIT_FIELDS = INCIDENT_COLUMNS[:INCIDENT_COLUMNS.index("submitted_timestamp") + 1]
+REVIEW_FIELDS = ("row_version", "reviewer_name", "reviewer_role", "review_outcome", "signoff_decision")
+
+
+class ApiError(Exception):
+    """Turned into a JSON error response with the given status."""
+
+    def __init__(self, status: int, message: str, errors: list[str] | None = None, headers: dict | None = None):
+        super().__init__(message)
+        self.status = status
+        self.errors = errors or []
+        self.headers = headers
+
+
+# ---------------------------
+# Running the data layer
+# ---------------------------
+async def run_db(request: Request, page: str, func, *args, **kwargs):
+    """Runs a blocking data-layer call in a worker thread, tagged with `page` in the query metrics."""
+    def call():
+        set_page(page)
+        return func(*args, **kwargs)
+
+    return await anyio.to_thread.run_sync(call, limiter=request.app.state.db_limiter)
+
+
+async def authenticate(request: Request, page: str) -> ApiKey:
+    scheme, _, key = request.headers.get("authorization", "").partition(" ")
+    api_key = await run_db(request, page, authenticate_api_key, key.strip() if scheme.lower() == "bearer" else None)
+    if api_key is None:
+        raise ApiError(401, "A valid API key is required.", headers={"WWW-Authenticate": "Bearer"})
+    return api_key
+
+
+# ---------------------------
+# Requests and responses
+# ---------------------------
+def _json_default(value):
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serialisable")
+
+
+def incident_json(stored: StoredIncident) -> dict:
+    return {**stored.incident._asdict(), "row_version": stored.row_version, "locked": stored.locked}
+
+
+def _etags(header: str) -> set[str]:
+    """Entity tags listed in an If-None-Match header, compared weakly (RFC 9110)."""
+    return {tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()}
+
+
+def json_response(request: Request, payload, status: int = 200, headers: dict | None = None) -> Response:
+    """
+    JSON response. GET responses get a weak ETag over the body (weak, as
+    the gzip middleware may re-encode it) and become 304 Not Modified when
+    the client already holds that version.
+    """
+    body = json.dumps(payload, default=_json_default, separators=(",", ":")).encode("utf-8")
+    headers = dict(headers or {})
+    if request.method == "GET":
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        headers.update({"ETag": "W/" + etag, "Cache-Control": "private, no-cache"})
+        if_none_match = _etags(request.headers.get("if-none-match", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            return Response(status_code=304, headers=headers)
+    return Response(body, status, headers=headers, media_type="application/json")
+
+
+async def json_body(request: Request, allowed: tuple[str, ...]) -> dict:
+    too_large = ApiError(413, f"Request bodies are limited to {MAX_BODY_BYTES // 1024} kB.")
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > MAX_BODY_BYTES:
+        raise too_large
+    # Read in chunks, so a body sent without (or understating) its length is
+    # refused once it passes the limit rather than buffered whole.
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_BODY_BYTES:
+            raise too_large
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise ApiError(400, "The request body must be JSON.") from None
+    if not isinstance(payload, dict):
+        raise ApiError(400, "The request body must be a JSON object.")
+    unknown = sorted(set(payload) - set(allowed))
+    if unknown:
+        raise ApiError(422, "Unknown or read-only fields.", [f"{name} cannot be set here." for name in unknown])
+    return payload
+
+
+def encode_cursor(cursor: tuple | None) -> str | None:
+    if cursor is None:
+        return None
+    submitted, row_id = cursor
+    return base64.urlsafe_b64encode(f"{submitted.isoformat()}|{row_id}".encode("ascii")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(text: str) -> tuple:
+    try:
+        submitted, row_id = base64.urlsafe_b64decode(text + "=" * (-len(text) % 4)).decode("ascii").split("|")
+        return datetime.fromisoformat(submitted), int(row_id)
+    except (ValueError, binascii.Error):
+        raise ApiError(400, "Invalid `after` cursor; pass back the `next` value of the previous page.") from None
+
+
+def list_params(query) -> tuple[IncidentFilters, tuple | None, int]:
+    errors = []
+    status, severity = query.get("status") or None, query.get("severity") or None
+    if status not in (None, *REVIEW_STATUSES):
+        errors.append(f"status must be one of: {', '.join(REVIEW_STATUSES)}.")
+    if severity not in (None, *SEVERITIES):
+        errors.append(f"severity must be one of: {', '.join(SEVERITIES)}.")
+    dates = {}
+    for name in ("date_from", "date_to"):
+        try:
+            dates[name] = date.fromisoformat(query[name]) if query.get(name) else None
+        except ValueError:
+            errors.append(f"{name} must be a date (YYYY-MM-DD).")
+    try:
+        limit = int(query.get("limit", 50))
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError
+    except ValueError:
+        errors.append(f"limit must be a whole number from 1 to {MAX_PAGE_SIZE}.")
+    if errors:
+        raise ApiError(422, "Invalid query parameters.", errors)
+
+    filters = IncidentFilters(status=status, severity=severity, search=query.get("search", "").strip(), **dates)
+    after = decode_cursor(query["after"]) if query.get("after") else None
+    return filters, after, limit
+
+
+# ---------------------------
+# Endpoints
+# ---------------------------
+async def list_endpoint(request: Request) -> Response:
+    api_key = await authenticate(request, "API list")
+    filters, after, limit = list_params(request.query_params)
+    incidents, next_cursor = await run_db(request, "API list", list_incidents, api_key.care_home_id, filters, after, limit)
+    return json_response(request, {"incidents": [incident_json(s) for s in incidents], "next": encode_cursor(next_cursor)})
+
+
+async def get_endpoint(request: Request) -> Response:
+    api_key = await authenticate(request, "API get")
+    stored = await run_db(
+        request, "API get", get_incident_record, api_key.care_home_id, request.path_params["incident_id"]
+    )
+    if stored is None:
+        raise ApiError(404, "Incident not found.")
+    return json_response(request, incident_json(stored))
+
+
+def store_submission(care_home_id: int, incident: Incident, actor: str) -> StoredIncident | None:
+    """Inserts the incident; returns None if the home already has its ID."""
+    with get_connection() as conn, conn.cursor() as cur:
+        # Transaction-local; read by the audit log trigger (migrations/0010).
+        cur.execute("SELECT set_config('incidents.actor', %s, true)", (actor,))
+        inserted = insert_incidents(cur, care_home_id, [incident], skip_existing=True)
+    get_query_cache().invalidate(care_home_id)
+    return StoredIncident(incident, 1, False) if inserted else None
+
+
+async def submit_endpoint(request: Request) -> Response:
+    api_key = await authenticate(request, "API submit")
+    payload = await json_body(request, SUBMIT_FIELDS)
+    not_text = [f"{name} must be a string." for name, value in payload.items() if not isinstance(value, (str, type(None)))]
+    if not_text:
+        raise ApiError(422, "Invalid incident.", not_text)
+
+    record = dict.fromkeys(INCIDENT_LABELS, "")
+    record.update({COLUMN_LABELS[name]: (value or "").strip() for name, value in payload.items()})
+    record["Incident ID"] = record["Incident ID"] or generate_incident_id()
+    record["Submitted timestamp"] = record["Submitted timestamp"] or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    record["Management review status"] = "Pending"
+    errors = validate_incident(record)
+    try:
+        incident = Incident.from_record(record)
+    except ValueError as exc:
+        errors.append(str(exc))
+    if errors:
+        raise ApiError(422, "Invalid incident.", errors)
+
+    stored = await run_db(request, "API submit", store_submission, api_key.care_home_id, incident, f"api:{api_key.name}")
+    if stored is None:
+        stored = await run_db(request, "API submit", get_incident_record.uncached, api_key.care_home_id, incident.incident_id)
+        return json_response(request, incident_json(stored))
+    return json_response(
+        request, incident_json(stored), status=201, headers={"Location": f"/v1/incidents/{incident.incident_id}"}
+    )
+
+
+async def review_endpoint(request: Request) -> Response:
+    api_key = await authenticate(request, "API review")
+    if api_key.role != "manager":
+        raise ApiError(403, "Reviews need a manager API key.")
+    incident_id = request.path_params["incident_id"]
+    payload = await json_body(request, REVIEW_FIELDS)
+
+    errors = []
+    for name in REVIEW_FIELDS[1:4]:
+        value = payload.get(name)
+        if value is not None and not isinstance(value, str):
+            errors.append(f"{name} must be a string.")
+        elif not require_text(value):
+            errors.append(f"{name} is required.")
+    if payload.get("signoff_decision") not in SIGNOFF_DECISIONS:
+        errors.append(f"signoff_decision must be one of: {', '.join(SIGNOFF_DECISIONS)}.")
+    row_version = payload.get("row_version")
+    if not isinstance(row_version, int) or isinstance(row_version, bool):
+        errors.append("row_version is required: the version of the incident the review is based on.")
+    if errors:
+        raise ApiError(422, "Invalid review.", errors)
+
+    if await run_db(request, "API review", get_incident_record, api_key.care_home_id, incident_id) is None:
+        raise ApiError(404, "Incident not found.")
+    try:
+        await run_db(
+            request, "API review", update_management_review,
+            care_home_id=api_key.care_home_id,
+            incident_id=incident_id,
+            expected_version=row_version,
+            reviewer_name=payload["reviewer_name"].strip(),
+            reviewer_role=payload["reviewer_role"].strip(),
+            review_outcome=payload["review_outcome"].strip(),
+            signoff_decision=payload["signoff_decision"],
+            signoff_timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            management_review_status="Completed",
+            actor=f"api:{api_key.name}",
+        )
+    except ReviewConflict as exc:
+        raise ApiError(409, str(exc), ["GET the incident for its current row_version before retrying."]) from None
+    stored = await run_db(request, "API review", get_incident_record, api_key.care_home_id, incident_id)
+    return json_response(request, incident_json(stored))
+
+
+# ---------------------------
+# Application
+# ---------------------------
+async def api_error(request: Request, exc: ApiError) -> Response:
+    return JSONResponse({"error": str(exc), "errors": exc.errors}, exc.status, headers=exc.headers)
+
+
+async def database_unavailable(request: Request, exc: Exception) -> Response:
+    return JSONResponse({"error": "The incident database is busy or unavailable; retry shortly.", "errors": []},
+                        503, headers={"Retry-After": "5"})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    await anyio.to_thread.run_sync(init_db)
+    app.state.db_limiter = anyio.CapacityLimiter(int(get_setting("DB_POOL_MAX", 10)))
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/v1/incidents", list_endpoint, methods=["GET"]),
+        Route("/v1/incidents", submit_endpoint, methods=["POST"]),
+        Route("/v1/incidents/{incident_id}", get_endpoint, methods=["GET"]),
+        Route("/v1/incidents/{incident_id}/review", review_endpoint, methods=["POST"]),
+    ],
+    middleware=[Middleware(GZipMiddleware, minimum_size=1024)],
+    exception_handlers={
+        ApiError: api_error,
+        PoolTimeout: database_unavailable,
+        psycopg2.OperationalError: database_unavailable,
+    },
+    lifespan=lifespan,
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the incident HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1, help="server processes, each with its own pool")
+    args = parser.parse_args(argv)
+
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers, proxy_headers=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
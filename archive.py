@@ -0,0 +1,137 @@
+"""
+Moves old signed-off incidents from the hot incidents table into the
+incidents_archive tier (migrations/0012).
+
+An incident is archived once it is locked (signed off) and its incident
+date is older than the retention window. Each care home and month is moved
+in its own transaction by a single DELETE ... RETURNING feeding an INSERT,
+so an incident is always in exactly one tier, and the archive is written in
+(care home, month, submission) order. Nothing recorded changes: the audit
+chains, the analytics rollups and every page that reads all_incidents see
+archived incidents as before.
+
+Usage:
+    python archive.py [--care-home-id 3] [--older-than-days 365] [--dry-run]
+
+Run it nightly (e.g. from cron); autovacuum then reclaims the space in the
+hot table. ARCHIVE_AFTER_DAYS sets the default retention window.
+DATABASE_URL is read from Streamlit secrets or the environment.
+"""
+import argparse
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from database import get_connection, get_setting
+from incidents import INCIDENT_COLUMN_LIST
+
+# Columns moved, in incidents_archive order (archived_at takes its default).
+ARCHIVE_COLUMNS = f"id, care_home_id, {INCIDENT_COLUMN_LIST}, row_version, locked, updated_at"
+
+ARCHIVE_MONTH_SQL = f"""
+    WITH moved AS (
+        DELETE FROM incidents
+        WHERE care_home_id = %(home)s
+          AND locked
+          AND incident_id IS NOT NULL
+          AND incident_date >= %(month)s AND incident_date < %(until)s
+        RETURNING {ARCHIVE_COLUMNS}
+    )
+    INSERT INTO incidents_archive ({ARCHIVE_COLUMNS})
+    SELECT {ARCHIVE_COLUMNS} FROM moved
+    ORDER BY submitted_timestamp, id
+"""
+
+
+@dataclass
+class ArchiveReport:
+    cutoff: date
+    incidents: int = 0
+    seconds: float = 0.0
+    months: list = field(default_factory=list)  # (care home ID, month, incidents)
+    dry_run: bool = False
+
+    def summary(self) -> str:
+        verb = "to archive" if self.dry_run else "archived"
+        return (
+            f"{self.incidents} incidents dated before {self.cutoff} {verb} "
+            f"across {len(self.months)} care home months in {self.seconds:.2f}s"
+        )
+
+
+def archive_cutoff(older_than_days: int | None = None, today: date | None = None) -> date:
+    """Incidents dated before this day are due for archiving."""
+    if older_than_days is None:
+        older_than_days = int(get_setting("ARCHIVE_AFTER_DAYS", 365))
+    return (today or date.today()) - timedelta(days=older_than_days)
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def due_months(cutoff: date, care_home_id: int | None = None) -> list[tuple[int, date, int]]:
+    """(care home ID, first day of month, incidents) for every month with incidents due, oldest first."""
+    clause, params = "", {"cutoff": cutoff}
+    if care_home_id is not None:
+        clause, params["home"] = "AND care_home_id = %(home)s", care_home_id
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT care_home_id, date_trunc('month', incident_date)::date AS month, count(*)
+            FROM incidents
+            WHERE locked AND incident_id IS NOT NULL AND incident_date < %(cutoff)s {clause}
+            GROUP BY 1, 2
+            ORDER BY 1, 2
+            """,
+            params,
+        )
+        return cur.fetchall()
+
+
+def archive_incidents(
+    care_home_id: int | None = None,
+    older_than_days: int | None = None,
+    dry_run: bool = False,
+) -> ArchiveReport:
+    """Moves every locked incident dated before the cutoff into the archive, one care home month at a time."""
+    report = ArchiveReport(cutoff=archive_cutoff(older_than_days), dry_run=dry_run)
+    started = time.perf_counter()
+
+    for home, month, due in due_months(report.cutoff, care_home_id):
+        moved = due
+        if not dry_run:
+            with get_connection() as conn, conn.cursor() as cur:
+                cur.execute(
+                    ARCHIVE_MONTH_SQL,
+                    {"home": home, "month": month, "until": min(_next_month(month), report.cutoff)},
+                )
+                moved = cur.rowcount
+        report.months.append((home, month, moved))
+        report.incidents += moved
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Move old signed-off incidents into the archive tier.")
+    parser.add_argument("--care-home-id", type=int, default=None, help="archive one care home only")
+    parser.add_argument(
+        "--older-than-days", type=int, default=None,
+        help="retention window in days (default ARCHIVE_AFTER_DAYS, else 365)",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="report what is due; move nothing")
+    args = parser.parse_args(argv)
+
+    print("=== Archive Signed-off Incidents ===")
+    report = archive_incidents(args.care_home_id, args.older_than_days, dry_run=args.dry_run)
+    for home, month, moved in report.months:
+        print(f"Care home {home}, {month:%Y-%m}: {moved} incidents")
+    print(("\n(dry run) " if report.dry_run else "\n✅ ") + report.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Verification of the hash-chained incident event log (migrations/0010).
+
+Every incident has a chain of events in incident_events, each holding the
+incident's full recorded content after a change, a digest of that content
+and a hash over both and the previous event's hash. verify_audit_log()
+re-computes every chain and checks that the newest event of each chain
+matches the incident as it is stored now, so an incident altered after
+sign-off, or an event altered or removed, is reported.
+
+Chains are split into slices by a hash of the incident ID and verified in
+parallel, one process and one database snapshot per slice, with events
+streamed through a server-side cursor.
+
+Usage:
+    python audit_log.py [--care-home-id 3] [--workers 4]
+
+Prints any problems and one digest per care home (a hash over all chain
+heads). An inspector who notes the digest can later confirm that nothing
+recorded up to then has changed: re-verify and compare.
+
+DATABASE_URL is read from Streamlit secrets or the environment.
+"""
+import argparse
+import hashlib
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import psycopg2
+import psycopg2.extensions
+
+from database import get_connection, get_setting
+from query_cache import cached_read
+
+GENESIS_HASH = "0" * 64
+
+
+def event_hash(prev_hash: str, row_digest: str, payload: str) -> str:
+    """Same as incident_event_hash() in migrations/0010."""
+    return hashlib.sha256(f"{prev_hash}\n{row_digest}\n{payload}".encode("utf-8")).hexdigest()
+
+
+def chain_problems(events) -> list[str]:
+    """Checks one incident's events, given as (seq, row_digest, payload, prev_hash, hash) in seq order."""
+    problems = []
+    expected_prev = GENESIS_HASH
+    for n, (seq, row_digest, payload, prev_hash, stored_hash) in enumerate(events, start=1):
+        if seq != n:
+            problems.append(f"event {n} is missing (next event is {seq})")
+        if prev_hash != expected_prev:
+            problems.append(f"event {seq} does not follow on from the event before it")
+        if event_hash(prev_hash, row_digest, payload) != stored_hash:
+            problems.append(f"event {seq} was altered after it was recorded")
+        expected_prev = stored_hash
+    return problems
+
+
+@dataclass
+class AuditReport:
+    chains: int = 0
+    events: int = 0
+    seconds: float = 0.0
+    problems: list = field(default_factory=list)  # (care home ID, incident ID, message)
+    home_digests: dict = field(default_factory=dict)  # care home ID -> hex digest
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+    def summary(self) -> str:
+        verdict = "all chains intact" if self.ok else f"{len(self.problems)} problems"
+        return (
+            f"{self.chains} incident chains, {self.events} events verified in {self.seconds:.2f}s "
+            f"({self.events / self.seconds if self.seconds else 0:,.0f} events/s): {verdict}"
+        )
+
+
+# ---------------------------
+# Verifying one slice (worker process)
+# ---------------------------
+def _slice_filter(care_home_id: int | None, alias: str) -> str:
+    clause = f"(hashtext({alias}.incident_id) & 2147483647) %% %(slices)s = %(slice)s"
+    if care_home_id is not None:
+        clause = f"{alias}.care_home_id = %(home)s AND " + clause
+    return clause
+
+
+def verify_slice(dsn: str, care_home_id: int | None, slice_no: int, slices: int) -> tuple:
+    """Returns (chains, events, problems, heads) for one slice of the incidents."""
+    params = {"home": care_home_id, "slice": slice_no, "slices": slices}
+    problems, heads = [], []
+    chains = events = 0
+
+    conn = psycopg2.connect(dsn)
+    try:
+        # One snapshot for both queries, so concurrent writes cannot cause false alarms.
+        conn.set_session(isolation_level=psycopg2.extensions.ISOLATION_LEVEL_REPEATABLE_READ, readonly=True)
+        with conn.cursor() as cur:
+            # Both tiers: archived incidents (archive.py) keep their chains.
+            cur.execute(
+                f"""
+                SELECT i.care_home_id, i.incident_id, incident_row_digest(i)
+                FROM incidents AS i
+                WHERE {_slice_filter(care_home_id, "i")}
+                UNION ALL
+                SELECT a.care_home_id, a.incident_id, incident_row_digest(a)
+                FROM incidents_archive AS a
+                WHERE {_slice_filter(care_home_id, "a")}
+                """,
+                params,
+            )
+            incidents = {(home, incident_id): digest for home, incident_id, digest in cur}
+
+        with conn.cursor(name="audit_events") as cur:
+            cur.itersize = 5000
+            cur.execute(
+                f"""
+                SELECT e.care_home_id, e.incident_id, e.seq, e.row_digest, e.payload, e.prev_hash, e.hash
+                FROM incident_events AS e
+                WHERE {_slice_filter(care_home_id, "e")}
+                ORDER BY e.care_home_id, e.incident_id, e.seq
+                """,
+                params,
+            )
+            key, chain = None, []
+            for home, incident_id, seq, *event in cur:
+                if (home, incident_id) != key:
+                    if key is not None:
+                        chains += 1
+                        problems += _finish_chain(key, chain, incidents, heads)
+                    key, chain = (home, incident_id), []
+                chain.append((seq, *event))
+                events += 1
+            if key is not None:
+                chains += 1
+                problems += _finish_chain(key, chain, incidents, heads)
+    finally:
+        conn.close()
+
+    problems += [(home, incident_id, "incident has no audit events") for home, incident_id in incidents]
+    return chains, events, problems, heads
+
+
+def _finish_chain(key: tuple, chain: list, incidents: dict, heads: list) -> list:
+    home, incident_id = key
+    problems = [(home, incident_id, message) for message in chain_problems(chain)]
+    _, head_digest, _, _, head_hash = chain[-1]
+    heads.append((home, incident_id, head_hash))
+    stored_digest = incidents.pop(key, None)
+    if stored_digest is None:
+        problems.append((home, incident_id, "incident row is missing"))
+    elif stored_digest != head_digest:
+        problems.append((home, incident_id, "incident was changed without an audit event"))
+    return problems
+
+
+# ---------------------------
+# Verifying the whole log
+# ---------------------------
+def home_digest(heads: list[tuple[str, str]]) -> str:
+    """Hash over a care home's chain heads, as (incident ID, head hash) pairs."""
+    digest = hashlib.sha256()
+    for incident_id, head_hash in sorted(heads):
+        digest.update(f"{incident_id}:{head_hash}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def verify_audit_log(care_home_id: int | None = None, workers: int | None = None) -> AuditReport:
+    """Verifies every chain, or one care home's, across `workers` processes."""
+    report = AuditReport()
+    started = time.perf_counter()
+    workers = workers or multiprocessing.cpu_count()
+    dsn = get_setting("DATABASE_URL")
+
+    heads_by_home = {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(verify_slice, dsn, care_home_id, n, workers) for n in range(workers)]
+        for future in futures:
+            chains, events, problems, heads = future.result()
+            report.chains += chains
+            report.events += events
+            report.problems += problems
+            for home, incident_id, head_hash in heads:
+                heads_by_home.setdefault(home, []).append((incident_id, head_hash))
+
+    report.home_digests = {home: home_digest(heads) for home, heads in sorted(heads_by_home.items())}
+    report.problems.sort()
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+# ---------------------------
+# One incident's history (inspection page)
+# ---------------------------
+@cached_read
+def incident_history(care_home_id: int, incident_id: str) -> tuple[list[dict], list[str]]:
+    """Returns the incident's events, oldest first, and any problems found in its chain."""
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT seq, event_type, occurred_at, actor, row_digest, payload, prev_hash, hash
+            FROM incident_events
+            WHERE care_home_id = %s AND incident_id = %s
+            ORDER BY seq
+            """,
+            (care_home_id, incident_id),
+        )
+        rows = cur.fetchall()
+    events = [
+        {"Event": seq, "Type": event_type, "At": str(occurred_at), "By": actor, "Hash": stored_hash}
+        for seq, event_type, occurred_at, actor, *_, stored_hash in rows
+    ]
+    problems = chain_problems([(seq, *event) for seq, _, _, _, *event in rows])
+    return events, problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Verify the hash-chained incident audit log.")
+    parser.add_argument("--care-home-id", type=int, default=None, help="verify one care home only")
+    parser.add_argument("--workers", type=int, default=None, help="verifying processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    print("=== Verify Incident Audit Log ===")
+    report = verify_audit_log(args.care_home_id, workers=args.workers)
+    for home, incident_id, message in report.problems:
+        print(f"❌ care home {home}, {incident_id}: {message}")
+    for home, digest in report.home_digests.items():
+        print(f"Care home {home} digest: {digest}")
+    print(("\n✅ " if report.ok else "\n") + report.summary())
+    return 0 if report.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+# auth.py
+"""
+Login, sessions and role checks for the Streamlit app, and the API keys
+integrations use with api.py.
+
+Password hashes are verified with bcrypt in a small, bounded thread pool
+so that a burst of logins at shift change cannot starve other sessions'
+reruns of CPU. A successful login creates a server-side session token;
+the browser session keeps only the token, and each rerun resolves it with
+an in-memory lookup instead of re-checking credentials.
+"""
+import hashlib
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import NamedTuple
+
+import bcrypt
+import streamlit as st
+
+from database import get_connection, get_setting
+from query_cache import QueryCache
+
+ROLES = ("staff", "manager")
+
+
+class AuthError(Exception):
+    """Raised when a login is refused; the message is safe to show the user."""
+
+
+class UserSession(NamedTuple):
+    token: str
+    user_id: int
+    username: str
+    role: str
+    care_home_id: int
+    expires_at: float
+
+
+# =================================================
+# PASSWORD HASHING
+# =================================================
+def bcrypt_rounds() -> int:
+    """bcrypt cost factor for new hashes (BCRYPT_ROUNDS, default 12)."""
+    return int(get_setting("BCRYPT_ROUNDS", 12))
+
+
+def hash_password(password: str, rounds: int | None = None) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds or bcrypt_rounds())).decode("ascii")
+
+
+def hash_cost(password_hash: str) -> int:
+    """Cost factor recorded in a bcrypt hash ($2b$12$...)."""
+    return int(password_hash.split("$")[2])
+
+
+def check_password(password: str, password_hash: str) -> bool:
+    return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("ascii"))
+
+
+class HashingPool:
+    """
+    Bounded executor for bcrypt work. At most `workers` hashes run at once
+    and at most `max_pending` logins may wait; beyond that new logins are
+    refused straight away rather than queueing behind a login storm.
+    """
+
+    def __init__(self, workers: int = 4, max_pending: int = 32, timeout: float = 10.0):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._timeout = timeout
+
+    def run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise AuthError("Too many sign-ins are in progress. Please try again in a moment.")
+        try:
+            return self._executor.submit(func, *args).result(timeout=self._timeout)
+        except FutureTimeout:
+            raise AuthError("Sign-in timed out. Please try again.") from None
+        finally:
+            self._slots.release()
+
+
+@st.cache_resource
+def get_hashing_pool() -> HashingPool:
+    """Process-wide bcrypt pool sized by AUTH_WORKERS (default 4)."""
+    workers = int(get_setting("AUTH_WORKERS", 4))
+    return HashingPool(workers=workers, max_pending=workers * 8)
+
+
+@st.cache_resource
+def _dummy_hash() -> str:
+    # Verified for unknown usernames so they take as long as real ones.
+    return hash_password(secrets.token_urlsafe(16))
+
+
+# =================================================
+# RATE LIMITING
+# =================================================
+class RateLimiter:
+    """Counts failed logins per key (username or IP) over a sliding window."""
+
+    def __init__(self, max_failures: int, window_seconds: float):
+        self._max_failures = max_failures
+        self._window = window_seconds
+        self._failures = {}  # key -> deque of failure times
+        self._lock = threading.Lock()
+
+    def _recent(self, key, now: float) -> deque:
+        failures = self._failures.get(key)
+        if failures is None:
+            return deque()
+        while failures and failures[0] <= now - self._window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+        return failures
+
+    def blocked(self, key) -> bool:
+        with self._lock:
+            return len(self._recent(key, time.monotonic())) >= self._max_failures
+
+    def record_failure(self, key) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._recent(key, now)
+            self._failures.setdefault(key, deque()).append(now)
+
+    def reset(self, key) -> None:
+        with self._lock:
+            self._failures.pop(key, None)
+
+
+@st.cache_resource
+def get_rate_limiters() -> tuple[RateLimiter, RateLimiter]:
+    """
+    (per-username, per-IP) limiters. LOGIN_MAX_FAILURES_PER_USER (default 5)
+    and LOGIN_MAX_FAILURES_PER_IP (default 30) failures within
+    LOGIN_LOCKOUT_MINUTES (default 15) block further attempts.
+    """
+    window = float(get_setting("LOGIN_LOCKOUT_MINUTES", 15)) * 60
+    return (
+        RateLimiter(int(get_setting("LOGIN_MAX_FAILURES_PER_USER", 5)), window),
+        RateLimiter(int(get_setting("LOGIN_MAX_FAILURES_PER_IP", 30)), window),
+    )
+
+
+def client_address(peer: str | None, forwarded_for: str | None, trusted_proxies: int | None = None) -> str | None:
+    """
+    The address the per-IP limiter counts for a request from `peer`. Behind
+    TRUSTED_PROXIES reverse proxies (default 0), each of which appends the
+    address it saw to X-Forwarded-For, that is the hop the outermost proxy
+    added; anything left of it was sent by the client and is ignored.
+    """
+    if trusted_proxies is None:
+        trusted_proxies = int(get_setting("TRUSTED_PROXIES", 0))
+    hops = [hop.strip() for hop in (forwarded_for or "").split(",") if hop.strip()]
+    if trusted_proxies <= 0 or len(hops) < trusted_proxies:
+        return peer
+    return hops[-trusted_proxies]
+
+
+# =================================================
+# SESSIONS
+# =================================================
+class SessionStore:
+    """In-memory map of session token -> UserSession with sliding expiry."""
+
+    def __init__(self, ttl_seconds: float):
+        self._ttl = ttl_seconds
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, user_id: int, username: str, role: str, care_home_id: int) -> UserSession:
+        session = UserSession(
+            secrets.token_urlsafe(32), user_id, username, role, care_home_id, time.time() + self._ttl
+        )
+        with self._lock:
+            self._purge_expired()
+            self._sessions[session.token] = session
+        return session
+
+    def get(self, token: str | None) -> UserSession | None:
+        if not token:
+            return None
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            if session.expires_at <= time.time():
+                del self._sessions[token]
+                return None
+            session = session._replace(expires_at=time.time() + self._ttl)
+            self._sessions[token] = session
+            return session
+
+    def revoke(self, token: str | None) -> None:
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def _purge_expired(self) -> None:
+        now = time.time()
+        for token in [t for t, s in self._sessions.items() if s.expires_at <= now]:
+            del self._sessions[token]
+
+
+@st.cache_resource
+def get_session_store() -> SessionStore:
+    """Sessions idle for SESSION_TTL_MINUTES (default 720, one long shift) expire."""
+    return SessionStore(float(get_setting("SESSION_TTL_MINUTES", 720)) * 60)
+
+
+# =================================================
+# LOGIN
+# =================================================
+def _load_user(username: str):
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            "SELECT id, password_hash, role, care_home_id FROM users WHERE username = %s",
+            (username,),
+        )
+        return cur.fetchone()
+
+
+def _upgrade_hash(user_id: int, password: str) -> None:
+    """Re-hashes a password whose stored cost is below BCRYPT_ROUNDS."""
+    new_hash = get_hashing_pool().run(hash_password, password)
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("UPDATE users SET password_hash = %s WHERE id = %s", (new_hash, user_id))
+
+
+def authenticate(username: str, password: str, client_ip: str | None = None) -> UserSession:
+    """
+    Verifies credentials and opens a session. Raises AuthError when the
+    credentials are wrong or the username / IP is rate limited.
+    """
+    username = username.strip()
+    user_limiter, ip_limiter = get_rate_limiters()
+    if user_limiter.blocked(username) or (client_ip and ip_limiter.blocked(client_ip)):
+        raise AuthError("Too many failed sign-in attempts. Please wait and try again.")
+
+    user = _load_user(username) if username and password else None
+    pool = get_hashing_pool()
+    if user is None:
+        pool.run(check_password, password or "", _dummy_hash())
+        valid = False
+    else:
+        valid = pool.run(check_password, password, user[1])
+
+    if not valid:
+        user_limiter.record_failure(username)
+        if client_ip:
+            ip_limiter.record_failure(client_ip)
+        raise AuthError("Invalid username or password.")
+
+    user_id, password_hash, role, care_home_id = user
+    user_limiter.reset(username)
+    if hash_cost(password_hash) < bcrypt_rounds():
+        _upgrade_hash(user_id, password)
+    return get_session_store().create(user_id, username, role, care_home_id)
+
+
+def can_view_diagnostics(user: UserSession) -> bool:
+    """
+    Diagnostics show query statistics for every care home on the server, so
+    they are limited to the usernames listed in DIAGNOSTICS_USERS (comma-separated).
+    """
+    allowed = {name.strip() for name in str(get_setting("DIAGNOSTICS_USERS", "")).split(",")}
+    return user.username in allowed - {""}
+
+
+# =================================================
+# API KEYS (api.py)
+# =================================================
+# Revoking a key takes effect within this many seconds on every API process.
+API_KEY_CACHE_SECONDS = 60
+
+
+class ApiKey(NamedTuple):
+    key_id: int
+    name: str
+    role: str
+    care_home_id: int
+
+
+def hash_api_key(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def create_api_key(care_home_id: int, name: str, role: str = "staff") -> tuple[int, str]:
+    """Stores a new key and returns (key ID, key). Only its hash is kept, so the key cannot be shown again."""
+    key = secrets.token_urlsafe(32)
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            "INSERT INTO api_keys (care_home_id, name, role, key_hash) VALUES (%s, %s, %s, %s) RETURNING id",
+            (care_home_id, name, role, hash_api_key(key)),
+        )
+        return cur.fetchone()[0], key
+
+
+def revoke_api_key(key_id: int) -> bool:
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            "UPDATE api_keys SET revoked_at = CURRENT_TIMESTAMP WHERE id = %s AND revoked_at IS NULL",
+            (key_id,),
+        )
+        return cur.rowcount == 1
+
+
+@st.cache_resource
+def get_api_key_cache() -> QueryCache:
+    """Recent key lookups, valid or not, so most API requests need no query to authenticate."""
+    return QueryCache(maxsize=1024, ttl=API_KEY_CACHE_SECONDS)
+
+
+def authenticate_api_key(key: str | None) -> ApiKey | None:
+    """Returns the unrevoked key matching `key`, or None."""
+    if not key:
+        return None
+    key_hash = hash_api_key(key)
+    cache = get_api_key_cache()
+    api_key = cache.get(key_hash, default=False)
+    if api_key is False:
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT id, name, role, care_home_id FROM api_keys WHERE key_hash = %s AND revoked_at IS NULL",
+                (key_hash,),
+            )
+            row = cur.fetchone()
+        api_key = ApiKey(*row) if row else None
+        cache.set(key_hash, api_key)
+    return api_key
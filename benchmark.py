@@ -0,0 +1,430 @@
+"""
+Benchmark and load test for the incident data layer.
+
+Seeds a throwaway Postgres database with synthetic incidents, one care
+home per data size, then runs each operation from a number of concurrent
+threads (as Streamlit runs one thread per browser session) for a fixed
+time and reports p50 / p95 / p99 latency and throughput:
+
+    submit       insert one incident, as the write queue does
+    list_page    first page of the inspection listing (fetch_incidents_page)
+    sync_page    re-syncing a session's copy of that page (sync_incidents_page)
+    get_record   one incident by ID (get_incident_record)
+    review       update_management_review, without locking the incident
+    export_csv   the full CSV export (export_incidents_csv)
+    duplicates   the report form's duplicate check for a new incident (find_possible_duplicates)
+
+Reads go through the helpers' `.uncached` versions, so every call reaches
+Postgres. Results are written as JSON; pass an earlier run's file to
+--compare to flag operations whose p95 latency got worse.
+
+Usage:
+    python benchmark.py --database-url "host=localhost dbname=bench" [--sizes 1000,10000,100000]
+        [--concurrency 1,10,50] [--seconds 10] [--operations list_page,get_record]
+        [-o benchmark.json] [--compare baseline.json] [--tolerance 0.25]
+
+Use a throwaway database (e.g. a local `pg_ctl` instance or container):
+the audit log is append-only, so seeded incidents cannot be removed. The
+benchmark refuses to run against a database holding any other care home.
+DB_POOL_MAX and the other pool settings are read as the app reads them.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+
+from database import get_connection, get_pool, get_setting, init_db
+from duplicates import find_possible_duplicates
+from incidents import (
+    INCIDENT_CATEGORIES,
+    SEVERITIES,
+    Incident,
+    IncidentFilters,
+    export_incidents_csv,
+    fetch_incidents_page,
+    generate_incident_id,
+    get_incident_record,
+    insert_incidents,
+    sync_incidents_page,
+    update_management_review,
+)
+
+HOME_PREFIX = "Benchmark home"
+OPERATIONS = ("submit", "list_page", "sync_page", "get_record", "review", "export_csv", "duplicates")
+SEED_BATCH_SIZE = 1000
+REVIEW_SAMPLE_SIZE = 5000
+
+LOCATIONS = ["Room 1", "Room 12", "Lounge", "Dining room", "Garden", "Corridor B", "Bathroom 3", "Stairwell"]
+ROLES = ["Carer", "Senior carer", "Nurse", "Team leader"]
+ACCOUNT_PHRASES = [
+    "Resident was found on the floor beside the bed",
+    "Resident reported pain in the left hip after walking to the lounge",
+    "Evening medication was given an hour late",
+    "Bruising noticed on the right forearm during personal care",
+    "Resident became agitated and pushed another resident",
+    "Pressure area on the heel identified during the skin check",
+    "Call bell was out of reach when the resident needed help",
+    "Wet floor in the corridor after the cleaning round",
+]
+ACTION_PHRASES = [
+    "First aid given and observations recorded",
+    "GP informed and family contacted",
+    "Falls risk assessment reviewed",
+    "Pharmacy contacted for advice",
+    "Body map completed",
+    "Care plan updated",
+]
+
+
+# ---------------------------
+# Results
+# ---------------------------
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class RunResult:
+    operation: str
+    size: int
+    concurrency: int
+    ops: int = 0
+    errors: dict = field(default_factory=dict)  # exception type -> count
+    seconds: float = 0.0
+    throughput_per_s: float = 0.0
+    latency_ms: dict = field(default_factory=dict)  # p50, p95, p99, mean, max
+
+    def summary(self) -> str:
+        lat = self.latency_ms
+        errors = f", {sum(self.errors.values())} errors" if self.errors else ""
+        return (
+            f"{self.operation:<11} {self.size:>9,} incidents x{self.concurrency:<4} "
+            f"{self.ops:>7} ops {self.throughput_per_s:>9,.1f}/s  "
+            f"p50 {lat['p50']:8.2f}  p95 {lat['p95']:8.2f}  p99 {lat['p99']:8.2f} ms{errors}"
+        )
+
+
+# ---------------------------
+# Synthetic data
+# ---------------------------
+def synthetic_incident(rng: random.Random, when: datetime) -> dict:
+    """A label-keyed record shaped like the report form's, dated `when`."""
+    harm = rng.random() < 0.3
+    completed = rng.random() < 0.4
+    submitted = when + timedelta(minutes=rng.randint(5, 600))
+    return {
+        "Incident ID": generate_incident_id(submitted),
+        "Incident date": when.strftime("%Y-%m-%d"),
+        "Incident time": when.strftime("%H:%M:%S"),
+        "Category": rng.choice(INCIDENT_CATEGORIES),
+        "Location": rng.choice(LOCATIONS),
+        "Resident identifier": f"Resident {rng.randint(1, 400):03d}",
+        "Date of birth": f"{rng.randint(1925, 1955)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "Room": str(rng.randint(1, 60)),
+        "Incident account": ". ".join(rng.sample(ACCOUNT_PHRASES, 3)) + ".",
+        "Immediate actions taken": ". ".join(rng.sample(ACTION_PHRASES, 2)) + ".",
+        "Harm / injury sustained": "Yes" if harm else "No",
+        "Harm / injury details": "Minor bruising and a small skin tear." if harm else "",
+        "Individuals / services informed": "GP, Family",
+        "Severity": rng.choice(SEVERITIES),
+        "Reported by (name)": f"Carer {rng.randint(1, 80)}",
+        "Reported by (role)": rng.choice(ROLES),
+        "Immediate learning / actions": rng.choice(ACTION_PHRASES) + ".",
+        "Audit integrity confirmation": "Confirmed",
+        "Submitted timestamp": submitted.strftime("%Y-%m-%d %H:%M:%S"),
+        "Management review status": "Completed" if completed else "Pending",
+        "Management reviewer (name)": "Home manager" if completed else "",
+        "Management reviewer (role)": "Registered manager" if completed else "",
+        "Management review outcome": "Reviewed; care plan updated." if completed else "",
+        "Sign-off decision": "Further action required" if completed else "",
+        "Sign-off timestamp": (submitted + timedelta(days=2)).strftime("%Y-%m-%d %H:%M:%S") if completed else "",
+    }
+
+
+def check_throwaway_database() -> None:
+    """Refuses to seed a database that holds any care home not created here."""
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM care_homes WHERE name NOT LIKE %s", (HOME_PREFIX + "%",))
+        others = cur.fetchone()[0]
+    if others:
+        raise SystemExit(
+            f"❌ This database holds {others} care homes that the benchmark did not create. "
+            "Point --database-url at a throwaway database."
+        )
+
+
+def seed_home(size: int, rng: random.Random) -> int:
+    """Returns the benchmark care home for `size`, topped up to at least `size` incidents."""
+    name = f"{HOME_PREFIX} ({size} incidents)"
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("INSERT INTO care_homes (name) VALUES (%s) ON CONFLICT (name) DO NOTHING", (name,))
+        cur.execute("SELECT id FROM care_homes WHERE name = %s", (name,))
+        care_home_id = cur.fetchone()[0]
+        cur.execute("SELECT count(*) FROM incidents WHERE care_home_id = %s", (care_home_id,))
+        stored = cur.fetchone()[0]
+
+    started = time.perf_counter()
+    newest = datetime.now() - timedelta(days=1)
+    missing = size - stored
+    while missing > 0:
+        batch = [
+            Incident.from_record(synthetic_incident(rng, newest - timedelta(seconds=rng.randint(0, 3 * 365 * 86400))))
+            for _ in range(min(SEED_BATCH_SIZE, missing))
+        ]
+        with get_connection() as conn, conn.cursor() as cur:
+            missing -= len(insert_incidents(cur, care_home_id, batch, skip_existing=True))
+    if size > stored:
+        print(f"Seeded care home {care_home_id} with {size - stored:,} incidents in {time.perf_counter() - started:.1f}s")
+        with get_connection() as conn, conn.cursor() as cur:
+            cur.execute("ANALYZE incidents")
+    return care_home_id
+
+
+# ---------------------------
+# Operations
+# ---------------------------
+class _ByteCounter:
+    """Binary sink for the CSV export; counts bytes instead of keeping them."""
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.size += len(data)
+        return len(data)
+
+
+def _sample_incidents(care_home_id: int, limit: int) -> list[tuple[str, int]]:
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT incident_id, row_version
+            FROM incidents
+            WHERE care_home_id = %s AND NOT locked
+            ORDER BY random()
+            LIMIT %s
+            """,
+            (care_home_id, limit),
+        )
+        return cur.fetchall()
+
+
+def make_operation(name: str, care_home_id: int, sample: list[tuple[str, int]], worker: int, workers: int):
+    """Returns a no-argument callable running `name` once, with per-thread state."""
+    rng = random.Random(worker)
+    if name == "submit":
+        def op():
+            incident = Incident.from_record(synthetic_incident(rng, datetime.now()))
+            with get_connection() as conn, conn.cursor() as cur:
+                insert_incidents(cur, care_home_id, [incident])
+    elif name == "list_page":
+        def op():
+            fetch_incidents_page.uncached(care_home_id, IncidentFilters(), None, 50)
+    elif name == "sync_page":
+        def op():
+            op.page = sync_incidents_page(care_home_id, IncidentFilters(), None, 50, op.page)
+        op.page = None
+    elif name == "get_record":
+        def op():
+            get_incident_record.uncached(care_home_id, rng.choice(sample)[0])
+    elif name == "review":
+        # Each thread reviews its own incidents, so runs measure the write
+        # path rather than version conflicts between threads.
+        mine = {incident_id: version for incident_id, version in sample[worker::workers]}
+        order = list(mine)
+
+        def op():
+            incident_id = order[op.calls % len(order)]
+            op.calls += 1
+            mine[incident_id] = update_management_review(
+                care_home_id=care_home_id,
+                incident_id=incident_id,
+                expected_version=mine[incident_id],
+                reviewer_name="Benchmark reviewer",
+                reviewer_role="Registered manager",
+                review_outcome=f"Benchmark review {op.calls}",
+                signoff_decision="Further action required",
+                signoff_timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                management_review_status="Completed",
+                actor="benchmark",
+            )
+        op.calls = 0
+    elif name == "export_csv":
+        def op():
+            export_incidents_csv(care_home_id, _ByteCounter())
+    elif name == "duplicates":
+        def op():
+            incident = Incident.from_record(synthetic_incident(rng, datetime.now() - timedelta(days=rng.randint(0, 365))))
+            find_possible_duplicates(care_home_id, incident)
+    else:
+        raise ValueError(f"Unknown operation: {name}")
+    return op
+
+
+def run(name: str, size: int, care_home_id: int, concurrency: int, seconds: float) -> RunResult:
+    """Runs `name` from `concurrency` threads for about `seconds`; every thread completes at least one call."""
+    sample = _sample_incidents(care_home_id, max(REVIEW_SAMPLE_SIZE, concurrency))
+    ops = [make_operation(name, care_home_id, sample, n, concurrency) for n in range(concurrency)]
+    latencies = [[] for _ in range(concurrency)]
+    errors = [Counter() for _ in range(concurrency)]
+    start = threading.Barrier(concurrency + 1)
+    deadline = 0.0
+
+    def worker(n: int) -> None:
+        start.wait()
+        while True:
+            t0 = time.perf_counter()
+            try:
+                ops[n]()
+            except Exception as exc:
+                errors[n][type(exc).__name__] += 1
+            else:
+                latencies[n].append(time.perf_counter() - t0)
+            if time.perf_counter() >= deadline:
+                return
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    began = time.perf_counter()
+    deadline = began + seconds
+    start.wait()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - began
+
+    all_latencies = sorted(x * 1000 for per_thread in latencies for x in per_thread)
+    all_errors = sum(errors, Counter())
+    return RunResult(
+        operation=name,
+        size=size,
+        concurrency=concurrency,
+        ops=len(all_latencies),
+        errors=dict(all_errors),
+        seconds=round(elapsed, 3),
+        throughput_per_s=round(len(all_latencies) / elapsed, 2) if elapsed else 0.0,
+        latency_ms={
+            "p50": round(percentile(all_latencies, 50), 3),
+            "p95": round(percentile(all_latencies, 95), 3),
+            "p99": round(percentile(all_latencies, 99), 3),
+            "mean": round(sum(all_latencies) / len(all_latencies), 3) if all_latencies else 0.0,
+            "max": round(all_latencies[-1], 3) if all_latencies else 0.0,
+        },
+    )
+
+
+# ---------------------------
+# Comparing runs
+# ---------------------------
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    """Returns a line per run whose p95 latency is more than `tolerance` worse than the baseline's."""
+    before = {(r["operation"], r["size"], r["concurrency"]): r for r in baseline}
+    regressions = []
+    for r in results:
+        old = before.get((r["operation"], r["size"], r["concurrency"]))
+        if not old or not old["latency_ms"]["p95"]:
+            continue
+        ratio = r["latency_ms"]["p95"] / old["latency_ms"]["p95"]
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{r['operation']} at {r['size']:,} incidents x{r['concurrency']}: p95 "
+                f"{old['latency_ms']['p95']:.2f} -> {r['latency_ms']['p95']:.2f} ms ({ratio - 1:+.0%})"
+            )
+    return regressions
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _int_list(text: str) -> list[int]:
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the incident data layer against a throwaway database.")
+    parser.add_argument("--database-url", required=True, help="libpq connection string of a throwaway database")
+    parser.add_argument("--sizes", type=_int_list, default=[1000, 10000, 100000], help="incidents per care home")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 10, 50], help="concurrent sessions")
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each run")
+    parser.add_argument("--operations", default=",".join(OPERATIONS), help=f"subset of {','.join(OPERATIONS)}")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="JSON results file")
+    parser.add_argument("--compare", help="earlier results file to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown before failing")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for synthetic incidents")
+    args = parser.parse_args(argv)
+
+    operations = [op.strip() for op in args.operations.split(",") if op.strip()]
+    unknown = set(operations) - set(OPERATIONS)
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(sorted(unknown))}")
+
+    # The pool reads DATABASE_URL through get_setting() when first used; a
+    # secrets.toml setting would win over the environment, so make sure it does not.
+    os.environ["DATABASE_URL"] = args.database_url
+    if get_setting("DATABASE_URL") != args.database_url:
+        print("❌ Streamlit secrets set DATABASE_URL; run the benchmark from a directory without .streamlit/secrets.toml.")
+        return 2
+
+    print("=== Incident Data Layer Benchmark ===")
+    started_at = datetime.now().isoformat(timespec="seconds")
+    init_db()
+    check_throwaway_database()
+    with get_connection() as conn:
+        server_version = conn.server_version
+    rng = random.Random(args.seed)
+    homes = {size: seed_home(size, rng) for size in args.sizes}
+
+    results = []
+    for size in args.sizes:
+        for name in operations:
+            for concurrency in args.concurrency:
+                result = run(name, size, homes[size], concurrency, args.seconds)
+                print(result.summary())
+                results.append(asdict(result))
+
+    report = {
+        "started_at": started_at,
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "postgres": server_version,
+        "pool": get_pool().stats(),
+        "seconds_per_run": args.seconds,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ {len(results)} runs written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)["results"], args.tolerance)
+        for line in regressions:
+            print(f"❌ {line}")
+        if regressions:
+            return 1
+        print(f"✅ No p95 regressions beyond {args.tolerance:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
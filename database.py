@@ -1,89 +1,365 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
 import streamlit as st
 import psycopg2
 
+from instrumentation import QueryMetrics, connect, start_metrics_server
+
+
+# =================================================
+# SETTINGS
+# =================================================
+def get_setting(name: str, default=None):
+    """
+    Reads a setting from Streamlit secrets, falling back to the environment.
+    The environment fallback lets command-line scripts share the app's data layer.
+    """
+    try:
+        if name in st.secrets:
+            return st.secrets[name]
+    except FileNotFoundError:
+        pass
+    return os.environ.get(name, default)
+
+
+# =================================================
+# CONNECTION POOL
+# =================================================
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the checkout timeout."""
+
+
+# Errors that mean "try again later" rather than "this row is bad".
+TRANSIENT_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError, PoolTimeout)
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of Postgres connections.
+
+    Streamlit runs each browser session on its own thread, so every session
+    checks a connection out for the duration of one query helper and hands it
+    back afterwards. Connections idle for longer than `health_check_after`
+    seconds are pinged before reuse, and broken connections are replaced.
+    With `metrics`, every statement on a pooled connection is timed.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        minconn: int = 1,
+        maxconn: int = 10,
+        timeout: float = 10.0,
+        health_check_after: float = 30.0,
+        metrics: QueryMetrics | None = None,
+    ):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Pool sizes must satisfy 0 <= minconn <= maxconn and maxconn >= 1.")
+
+        self._dsn = dsn
+        self._maxconn = maxconn
+        self._timeout = timeout
+        self._health_check_after = health_check_after
+        self._metrics = metrics
+
+        self._cond = threading.Condition()
+        self._idle = []  # (connection, returned_at) pairs, most recently used last
+        self._size = 0
+        self._waiters = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "timeouts": 0,
+            "connects": 0,
+            "reconnects": 0,
+            "discarded": 0,
+        }
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._size += 1
+            self._stats["connects"] += 1
+
+    def _connect(self):
+        conn = connect(self._dsn, self._metrics) if self._metrics else psycopg2.connect(self._dsn)
+        conn.autocommit = False
+        return conn
+
+    def _is_healthy(self, conn, returned_at: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self._health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self, timeout: float | None = None):
+        """
+        Checks a connection out of the pool, opening a new one if the pool
+        is below its limit. Blocks up to `timeout` seconds when the pool is
+        exhausted and raises PoolTimeout after that.
+        """
+        timeout = self._timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        conn, returned_at = None, None
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("Connection pool is closed.")
+                # Sessions already queued get first claim on returned
+                # connections, so a busy session cannot starve the others.
+                if self._idle and (waited or not self._waiters):
+                    conn, returned_at = self._idle.pop()
+                    break
+                if self._idle:
+                    self._cond.notify()
+                elif self._size < self._maxconn:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No database connection became free within {timeout:.1f}s "
+                        f"({self._maxconn} in use)."
+                    )
+                waited = True
+                self._waiters += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiters -= 1
+
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_seconds"] += time.monotonic() - started
+
+        # Health checks and connects happen outside the lock so a slow
+        # network round-trip never blocks other sessions' checkouts.
+        if conn is not None and not self._is_healthy(conn, returned_at):
+            self._close_quietly(conn)
+            conn = None
+            with self._cond:
+                self._stats["reconnects"] += 1
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._stats["connects"] += 1
+
+        return conn
+
+    def putconn(self, conn, close: bool = False) -> None:
+        """
+        Returns a connection to the pool. Connections that are closed, left
+        mid-transaction in an unknown state, or flagged with `close` are
+        discarded so the next checkout opens a fresh one.
+        """
+        if not close and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                close = True
+
+        with self._cond:
+            if close or conn.closed or self._closed:
+                self._close_quietly(conn)
+                self._size -= 1
+                self._stats["discarded"] += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self) -> dict:
+        """Snapshot of pool usage metrics."""
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiters,
+                "max": self._maxconn,
+                **self._stats,
+            }
+
+    def close(self) -> None:
+        """Closes idle connections and refuses further checkouts."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close_quietly(conn)
+                self._size -= 1
+            self._cond.notify_all()
+
 
 # =================================================
 # DATABASE CONNECTION
 # =================================================
 @st.cache_resource
-def get_connection():
+def get_query_metrics() -> QueryMetrics:
+    """
+    Returns the process-wide query metrics. Queries slower than
+    SLOW_QUERY_MS (default 500) are logged. With METRICS_PORT set, the
+    metrics are also served as Prometheus text at /metrics on that port
+    (bound to METRICS_HOST, default 127.0.0.1).
+    """
+    metrics = QueryMetrics(slow_query_seconds=float(get_setting("SLOW_QUERY_MS", 500)) / 1000)
+    port = get_setting("METRICS_PORT")
+    if port:
+        start_metrics_server(metrics, int(port), get_setting("METRICS_HOST", "127.0.0.1"))
+    return metrics
+
+
+@st.cache_resource
+def get_pool() -> ConnectionPool:
+    """
+    Returns the process-wide connection pool, sized from secrets or the environment:
+    DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT (seconds) and DB_HEALTH_CHECK_AFTER (seconds).
+    """
+    metrics = get_query_metrics()
+    pool = ConnectionPool(
+        get_setting("DATABASE_URL"),
+        minconn=int(get_setting("DB_POOL_MIN", 1)),
+        maxconn=int(get_setting("DB_POOL_MAX", 10)),
+        timeout=float(get_setting("DB_POOL_TIMEOUT", 10)),
+        health_check_after=float(get_setting("DB_HEALTH_CHECK_AFTER", 30)),
+        metrics=metrics,
+    )
+    metrics.register_collector("db_pool", pool.stats)
+    return pool
+
+
+@contextmanager
+def get_connection(timeout: float | None = None):
     """
-    Returns a cached Postgres connection using Streamlit secrets.
-    Autocommit is enabled to avoid failed-transaction issues.
+    Checks a pooled Postgres connection out for the duration of a `with` block.
+    Commits when the block exits cleanly and rolls back if it raises, so a
+    failed statement never leaves the connection in an aborted transaction.
+    Connections broken by network errors are discarded rather than reused.
     """
-    conn = psycopg2.connect(st.secrets["DATABASE_URL"])
-    conn.autocommit = True
-    return conn
+    pool = get_pool()
+    conn = pool.getconn(timeout)
+    broken = False
+    try:
+        yield conn
+        conn.commit()
+    except BaseException as exc:
+        broken = isinstance(exc, (psycopg2.OperationalError, psycopg2.InterfaceError))
+        if not conn.closed:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+        raise
+    finally:
+        pool.putconn(conn, close=broken or bool(conn.closed))
 
 
 # =================================================
-# INITIALISE DATABASE SCHEMA
+# SCHEMA MIGRATIONS
 # =================================================
-def init_db():
-    """
-    Creates required tables and columns if they do not already exist.
-    Safe to run on every app start.
-    """
-    conn = get_connection()
-    cur = conn.cursor()
-
-    # -----------------------------
-    # USERS TABLE (AUTHENTICATION)
-    # -----------------------------
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id SERIAL PRIMARY KEY,
-            care_home_id INTEGER NOT NULL,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            role TEXT NOT NULL CHECK (role IN ('staff', 'manager')),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-    """)
-
-    # -----------------------------
-    # INCIDENTS TABLE (CORE DATA)
-    # -----------------------------
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS incidents (
-            id SERIAL PRIMARY KEY,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            care_home_id INTEGER NOT NULL,
-            incident_type TEXT,
-            description TEXT,
-            completed_by_name TEXT,
-            completed_by_role TEXT
-        );
-    """)
-
-    # -----------------------------
-    # MANAGEMENT REVIEW FIELDS
-    # (added safely via ALTER)
-    # -----------------------------
-    cur.execute("""
-        ALTER TABLE incidents
-        ADD COLUMN IF NOT EXISTS reviewed_by TEXT;
-    """)
-
-    cur.execute("""
-        ALTER TABLE incidents
-        ADD COLUMN IF NOT EXISTS review_outcome TEXT;
-    """)
-
-    cur.execute("""
-        ALTER TABLE incidents
-        ADD COLUMN IF NOT EXISTS signoff_decision TEXT;
-    """)
-
-    cur.execute("""
-        ALTER TABLE incidents
-        ADD COLUMN IF NOT EXISTS signed_off_at TIMESTAMP;
-    """)
-
-    cur.execute("""
-        ALTER TABLE incidents
-        ADD COLUMN IF NOT EXISTS locked BOOLEAN DEFAULT FALSE;
-    """)
-
-    cur.close()
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+# Arbitrary constant shared by every app replica; pg_advisory_lock keys are
+# database-wide, so only one process applies migrations at a time.
+MIGRATION_LOCK_KEY = 7_301_202_401
+
 
+def load_migrations(directory: str = MIGRATIONS_DIR) -> list[tuple[int, str, str]]:
+    """
+    Returns (version, name, sql) for every NNNN_name.sql file, in version order.
+    """
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(filename)
+        version, _, name = stem.partition("_")
+        if ext != ".sql" or not version.isdigit():
+            continue
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            migrations.append((int(version), name, f.read()))
+
+    versions = [m[0] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration version numbers in {directory}.")
+    return sorted(migrations)
+
+
+def run_migrations(conn) -> list[str]:
+    """
+    Applies pending migrations in order, each in its own transaction, while
+    holding a session-level advisory lock. Returns the names applied.
+    """
+    applied_now = []
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+        try:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            cur.execute("SELECT version FROM schema_version")
+            applied = {row[0] for row in cur.fetchall()}
+            conn.commit()
+
+            for version, name, sql in load_migrations():
+                if version in applied:
+                    continue
+                cur.execute(sql)
+                cur.execute(
+                    "INSERT INTO schema_version (version, name) VALUES (%s, %s)",
+                    (version, name),
+                )
+                conn.commit()
+                applied_now.append(f"{version:04d}_{name}")
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+            conn.commit()
+    return applied_now
+
+
+# =================================================
+# INITIALISE DATABASE SCHEMA
+# =================================================
+@st.cache_resource
+def init_db() -> list[str]:
+    """
+    Brings the schema up to date by applying pending migrations.
+    Cached per process, so Streamlit reruns send no DDL to Postgres.
+    """
+    with get_connection() as conn:
+        return run_migrations(conn)
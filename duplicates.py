@@ -0,0 +1,97 @@
+# duplicates.py
+"""
+Possible-duplicate check for new incident reports.
+
+The same event is often reported twice, e.g. by the carer who found the
+resident and by the nurse in charge. Before a report is queued, the form
+asks find_possible_duplicates() for the same resident's incidents dated
+within a day of it, using the (care home, resident, incident date) index
+from migrations/0015, and compares the accounts by their MinHash
+signatures: each stored incident's sketch is precomputed by the database,
+so a check costs one small index scan however much history the home has.
+
+A candidate is reported if the accounts share much of their wording, or
+if it is the same category at the same location within a couple of hours.
+Incidents still in the write queue's spool, or archived, are not checked.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import NamedTuple
+
+from database import get_connection
+from incidents import Incident
+
+# Incidents dated this many days either side of the new one are compared.
+DUPLICATE_WINDOW_DAYS = 1
+
+# Estimated share of two-word shingles in common above which accounts match.
+DUPLICATE_SIMILARITY = 0.35
+
+# Same category and location within this long also counts as a match.
+DUPLICATE_SAME_PLACE_WITHIN = timedelta(hours=2)
+
+
+class PossibleDuplicate(NamedTuple):
+    incident_id: str
+    incident_date: date
+    incident_time: time | None
+    category: str
+    location: str | None
+    reported_by_name: str
+    reported_by_role: str
+    similarity: float  # estimated, 0-1
+
+    def summary(self) -> str:
+        when = f"{self.incident_date} {self.incident_time:%H:%M}" if self.incident_time else f"{self.incident_date}"
+        return (
+            f"{self.incident_id}: {self.category} at {self.location}, {when}, reported by "
+            f"{self.reported_by_name} ({self.reported_by_role}); {self.similarity:.0%} of the account wording in common"
+        )
+
+
+def _same_place_and_time(incident: Incident, candidate: PossibleDuplicate) -> bool:
+    if candidate.category != incident.category or None in (candidate.incident_time, incident.incident_time):
+        return False
+    if (candidate.location or "").strip().casefold() != incident.location.strip().casefold():
+        return False
+    apart = datetime.combine(candidate.incident_date, candidate.incident_time) - datetime.combine(
+        incident.incident_date, incident.incident_time
+    )
+    return abs(apart) <= DUPLICATE_SAME_PLACE_WITHIN
+
+
+def find_possible_duplicates(care_home_id: int, incident: Incident, limit: int = 5) -> list[PossibleDuplicate]:
+    """
+    Stored incidents of the same resident, dated within DUPLICATE_WINDOW_DAYS,
+    that look like the same event as `incident`; most similar account first.
+    """
+    window = timedelta(days=DUPLICATE_WINDOW_DAYS)
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT i.incident_id, i.incident_date, i.incident_time, i.category, i.location,
+                   i.reported_by_name, i.reported_by_role,
+                   incident_account_similarity(i.account_signature, q.signature)
+            FROM incidents AS i, incident_account_signature(%s) AS q(signature)
+            WHERE i.care_home_id = %s
+              AND lower(i.resident_identifier) = lower(%s)
+              AND i.incident_date BETWEEN %s AND %s
+              AND i.incident_id IS NOT NULL
+              AND i.incident_id <> %s
+            """,
+            (
+                incident.incident_account,
+                care_home_id,
+                incident.resident_identifier,
+                incident.incident_date - window,
+                incident.incident_date + window,
+                incident.incident_id,
+            ),
+        )
+        candidates = [PossibleDuplicate._make(row) for row in cur.fetchall()]
+
+    matches = [
+        c for c in candidates
+        if c.similarity >= DUPLICATE_SIMILARITY or _same_place_and_time(incident, c)
+    ]
+    matches.sort(key=lambda c: c.similarity, reverse=True)
+    return matches[:limit]
@@ -0,0 +1,476 @@
+"""
+Review deadlines for pending incidents, and escalation digests.
+
+Each severity has a deadline for management review, counted from
+submission (ESCALATION_HOURS; by default Critical 4h, High 24h, Moderate
+3 days, Low 7 days). A scheduler thread in the app checks every
+ESCALATION_INTERVAL_SECONDS for pending incidents past their deadline,
+records each in incident_escalations (migrations/0014) and sends every
+affected care home a digest of its newly overdue incidents.
+
+A cycle is one statement for all care homes: a scan of the partial index
+of pending incidents (only the review backlog), feeding an INSERT ... ON
+CONFLICT DO NOTHING, so an incident is escalated once. Digests go to
+every configured sink (ESCALATION_SINKS): a JSON lines file, an email
+outbox directory a mail relay picks up, or a webhook. Escalations are
+marked notified only once their digest has been delivered; a failed
+delivery is retried next cycle, so a sink may see a digest more than once,
+unless the incident has been reviewed by then (the escalation is then
+withdrawn). Escalations are committed before any digest is sent, so a
+slow sink holds no locks on the tables; a session advisory lock keeps
+replicas from running cycles at the same time.
+
+Usage (one cycle, e.g. from cron when the app's scheduler is turned off):
+    python escalation.py [--dry-run]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.request
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import NamedTuple
+
+import streamlit as st
+
+from database import TRANSIENT_ERRORS, get_connection, get_query_metrics, get_setting
+from incidents import SEVERITIES
+
+logger = logging.getLogger(__name__)
+
+# Hours from submission to review deadline; ESCALATION_HOURS overrides them.
+DEFAULT_REVIEW_HOURS = {"Critical": 4, "High": 24, "Moderate": 72, "Low": 168}
+
+# Arbitrary constant shared by every app replica (see database.MIGRATION_LOCK_KEY).
+ESCALATION_LOCK_KEY = 7_301_202_402
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Pending incidents past their severity's deadline, read from the partial
+# index incidents_pending_severity_submitted_idx rather than the table.
+DUE_SQL = """
+    SELECT i.care_home_id, i.incident_id, i.severity, i.submitted_timestamp,
+           i.submitted_timestamp + d.allowed AS due_at
+    FROM unnest(%(severities)s::text[], %(cutoffs)s::timestamp[], %(allowed)s::interval[])
+        AS d (severity, cutoff, allowed)
+    CROSS JOIN LATERAL (
+        SELECT care_home_id, incident_id, severity, submitted_timestamp
+        FROM incidents
+        WHERE management_review_status = 'Pending'
+          AND severity = d.severity
+          AND submitted_timestamp < d.cutoff
+          AND incident_id IS NOT NULL
+    ) i
+"""
+
+# Escalations from earlier cycles whose digest was not delivered, and whose
+# incident is no longer pending review: they are not sent again.
+WITHDRAW_SQL = """
+    UPDATE incident_escalations AS e
+    SET withdrawn_at = now()
+    WHERE e.notified_at IS NULL
+      AND e.withdrawn_at IS NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM incidents AS i
+          WHERE i.care_home_id = e.care_home_id
+            AND i.incident_id = e.incident_id
+            AND i.management_review_status = 'Pending'
+      )
+"""
+
+# Records the newly overdue, and returns them with any escalations from
+# earlier cycles whose digest was not delivered (WITHDRAW_SQL runs first).
+# The second SELECT runs on the statement's snapshot, so it never sees the
+# rows just inserted.
+ESCALATE_SQL = f"""
+    WITH due AS ({DUE_SQL}),
+    new AS (
+        INSERT INTO incident_escalations (care_home_id, incident_id, severity, submitted_timestamp, due_at)
+        SELECT care_home_id, incident_id, severity, submitted_timestamp, due_at FROM due
+        ON CONFLICT (care_home_id, incident_id) DO NOTHING
+        RETURNING id, care_home_id, incident_id, severity, submitted_timestamp, due_at
+    ),
+    unsent AS (
+        SELECT *, true AS is_new FROM new
+        UNION ALL
+        SELECT id, care_home_id, incident_id, severity, submitted_timestamp, due_at, false
+        FROM incident_escalations
+        WHERE notified_at IS NULL AND withdrawn_at IS NULL
+    )
+    SELECT u.id, u.care_home_id, h.name, u.incident_id, u.severity, u.submitted_timestamp, u.due_at, u.is_new
+    FROM unsent u
+    JOIN care_homes h ON h.id = u.care_home_id
+    ORDER BY u.care_home_id, u.due_at, u.id
+"""
+
+# Dry run: what the next cycle would escalate, without recording it.
+PREVIEW_SQL = f"""
+    SELECT NULL, due.care_home_id, h.name, due.incident_id, due.severity,
+           due.submitted_timestamp, due.due_at, true
+    FROM ({DUE_SQL}) due
+    JOIN care_homes h ON h.id = due.care_home_id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM incident_escalations e
+        WHERE e.care_home_id = due.care_home_id AND e.incident_id = due.incident_id
+    )
+    ORDER BY due.care_home_id, due.due_at
+"""
+
+
+def review_deadlines(setting: str | None = None) -> dict[str, timedelta]:
+    """
+    Review deadline per severity. ESCALATION_HOURS (e.g. "Critical=2,High=12")
+    overrides the defaults for the severities it lists; 0 stops escalating one.
+    """
+    hours = dict(DEFAULT_REVIEW_HOURS)
+    if setting is None:
+        setting = get_setting("ESCALATION_HOURS", "")
+    for item in filter(None, (part.strip() for part in setting.split(","))):
+        severity, _, value = item.partition("=")
+        severity = severity.strip()
+        if severity not in SEVERITIES:
+            raise ValueError(f"ESCALATION_HOURS: unknown severity {severity!r}")
+        hours[severity] = float(value)
+    return {severity: timedelta(hours=h) for severity, h in hours.items() if h > 0}
+
+
+# ---------------------------
+# Digests
+# ---------------------------
+class Escalation(NamedTuple):
+    escalation_id: int | None
+    incident_id: str
+    severity: str
+    submitted_timestamp: datetime
+    due_at: datetime
+    is_new: bool
+
+
+@dataclass
+class EscalationDigest:
+    """The incidents of one care home to report as overdue for review."""
+
+    care_home_id: int
+    care_home: str
+    escalations: list[Escalation] = field(default_factory=list)
+
+    @property
+    def subject(self) -> str:
+        count = len(self.escalations)
+        return f"{self.care_home}: {count} incident{'s' if count != 1 else ''} overdue for management review"
+
+    def text(self, now: datetime | None = None) -> str:
+        now = now or datetime.now()
+        lines = [self.subject, ""]
+        for e in self.escalations:
+            overdue = (now - e.due_at).total_seconds() / 3600
+            lines.append(
+                f"- {e.incident_id} ({e.severity}): submitted {e.submitted_timestamp:%Y-%m-%d %H:%M}, "
+                f"review due {e.due_at:%Y-%m-%d %H:%M} ({overdue:.0f}h overdue)"
+            )
+        lines += ["", "Open the inspection page to review and sign off these incidents."]
+        return "\n".join(lines)
+
+    def as_json(self) -> dict:
+        return {
+            "care_home_id": self.care_home_id,
+            "care_home": self.care_home,
+            "subject": self.subject,
+            "incidents": [
+                {
+                    "incident_id": e.incident_id,
+                    "severity": e.severity,
+                    "submitted_timestamp": e.submitted_timestamp.isoformat(),
+                    "due_at": e.due_at.isoformat(),
+                }
+                for e in self.escalations
+            ],
+        }
+
+
+def group_digests(rows) -> list[EscalationDigest]:
+    """One digest per care home from ESCALATE_SQL / PREVIEW_SQL rows (ordered by care home)."""
+    digests = []
+    for escalation_id, home, name, incident_id, severity, submitted, due_at, is_new in rows:
+        if not digests or digests[-1].care_home_id != home:
+            digests.append(EscalationDigest(home, name))
+        digests[-1].escalations.append(Escalation(escalation_id, incident_id, severity, submitted, due_at, is_new))
+    return digests
+
+
+# ---------------------------
+# Sinks
+# ---------------------------
+# A sink has a `name` and send(digest), which raises if the digest was not delivered.
+class FileSink:
+    """Appends each digest as a line of JSON."""
+
+    def __init__(self, path: str):
+        self.name = f"file:{path}"
+        self._path = path
+        self._lock = threading.Lock()
+
+    def send(self, digest: EscalationDigest) -> None:
+        line = json.dumps({"sent_at": datetime.now().isoformat(), **digest.as_json()})
+        with self._lock, open(self._path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class EmailOutboxSink:
+    """
+    Writes each digest as an .eml file into a directory for a mail relay
+    (or an operator) to send; no SMTP connection is made from the app.
+    """
+
+    def __init__(self, directory: str, sender: str, recipients: str):
+        self.name = f"email:{directory}"
+        self._directory = directory
+        self._sender = sender
+        self._recipients = recipients
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, digest: EscalationDigest) -> None:
+        message = EmailMessage()
+        message["From"] = self._sender
+        message["To"] = self._recipients
+        message["Subject"] = digest.subject
+        message.set_content(digest.text())
+        stem = f"{datetime.now():%Y%m%d-%H%M%S-%f}-home{digest.care_home_id}"
+        # Written under a temporary name, so the relay never picks up half a message.
+        partial = os.path.join(self._directory, f".{stem}.tmp")
+        with open(partial, "wb") as f:
+            f.write(message.as_bytes())
+        os.replace(partial, os.path.join(self._directory, f"{stem}.eml"))
+
+
+class WebhookSink:
+    """POSTs each digest as JSON; any non-2xx response counts as undelivered."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.name = f"webhook:{url}"
+        self._url = url
+        self._timeout = timeout
+
+    def send(self, digest: EscalationDigest) -> None:
+        request = urllib.request.Request(
+            self._url,
+            data=json.dumps(digest.as_json()).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self._timeout):
+            pass
+
+
+def sinks_from_setting(setting: str | None = None) -> list:
+    """
+    Builds the sinks listed in ESCALATION_SINKS, comma-separated
+    `file:PATH`, `email:DIRECTORY` or `webhook:URL` (default a
+    .escalations.jsonl file next to the app).
+    """
+    if setting is None:
+        setting = get_setting("ESCALATION_SINKS", f"file:{os.path.join(APP_DIR, '.escalations.jsonl')}")
+    sinks = []
+    for item in filter(None, (part.strip() for part in setting.split(","))):
+        kind, _, target = item.partition(":")
+        if kind == "file":
+            sinks.append(FileSink(target))
+        elif kind == "email":
+            sinks.append(EmailOutboxSink(
+                target,
+                sender=get_setting("ESCALATION_EMAIL_FROM", "incidents@localhost"),
+                recipients=get_setting("ESCALATION_EMAIL_TO", "managers@localhost"),
+            ))
+        elif kind == "webhook":
+            sinks.append(WebhookSink(target))
+        else:
+            raise ValueError(f"ESCALATION_SINKS: unknown sink {item!r} (use file:, email: or webhook:)")
+    return sinks
+
+
+# ---------------------------
+# Cycle
+# ---------------------------
+@dataclass
+class EscalationReport:
+    escalated: int = 0  # incidents newly past their deadline
+    digests: list = field(default_factory=list)
+    delivered: int = 0  # escalations marked notified
+    failures: list = field(default_factory=list)  # (care home ID, sink, error)
+    skipped: bool = False  # another process was running a cycle
+    dry_run: bool = False
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        if self.skipped:
+            return "skipped: another process is running an escalation cycle"
+        if self.dry_run:
+            return f"{self.escalated} incidents would be escalated across {len(self.digests)} care homes"
+        return (
+            f"{self.escalated} incidents escalated; {self.delivered} notifications delivered in "
+            f"{len(self.digests) - len(self.failures)} of {len(self.digests)} digests in {self.seconds:.2f}s"
+        )
+
+
+def _deadline_params(deadlines: dict[str, timedelta], now: datetime) -> dict:
+    # submitted_timestamp is the app server's local time, as is `now`.
+    return {
+        "severities": list(deadlines),
+        "cutoffs": [now - allowed for allowed in deadlines.values()],
+        "allowed": list(deadlines.values()),
+    }
+
+
+def run_escalation_cycle(
+    sinks: list,
+    deadlines: dict[str, timedelta] | None = None,
+    now: datetime | None = None,
+    dry_run: bool = False,
+) -> EscalationReport:
+    """
+    Escalates every pending incident past its deadline and delivers one
+    digest per care home to each sink. The escalations are committed before
+    any digest is sent, and marked notified in a second transaction once
+    delivered. A session advisory lock, held across both, keeps another
+    process from sending the same digests meanwhile.
+    """
+    report = EscalationReport(dry_run=dry_run)
+    started = time.perf_counter()
+    params = _deadline_params(deadlines if deadlines is not None else review_deadlines(), now or datetime.now())
+
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT pg_try_advisory_lock(%s)", (ESCALATION_LOCK_KEY,))
+        if not cur.fetchone()[0]:
+            report.skipped = True
+            return report
+        try:
+            if not dry_run:
+                cur.execute(WITHDRAW_SQL)
+            cur.execute(PREVIEW_SQL if dry_run else ESCALATE_SQL, params)
+            report.digests = group_digests(cur.fetchall())
+            report.escalated = sum(e.is_new for d in report.digests for e in d.escalations)
+            conn.commit()
+            if dry_run:
+                return report
+
+            delivered = []
+            for digest in report.digests:
+                try:
+                    for sink in sinks:
+                        sink.send(digest)
+                except Exception as exc:
+                    logger.warning("Escalation digest for care home %s not delivered: %s", digest.care_home_id, exc)
+                    report.failures.append((digest.care_home_id, sink.name, str(exc)))
+                    continue
+                delivered += [e.escalation_id for e in digest.escalations]
+            if delivered:
+                cur.execute("UPDATE incident_escalations SET notified_at = now() WHERE id = ANY(%s)", (delivered,))
+                conn.commit()
+            report.delivered = len(delivered)
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s)", (ESCALATION_LOCK_KEY,))
+            conn.commit()
+
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+# ---------------------------
+# Scheduler thread
+# ---------------------------
+class EscalationScheduler:
+    """Runs an escalation cycle every `interval` seconds on a daemon thread."""
+
+    def __init__(self, sinks: list, interval: float, max_backoff: float = 300.0):
+        self._sinks = sinks
+        self._interval = interval
+        self._max_backoff = max_backoff
+        self._stats = {"cycles": 0, "skipped_cycles": 0, "escalated": 0, "delivered": 0, "failed_digests": 0}
+        self._last_run = None
+        self._last_error = None
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="incident-escalations", daemon=True)
+            self._thread.start()
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self._interval,
+            "seconds_since_last_cycle": time.time() - self._last_run if self._last_run else 0.0,
+            "last_error": self._last_error,
+            **self._stats,
+        }
+
+    def run_once(self) -> EscalationReport:
+        report = run_escalation_cycle(self._sinks)
+        self._stats["cycles"] += 1
+        self._stats["skipped_cycles"] += report.skipped
+        self._stats["escalated"] += report.escalated
+        self._stats["delivered"] += report.delivered
+        self._stats["failed_digests"] += len(report.failures)
+        self._last_run = time.time()
+        if report.escalated or report.failures:
+            logger.info("Escalation cycle: %s", report.summary())
+        return report
+
+    def _run(self) -> None:
+        backoff = self._interval
+        while True:
+            try:
+                self.run_once()
+                self._last_error = None
+                backoff = self._interval
+            except TRANSIENT_ERRORS as exc:
+                self._last_error = str(exc).strip() or type(exc).__name__
+                backoff = min(backoff * 2, max(self._max_backoff, self._interval))
+                logger.warning("Escalation cycle cannot reach Postgres; retrying in %.0fs", backoff)
+            except Exception:
+                logger.exception("Escalation cycle failed")
+            time.sleep(backoff)
+
+
+@st.cache_resource
+def get_escalation_scheduler() -> EscalationScheduler:
+    """
+    Returns the process-wide escalation scheduler, started unless
+    ESCALATION_INTERVAL_SECONDS is 0 (default 300). Every replica may run
+    one; the advisory lock lets only one cycle run at a time.
+    """
+    interval = float(get_setting("ESCALATION_INTERVAL_SECONDS", 300))
+    scheduler = EscalationScheduler(sinks_from_setting(), interval=interval)
+    if interval > 0:
+        scheduler.start()
+    get_query_metrics().register_collector("escalations", scheduler.stats)
+    return scheduler
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Escalate pending incidents past their review deadline.")
+    parser.add_argument("--dry-run", action="store_true", help="list what would be escalated; record and send nothing")
+    args = parser.parse_args(argv)
+
+    print("=== Incident Review Escalations ===")
+    deadlines = review_deadlines()
+    print("Review deadlines: " + ", ".join(f"{s} {d.total_seconds() / 3600:g}h" for s, d in deadlines.items()))
+    report = run_escalation_cycle(sinks_from_setting(), deadlines, dry_run=args.dry_run)
+    for digest in report.digests:
+        print(f"Care home {digest.care_home_id} ({digest.care_home}): {len(digest.escalations)} overdue")
+    for home, sink, error in report.failures:
+        print(f"❌ Care home {home}: {sink} failed: {error}")
+    prefix = "\n(dry run) " if report.dry_run else ("\n❌ " if report.failures else "\n✅ ")
+    print(prefix + report.summary())
+    return 1 if report.failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
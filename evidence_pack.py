@@ -0,0 +1,291 @@
+"""
+Inspection evidence packs: signed-off incidents rendered as PDFs.
+
+A pack covers one care home and incident date range. Each incident is
+rendered to its own paginated PDF, and the pack is a ZIP holding those
+PDFs plus an index PDF (cover page and contents table). Rendered incident
+PDFs are cached on disk under a hash of their content. Re-building a pack
+after one more sign-off therefore renders only that incident; the rest
+are copied from the cache. Renders run in parallel across a process pool.
+The cache keeps the most recently used PDFs up to EVIDENCE_CACHE_MB.
+
+Usage:
+    python evidence_pack.py --care-home-id 3 --from 2024-01-01 --to 2024-03-31 [-o pack.zip] [--workers 4]
+
+DATABASE_URL, EVIDENCE_CACHE_DIR, EVIDENCE_CACHE_MB and EVIDENCE_PACK_WORKERS
+are read from Streamlit secrets or the environment.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from database import get_connection, get_setting
+from incidents import INCIDENT_COLUMN_LIST, Incident
+
+# Bump whenever the incident layout changes so cached PDFs are re-rendered.
+RENDER_VERSION = 1
+
+SECTIONS = [
+    ("Incident", ["Incident date", "Incident time", "Category", "Severity", "Location"]),
+    ("Resident", ["Resident identifier", "Date of birth", "Room"]),
+    ("Incident account", ["Incident account"]),
+    ("Immediate response", ["Immediate actions taken", "Harm / injury sustained", "Harm / injury details",
+                            "Individuals / services informed"]),
+    ("Reported by", ["Reported by (name)", "Reported by (role)", "Submitted timestamp"]),
+    ("Learning", ["Immediate learning / actions"]),
+    ("Management review and sign-off", ["Management reviewer (name)", "Management reviewer (role)",
+                                        "Management review outcome", "Sign-off decision", "Sign-off timestamp"]),
+    ("Audit integrity", ["Audit integrity confirmation"]),
+]
+
+
+@dataclass
+class PackReport:
+    incidents: int = 0
+    rendered: int = 0
+    cached: int = 0
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.incidents} incidents in {self.seconds:.2f}s: "
+            f"{self.rendered} rendered, {self.cached} from cache"
+        )
+
+
+# ---------------------------
+# Loading
+# ---------------------------
+def load_signed_off_incidents(care_home_id: int, date_from: date, date_to: date) -> tuple[str, list[dict]]:
+    """
+    Returns the care home's name and its signed-off incidents in the range,
+    oldest first: those locked by an "Accepted" sign-off. Completed reviews
+    that asked for further action or re-opened the incident are left out.
+    """
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT name FROM care_homes WHERE id = %s", (care_home_id,))
+        row = cur.fetchone()
+        home_name = row[0] if row else f"Care home {care_home_id}"
+        cur.execute(
+            f"""
+            SELECT {INCIDENT_COLUMN_LIST}
+            FROM all_incidents
+            WHERE care_home_id = %s
+              AND locked
+              AND incident_date BETWEEN %s AND %s
+            ORDER BY incident_date, submitted_timestamp, id
+            """,
+            (care_home_id, date_from, date_to),
+        )
+        records = [Incident._make(row).to_record() for row in cur.fetchall()]
+    return home_name, records
+
+
+def content_hash(home_name: str, record: dict) -> str:
+    """Identifies a rendered incident PDF: same hash, same bytes."""
+    payload = json.dumps([RENDER_VERSION, home_name, record], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ---------------------------
+# Rendering
+# ---------------------------
+def _paragraph(text: str, style) -> Paragraph:
+    return Paragraph(escape(text or "–").replace("\n", "<br/>"), style)
+
+
+def render_incident_pdf(home_name: str, record: dict, path: str) -> None:
+    """Writes one incident to `path`. Runs in a worker process."""
+    styles = getSampleStyleSheet()
+    label_style = styles["BodyText"].clone("Label", fontName="Helvetica-Bold")
+    incident_id = record["Incident ID"]
+
+    def footer(canvas, doc):
+        canvas.saveState()
+        canvas.setFont("Helvetica", 8)
+        canvas.drawString(20 * mm, 10 * mm, f"{home_name} · {incident_id}")
+        canvas.drawRightString(A4[0] - 20 * mm, 10 * mm, f"Page {doc.page}")
+        canvas.restoreState()
+
+    story = [
+        Paragraph(f"Clinical / safety incident {escape(incident_id)}", styles["Title"]),
+        Paragraph(escape(home_name), styles["Heading3"]),
+    ]
+    for heading, labels in SECTIONS:
+        story.append(Paragraph(escape(heading), styles["Heading2"]))
+        rows = [[_paragraph(label, label_style), _paragraph(record.get(label, ""), styles["BodyText"])]
+                for label in labels]
+        table = Table(rows, colWidths=[50 * mm, 120 * mm])
+        table.setStyle(TableStyle([
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+            ("BACKGROUND", (0, 0), (0, -1), colors.whitesmoke),
+        ]))
+        story += [table, Spacer(1, 4 * mm)]
+
+    # Written under a temporary name so a crashed render never leaves a
+    # truncated PDF in the cache.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    SimpleDocTemplate(
+        tmp_path,
+        pagesize=A4,
+        title=f"Incident {incident_id}",
+        leftMargin=20 * mm,
+        rightMargin=20 * mm,
+        bottomMargin=18 * mm,
+    ).build(story, onFirstPage=footer, onLaterPages=footer)
+    os.replace(tmp_path, path)
+
+
+def render_index_pdf(home_name: str, date_from: date, date_to: date, records: list[dict], path: str) -> None:
+    """Cover page and contents table for the pack."""
+    styles = getSampleStyleSheet()
+    cell = styles["BodyText"].clone("Cell", fontSize=8, leading=10)
+    rows = [["Incident ID", "Date", "Category", "Severity", "Sign-off decision"]]
+    rows += [
+        [_paragraph(r["Incident ID"], cell), r["Incident date"], _paragraph(r["Category"], cell),
+         r["Severity"], _paragraph(r["Sign-off decision"], cell)]
+        for r in records
+    ]
+    table = Table(rows, colWidths=[55 * mm, 22 * mm, 45 * mm, 20 * mm, 35 * mm], repeatRows=1)
+    table.setStyle(TableStyle([
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("LINEBELOW", (0, 0), (-1, 0), 0.5, colors.black),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.whitesmoke]),
+    ]))
+    story = [
+        Paragraph("Inspection evidence pack", styles["Title"]),
+        Paragraph(escape(home_name), styles["Heading2"]),
+        Paragraph(f"Signed-off clinical / safety incidents dated {date_from} to {date_to}", styles["BodyText"]),
+        Paragraph(f"{len(records)} incidents · generated {datetime.now():%Y-%m-%d %H:%M}", styles["BodyText"]),
+        Spacer(1, 6 * mm),
+        table,
+    ]
+    SimpleDocTemplate(path, pagesize=A4, title="Inspection evidence pack").build(story)
+
+
+# ---------------------------
+# Building packs
+# ---------------------------
+def cache_dir() -> str:
+    path = get_setting("EVIDENCE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".evidence_cache"))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def prune_cache(directory: str, max_bytes: int, keep: set[str]) -> int:
+    """
+    Deletes the least recently used PDFs until the cache fits in
+    `max_bytes`, never those in `keep` (the pack just built). Returns the
+    number deleted.
+    """
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".pdf") and entry.is_file():
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    deleted = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path in keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # pruned by another process building a pack
+        total -= size
+        deleted += 1
+    return deleted
+
+
+def _render_job(job: tuple) -> None:
+    render_incident_pdf(*job)
+
+
+def build_evidence_pack(
+    care_home_id: int,
+    date_from: date,
+    date_to: date,
+    fileobj,
+    workers: int | None = None,
+) -> PackReport:
+    """
+    Writes the evidence pack ZIP for one care home and date range to a
+    binary file object. Only incidents without a cached PDF are rendered.
+    """
+    report = PackReport()
+    started = time.perf_counter()
+    home_name, records = load_signed_off_incidents(care_home_id, date_from, date_to)
+    report.incidents = len(records)
+
+    directory = cache_dir()
+    paths = [os.path.join(directory, content_hash(home_name, r) + ".pdf") for r in records]
+    jobs = []
+    for record, path in zip(records, paths):
+        try:
+            os.utime(path)  # marks a cached PDF as recently used, for prune_cache()
+        except FileNotFoundError:
+            jobs.append((home_name, record, path))
+    report.rendered, report.cached = len(jobs), len(records) - len(jobs)
+
+    if len(jobs) > 1:
+        workers = workers or int(get_setting("EVIDENCE_PACK_WORKERS", os.cpu_count() or 1))
+        # spawn, not fork: the app process runs many threads.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            list(pool.map(_render_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    else:
+        for job in jobs:
+            _render_job(job)
+
+    with zipfile.ZipFile(fileobj, "w", compression=zipfile.ZIP_STORED) as bundle:
+        with tempfile.TemporaryDirectory() as tmp:
+            index_path = os.path.join(tmp, "index.pdf")
+            render_index_pdf(home_name, date_from, date_to, records, index_path)
+            bundle.write(index_path, "00_index.pdf")
+        for n, (record, path) in enumerate(zip(records, paths), start=1):
+            bundle.write(path, f"{n:05d}_{record['Incident ID']}.pdf")
+
+    prune_cache(directory, int(float(get_setting("EVIDENCE_CACHE_MB", 500)) * 1024 * 1024), set(paths))
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Build an inspection evidence pack of signed-off incidents.")
+    parser.add_argument("--care-home-id", type=int, required=True)
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+    parser.add_argument("-o", "--output", help="ZIP file to write (default evidence_pack_<home>_<from>_<to>.zip)")
+    parser.add_argument("--workers", type=int, default=None, help="rendering processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    output = args.output or f"evidence_pack_{args.care_home_id}_{args.date_from}_{args.date_to}.zip"
+    print("=== Inspection Evidence Pack ===")
+    with open(output, "wb") as f:
+        report = build_evidence_pack(args.care_home_id, args.date_from, args.date_to, f, workers=args.workers)
+    print(f"✅ {output}: {report.summary()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
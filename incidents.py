@@ -0,0 +1,686 @@
+# incidents.py
+"""
+Incident data access layer shared by the Streamlit pages.
+Every helper checks a pooled connection out through database.get_connection()
+and is scoped to one care home: its first argument is the care_home_id.
+"""
+import secrets
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from types import UnionType
+from typing import TYPE_CHECKING, Annotated, NamedTuple, get_args, get_type_hints
+
+from psycopg2.extras import execute_values
+
+from database import get_connection
+from query_cache import cached_read, get_query_cache, notify_change, prime
+
+# pandas is imported by the helpers that return DataFrames, so pages and
+# scripts that only submit or read single incidents never load it.
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Crockford base32: no I, L, O or U, so IDs survive being read out or handwritten.
+ID_SUFFIX_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ID_SUFFIX_LENGTH = 5
+
+
+def generate_incident_id(now: datetime | None = None) -> str:
+    """
+    Returns a Clinical / Safety Incident ID such as CSI-20240131-142501-7KQ2M.
+    The timestamp keeps IDs time-ordered and readable; the random suffix
+    (32**5 values) keeps them unique across sessions and app replicas that
+    submit in the same second. The unique index on incidents.incident_id
+    is the final guard.
+    """
+    now = now or datetime.now()
+    suffix = "".join(secrets.choice(ID_SUFFIX_ALPHABET) for _ in range(ID_SUFFIX_LENGTH))
+    return now.strftime("CSI-%Y%m%d-%H%M%S-") + suffix
+
+
+def as_text(value) -> str:
+    """Renders a DB value (date, time, timestamp or NULL) the way the form wrote it."""
+    return "" if value is None else str(value)
+
+
+# ---------------------------
+# Incident schema
+# ---------------------------
+class Incident(NamedTuple):
+    """
+    One incident as recorded. Field names and order are the incidents
+    table's columns; each annotation carries the report form's label. The
+    SQL column lists, the label mapping and the converters below are all
+    derived from this class, so a new field is added here (and in a
+    migration) only. Rows from `SELECT {INCIDENT_COLUMN_LIST}` become
+    Incidents with Incident._make(row).
+    """
+    incident_id: Annotated[str, "Incident ID"]
+    incident_date: Annotated[date, "Incident date"]
+    incident_time: Annotated[time | None, "Incident time"]  # NULL on some imported and legacy rows
+    category: Annotated[str, "Category"]
+    location: Annotated[str, "Location"]
+    resident_identifier: Annotated[str, "Resident identifier"]
+    resident_dob: Annotated[date | None, "Date of birth"]
+    resident_room: Annotated[str, "Room"]
+    incident_account: Annotated[str, "Incident account"]
+    immediate_actions_taken: Annotated[str, "Immediate actions taken"]
+    harm_injury_sustained: Annotated[str, "Harm / injury sustained"]
+    harm_injury_details: Annotated[str, "Harm / injury details"]
+    individuals_services_informed: Annotated[str, "Individuals / services informed"]
+    severity: Annotated[str, "Severity"]
+    reported_by_name: Annotated[str, "Reported by (name)"]
+    reported_by_role: Annotated[str, "Reported by (role)"]
+    immediate_learning_actions: Annotated[str, "Immediate learning / actions"]
+    audit_integrity_confirmation: Annotated[str, "Audit integrity confirmation"]
+    submitted_timestamp: Annotated[datetime, "Submitted timestamp"]
+    management_review_status: Annotated[str, "Management review status"]
+    management_reviewer_name: Annotated[str, "Management reviewer (name)"]
+    management_reviewer_role: Annotated[str, "Management reviewer (role)"]
+    management_review_outcome: Annotated[str, "Management review outcome"]
+    signoff_decision: Annotated[str, "Sign-off decision"]
+    signoff_timestamp: Annotated[datetime | None, "Sign-off timestamp"]
+
+    @classmethod
+    def from_record(cls, record: dict) -> "Incident":
+        """
+        Builds an Incident from a label-keyed record (report form, bulk
+        import, write spool). Dates and times may be ISO text or already
+        parsed; raises ValueError for unparseable or missing required ones.
+        """
+        return cls._make(convert(record.get(label)) for label, convert in _CONVERTERS)
+
+    def to_record(self) -> dict:
+        """Label-keyed record with every value as text, as the pages and PDFs show it."""
+        return dict(zip(INCIDENT_LABELS, map(as_text, self)))
+
+
+def _field_types() -> list[tuple[str, type, bool]]:
+    """(label, base type, optional) per field, from the Annotated hints."""
+    hints = get_type_hints(Incident, include_extras=True)
+    fields = []
+    for column in Incident._fields:
+        kind, label = get_args(hints[column])
+        optional = isinstance(kind, UnionType)
+        if optional:
+            kind = next(arg for arg in get_args(kind) if arg is not type(None))
+        fields.append((label, kind, optional))
+    return fields
+
+
+def _converter(label: str, kind: type, optional: bool):
+    if kind is str:
+        return lambda value: "" if value is None else str(value)
+    parse = kind.fromisoformat
+
+    def convert(value):
+        if value is None or value == "":
+            if optional:
+                return None
+            raise ValueError(f"{label} is required.")
+        if kind is date and isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, kind):
+            return value
+        try:
+            return parse(str(value).strip())
+        except ValueError:
+            raise ValueError(f"{label} '{value}' is not a valid {kind.__name__}.") from None
+
+    return convert
+
+
+_FIELD_TYPES = _field_types()
+_CONVERTERS = [(label, _converter(label, kind, optional)) for label, kind, optional in _FIELD_TYPES]
+
+INCIDENT_COLUMNS = Incident._fields
+INCIDENT_LABELS = tuple(label for label, _, _ in _FIELD_TYPES)
+INCIDENT_TEXT_LABELS = tuple(label for label, kind, _ in _FIELD_TYPES if kind is str)
+COLUMN_LABELS = dict(zip(INCIDENT_COLUMNS, INCIDENT_LABELS))
+
+# Plain column list, in Incident field order, for rows read into Incidents.
+INCIDENT_COLUMN_LIST = ", ".join(INCIDENT_COLUMNS)
+
+
+def labelled_columns(*columns: str) -> str:
+    """SELECT list aliasing each column to its form label, e.g. severity AS "Severity"."""
+    return ",\n    ".join(f'{column} AS "{COLUMN_LABELS[column]}"' for column in columns)
+
+
+# Column aliases used by every listing query; the labels match the report form.
+INCIDENT_SELECT_LIST = labelled_columns(*INCIDENT_COLUMNS)
+
+
+class StoredIncident(NamedTuple):
+    """An incident as loaded for review: its content plus its review version and lock."""
+    incident: Incident
+    row_version: int
+    locked: bool
+
+    def to_record(self) -> dict:
+        return {**self.incident.to_record(), "Row version": self.row_version, "Locked": self.locked}
+
+
+# ---------------------------
+# Validation (report form and bulk import)
+# ---------------------------
+INCIDENT_CATEGORIES = [
+    "Fall",
+    "Medication incident",
+    "Safeguarding concern",
+    "Aggression / violence",
+    "Pressure injury",
+    "Infection prevention / control",
+    "Equipment / environment safety",
+    "Other",
+]
+
+SEVERITIES = ["Low", "Moderate", "High", "Critical"]
+
+
+def require_text(value: str) -> bool:
+    return bool(value and str(value).strip())
+
+
+def validate_incident(record: dict) -> list[str]:
+    """
+    Applies the report form's rules to a label-keyed incident record.
+    Returns the error messages; an empty list means the record is valid.
+    """
+    errors = []
+    if not require_text(record.get("Resident identifier")):
+        errors.append("Resident name / identifier is required.")
+    if not require_text(record.get("Location")):
+        errors.append("Location is required.")
+    if not require_text(record.get("Incident account")):
+        errors.append("A factual incident account is required.")
+    if not require_text(record.get("Reported by (name)")):
+        errors.append("Reporter name is required.")
+    if not require_text(record.get("Reported by (role)")):
+        errors.append("Reporter role is required.")
+    if record.get("Audit integrity confirmation") != "Confirmed":
+        errors.append("Audit integrity confirmation must be completed before submission.")
+    if record.get("Category") not in INCIDENT_CATEGORIES:
+        errors.append(f"Incident category must be one of: {', '.join(INCIDENT_CATEGORIES)}.")
+    if record.get("Severity") not in SEVERITIES:
+        errors.append(f"Severity must be one of: {', '.join(SEVERITIES)}.")
+    if record.get("Harm / injury sustained") not in ("Yes", "No"):
+        errors.append("Harm / injury sustained must be Yes or No.")
+    return errors
+
+
+# ---------------------------
+# Writes
+# ---------------------------
+INSERT_INCIDENTS_SQL = f"INSERT INTO incidents (care_home_id, {INCIDENT_COLUMN_LIST}, locked) VALUES %s"
+
+
+def insert_incidents(cur, care_home_id: int, incidents: list[Incident], skip_existing: bool = False) -> list[str]:
+    """
+    Inserts incidents for one care home in a single multi-row INSERT on
+    the caller's cursor and transaction. With `skip_existing`, incidents
+    whose ID the home already has are left alone instead of raising.
+    Incidents already signed off with a LOCKING_DECISIONS decision (e.g.
+    imported history) are stored locked, as update_management_review()
+    would leave them. Returns the IDs actually inserted.
+    """
+    sql = INSERT_INCIDENTS_SQL
+    if skip_existing:
+        sql += " ON CONFLICT (care_home_id, incident_id) DO NOTHING"
+    inserted = execute_values(
+        cur,
+        sql + " RETURNING incident_id",
+        [(care_home_id, *incident, incident.signoff_decision in LOCKING_DECISIONS) for incident in incidents],
+        page_size=max(len(incidents), 1),
+        fetch=True,
+    )
+    if inserted:
+        notify_change(cur, care_home_id)
+    return [row[0] for row in inserted]
+
+
+# Must match the expression indexed by incidents_search_trgm_idx
+# (migrations/0006) exactly, or Postgres will not use the index.
+SEARCH_EXPRESSION = (
+    "(coalesce(incident_id, '') || ' ' || coalesce(resident_identifier, '') || ' ' "
+    "|| coalesce(location, '') || ' ' || coalesce(category, ''))"
+)
+
+
+class IncidentFilters(NamedTuple):
+    """Inspection page filters. None / blank means "All"."""
+    status: str | None = None
+    severity: str | None = None
+    date_from: date | None = None
+    date_to: date | None = None
+    search: str = ""
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _filter_clause(care_home_id: int, filters: IncidentFilters) -> tuple[str, list]:
+    """Builds the WHERE clause and parameters for one care home and filter set."""
+    clauses, params = ["care_home_id = %s"], [care_home_id]
+    if filters.status:
+        clauses.append("management_review_status = %s")
+        params.append(filters.status)
+    if filters.severity:
+        clauses.append("severity = %s")
+        params.append(filters.severity)
+    if filters.date_from:
+        clauses.append("incident_date >= %s")
+        params.append(filters.date_from)
+    if filters.date_to:
+        clauses.append("incident_date <= %s")
+        params.append(filters.date_to)
+    if filters.search.strip():
+        clauses.append(f"{SEARCH_EXPRESSION} ILIKE %s")
+        params.append(f"%{_escape_like(filters.search.strip())}%")
+    return " AND ".join(clauses), params
+
+
+def _page_rows(cur, care_home_id: int, filters: IncidentFilters, after: tuple | None, limit: int) -> list[tuple]:
+    """Up to limit + 1 rows of (incident columns..., row_version, locked, id), newest first, from both tiers."""
+    where, params = _filter_clause(care_home_id, filters)
+    if after is not None:
+        where += " AND (submitted_timestamp, id) < (%s, %s)"
+        params.extend(after)
+    cur.execute(
+        f"""
+        SELECT {INCIDENT_COLUMN_LIST}, row_version, locked, id
+        FROM all_incidents
+        WHERE {where}
+        ORDER BY submitted_timestamp DESC, id DESC
+        LIMIT %s
+        """,
+        params + [limit + 1],
+    )
+    return cur.fetchall()
+
+
+def _stored_incident(care_home_id: int, row: tuple, generation: int) -> StoredIncident:
+    """
+    Builds a StoredIncident from a _page_rows() row and primes
+    get_incident_record with it, unless the care home's cache entries were
+    invalidated since `generation` was read (before the query that returned
+    the row).
+    """
+    stored = StoredIncident(Incident._make(row[:-3]), row[-3], row[-2])
+    # Selecting a listed incident for review then needs no further query.
+    prime(get_incident_record, care_home_id, (stored.incident.incident_id,), stored, generation)
+    return stored
+
+
+@cached_read
+def list_incidents(
+    care_home_id: int,
+    filters: IncidentFilters = IncidentFilters(),
+    after: tuple | None = None,
+    limit: int = 50,
+) -> tuple[list[StoredIncident], tuple | None]:
+    """
+    Loads one page of a care home's incidents, newest first, using keyset pagination on
+    (submitted_timestamp, id). `after` is the cursor returned with the
+    previous page; the second return value is the cursor for the next page,
+    or None on the last page. Cost depends on the page size, not the table size.
+    """
+    generation = get_query_cache().generation(care_home_id)
+    with get_connection() as conn, conn.cursor() as cur:
+        rows = _page_rows(cur, care_home_id, filters, after, limit)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1][INCIDENT_COLUMNS.index("submitted_timestamp")], rows[-1][-1])
+    return [_stored_incident(care_home_id, row, generation) for row in rows], next_cursor
+
+
+@cached_read
+def fetch_incidents_page(
+    care_home_id: int,
+    filters: IncidentFilters = IncidentFilters(),
+    after: tuple | None = None,
+    limit: int = 50,
+) -> tuple["pd.DataFrame", tuple | None]:
+    """The page list_incidents() returns, as a DataFrame with the report form's labels."""
+    import pandas as pd
+
+    incidents, next_cursor = list_incidents.uncached(care_home_id, filters, after, limit)
+    df = pd.DataFrame.from_records([stored.incident for stored in incidents], columns=INCIDENT_LABELS)
+    return df, next_cursor
+
+
+# ---------------------------
+# Incremental page sync (inspection page)
+# ---------------------------
+# A sync fetches every incident changed after `synced_to`, which is set this
+# long before the previous sync started. A write whose updated_at stamp
+# (migrations/0011) was taken before a sync but committed after it is then
+# still picked up, provided it committed within this margin.
+SYNC_OVERLAP = timedelta(seconds=30)
+
+
+@dataclass
+class SyncedPage:
+    """A session's copy of one inspection page, kept current by sync_incidents_page()."""
+    care_home_id: int
+    filters: IncidentFilters
+    after: tuple | None
+    limit: int
+    rows: dict  # id -> ((submitted_timestamp, id), StoredIncident), newest first
+    next_cursor: tuple | None
+    synced_to: datetime
+    frame: "pd.DataFrame | None" = None  # built on first use by table()
+    changes: int = 0  # incidents fetched by the last sync, 0 after a full load
+    full_load: bool = True
+
+    def matches(self, care_home_id: int, filters: IncidentFilters, after: tuple | None, limit: int) -> bool:
+        return (self.care_home_id, self.filters, self.after, self.limit) == (care_home_id, filters, after, limit)
+
+    def holds(self, key: tuple) -> bool:
+        """Whether an incident with sort key `key` belongs on this page."""
+        if self.after is not None and key >= self.after:
+            return False
+        return self.next_cursor is None or key >= self.next_cursor
+
+    def table(self) -> "pd.DataFrame":
+        """The page as a DataFrame with the report form's labels, built once per change."""
+        if self.frame is None:
+            self.frame = _page_frame(self.rows)
+        return self.frame
+
+
+def _sync_start(cur) -> datetime:
+    cur.execute("SELECT now() - %s", (SYNC_OVERLAP,))
+    return cur.fetchone()[0]
+
+
+def _page_frame(rows: dict) -> "pd.DataFrame":
+    import pandas as pd
+
+    return pd.DataFrame.from_records([stored.incident for _, stored in rows.values()], columns=INCIDENT_LABELS)
+
+
+def _load_synced_page(care_home_id: int, filters: IncidentFilters, after: tuple | None, limit: int) -> SyncedPage:
+    generation = get_query_cache().generation(care_home_id)
+    with get_connection() as conn, conn.cursor() as cur:
+        synced_to = _sync_start(cur)
+        page_rows = _page_rows(cur, care_home_id, filters, after, limit)
+
+    rows = {}
+    for row in page_rows[:limit]:
+        stored = _stored_incident(care_home_id, row, generation)
+        rows[row[-1]] = ((stored.incident.submitted_timestamp, row[-1]), stored)
+    next_cursor = list(rows.values())[-1][0] if len(page_rows) > limit else None
+    return SyncedPage(care_home_id, filters, after, limit, rows, next_cursor, synced_to)
+
+
+def sync_incidents_page(
+    care_home_id: int,
+    filters: IncidentFilters = IncidentFilters(),
+    after: tuple | None = None,
+    limit: int = 50,
+    page: SyncedPage | None = None,
+) -> SyncedPage:
+    """
+    Returns the same page as list_incidents(), kept per session. Given
+    the session's previous copy of the page, fetches only the incidents
+    changed since it was synced (via updated_at) and merges them in: changed
+    rows are replaced, new ones inserted in order, and rows that no longer
+    match the filters dropped. The page is reloaded in full when the filters,
+    cursor or page size differ, or when dropped rows would have to be
+    refilled from the next page.
+
+    Changes are looked for in both tiers, since an incident may be signed
+    off and archived (archive.py) between two syncs. Incidents are never
+    deleted, so a sync does not look for deletions.
+    """
+    if page is None or not page.matches(care_home_id, filters, after, limit):
+        return _load_synced_page(care_home_id, filters, after, limit)
+
+    where, params = _filter_clause(care_home_id, filters)
+    generation = get_query_cache().generation(care_home_id)
+    with get_connection() as conn, conn.cursor() as cur:
+        synced_to = _sync_start(cur)
+        cur.execute(
+            f"""
+            SELECT {INCIDENT_COLUMN_LIST}, row_version, locked, id, ({where})
+            FROM all_incidents
+            WHERE care_home_id = %s AND updated_at > %s
+            """,
+            params + [care_home_id, page.synced_to],
+        )
+        changed = cur.fetchall()
+
+    rows, dirty = dict(page.rows), False
+    for *row, matches in changed:
+        stored = _stored_incident(care_home_id, row, generation)
+        row_id = row[-1]
+        key = (stored.incident.submitted_timestamp, row_id)
+        if matches and page.holds(key):
+            if rows.get(row_id) != (key, stored):
+                rows[row_id] = (key, stored)
+                dirty = True
+        elif rows.pop(row_id, None) is not None:
+            dirty = True
+
+    next_cursor = page.next_cursor
+    if dirty:
+        ordered = sorted(rows.items(), key=lambda item: item[1][0], reverse=True)
+        if len(ordered) < limit and next_cursor is not None:
+            return _load_synced_page(care_home_id, filters, after, limit)
+        if len(ordered) > limit:
+            next_cursor = ordered[limit - 1][1][0]
+            ordered = ordered[:limit]
+        elif next_cursor is not None:
+            next_cursor = ordered[-1][1][0]
+        rows = dict(ordered)
+
+    return SyncedPage(
+        care_home_id, filters, after, limit, rows, next_cursor, synced_to,
+        frame=None if dirty else page.frame,
+        changes=len(changed),
+        full_load=False,
+    )
+
+
+def export_incidents_csv(care_home_id: int, fileobj, filters: IncidentFilters = IncidentFilters()) -> None:
+    """
+    Streams every incident of a care home matching the filters into a binary file object as
+    CSV, newest first, using COPY ... TO STDOUT. Rows are written as Postgres
+    produces them, so memory use stays flat however many incidents there are.
+    """
+    where, params = _filter_clause(care_home_id, filters)
+    with get_connection() as conn, conn.cursor() as cur:
+        # COPY cannot take bind parameters, so the filter values are quoted client-side.
+        query = cur.mogrify(
+            f"""
+            SELECT {INCIDENT_SELECT_LIST}
+            FROM all_incidents
+            WHERE {where}
+            ORDER BY submitted_timestamp DESC, id DESC
+            """,
+            params,
+        )
+        cur.copy_expert(b"COPY (" + query + b") TO STDOUT WITH (FORMAT csv, HEADER true)", fileobj)
+
+
+# ---------------------------
+# Narrative search
+# ---------------------------
+# ts_headline wraps matched words in these; callers turn them into markup
+# after escaping the narrative text itself.
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_STOP = "\x03"
+
+# Results are ranked among this many of the newest matches. Ranking every
+# match of a common word ("resident") would read most of the table; with
+# the window, broad terms are served by the recency index and rare ones by
+# the GIN index.
+SEARCH_RANK_WINDOW = 1000
+
+
+@cached_read
+def search_incident_narratives(
+    care_home_id: int,
+    query: str,
+    page: int = 0,
+    limit: int = 20,
+) -> tuple["pd.DataFrame", bool]:
+    """
+    Full-text search of the narrative fields (migrations/0008), best match
+    first among the SEARCH_RANK_WINDOW newest matches. `query` uses web
+    search syntax: "bed rails", wrong -dose, fall or slip. Returns one page
+    of results with a highlighted "Snippet" column, and whether a further
+    page exists. Snippets are built only for the returned rows. Archived
+    incidents (archive.py) are not searched.
+    """
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            f"""
+            WITH matches AS (
+                SELECT i.*, ts_rank_cd(i.narrative_tsv, q.query) AS rank, q.query
+                FROM incidents AS i, websearch_to_tsquery('english', %s) AS q(query)
+                WHERE i.care_home_id = %s AND i.narrative_tsv @@ q.query
+                ORDER BY i.submitted_timestamp DESC, i.id DESC
+                LIMIT %s
+            ), hits AS (
+                SELECT * FROM matches
+                ORDER BY rank DESC, submitted_timestamp DESC, id DESC
+                LIMIT %s OFFSET %s
+            )
+            SELECT
+                {labelled_columns("incident_id", "incident_date", "category", "severity",
+                                  "resident_identifier", "management_review_status")},
+                ts_headline(
+                    'english',
+                    concat_ws(' ... ', incident_account, harm_injury_details,
+                              immediate_actions_taken, immediate_learning_actions),
+                    query,
+                    %s
+                ) AS "Snippet"
+            FROM hits
+            ORDER BY rank DESC, submitted_timestamp DESC, id DESC
+            """,
+            (
+                query,
+                care_home_id,
+                SEARCH_RANK_WINDOW,
+                limit + 1,
+                page * limit,
+                f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxFragments=2, MinWords=8, MaxWords=25",
+            ),
+        )
+        rows = cur.fetchall()
+        cols = [desc[0] for desc in cur.description]
+
+    import pandas as pd
+
+    return pd.DataFrame(rows[:limit], columns=cols), len(rows) > limit
+
+
+# ---------------------------
+# Management review
+# ---------------------------
+SIGNOFF_DECISIONS = ("Accepted", "Further action required", "Re-opened for clarification")
+
+# Sign-off decisions that lock the incident against further change (migrations/0009).
+LOCKING_DECISIONS = ("Accepted",)
+
+
+class ReviewConflict(Exception):
+    """Raised when an incident changed, or was locked, after the reviewer loaded it."""
+
+
+def update_management_review(
+    care_home_id: int,
+    incident_id: str,
+    expected_version: int,
+    reviewer_name: str,
+    reviewer_role: str,
+    review_outcome: str,
+    signoff_decision: str,
+    signoff_timestamp: str,
+    management_review_status: str,
+    actor: str | None = None,
+) -> int:
+    """
+    Records a management review if the incident is still at `expected_version`
+    (its row_version when the reviewer opened it) and not locked. Checking
+    and writing is one UPDATE ... RETURNING, so no row lock is held between
+    loading and saving. Returns the new row version; raises ReviewConflict
+    if another review got there first. `actor` (the signed-in username) is
+    recorded against the change in the audit log.
+    """
+    with get_connection() as conn, conn.cursor() as cur:
+        # Transaction-local; read by the audit log trigger (migrations/0010).
+        cur.execute("SELECT set_config('incidents.actor', %s, true)", (actor or "",))
+        cur.execute(
+            """
+            UPDATE incidents
+            SET
+                management_reviewer_name = %s,
+                management_reviewer_role = %s,
+                management_review_outcome = %s,
+                signoff_decision = %s,
+                signoff_timestamp = %s,
+                management_review_status = %s,
+                locked = %s,
+                row_version = row_version + 1
+            WHERE care_home_id = %s AND incident_id = %s AND row_version = %s AND NOT locked
+            RETURNING row_version
+            """,
+            (
+                reviewer_name,
+                reviewer_role,
+                review_outcome,
+                signoff_decision,
+                signoff_timestamp,
+                management_review_status,
+                signoff_decision in LOCKING_DECISIONS,
+                care_home_id,
+                incident_id,
+                expected_version,
+            ),
+        )
+        row = cur.fetchone()
+        if row is not None:
+            notify_change(cur, care_home_id)
+
+    # Either way the cached copy is stale: it was just changed, here or elsewhere.
+    get_query_cache().invalidate(care_home_id)
+    if row is None:
+        current = get_incident_record.uncached(care_home_id, incident_id)
+        if current is None:
+            raise ReviewConflict("This incident no longer exists.")
+        if current.locked:
+            raise ReviewConflict(
+                f"This incident was signed off and locked by {current.incident.management_reviewer_name} "
+                f"at {current.incident.signoff_timestamp}; it can no longer be changed."
+            )
+        raise ReviewConflict(
+            f"{current.incident.management_reviewer_name or 'Another reviewer'} updated this incident "
+            "after you opened it. Their review is shown in the incident details; check it before saving yours."
+        )
+    return row[0]
+
+
+@cached_read
+def get_incident_record(care_home_id: int, incident_id: str) -> StoredIncident | None:
+    with get_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT {INCIDENT_COLUMN_LIST}, row_version, locked
+            FROM all_incidents
+            WHERE care_home_id = %s AND incident_id = %s
+            """,
+            (care_home_id, incident_id),
+        )
+        row = cur.fetchone()
+
+    if not row:
+        return None
+    return StoredIncident(Incident._make(row[:-2]), row[-2], row[-1])
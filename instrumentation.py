@@ -0,0 +1,436 @@
+# instrumentation.py
+"""
+Query timing for every pooled Postgres connection.
+
+Pooled connections are InstrumentedConnections, whose cursors time each
+execute / COPY and count the rows and bytes they return. Each query is
+tagged with the data-layer helper that ran it (the nearest public function
+on the call stack outside the database plumbing, e.g.
+"incidents.fetch_incidents_page") and with the Streamlit page the session
+was on (set_page()). QueryMetrics keeps per-(helper, page) latency
+histograms and per-statement totals in process, logs queries slower than
+a threshold, and renders everything as Prometheus text.
+
+Statements are recorded with literal values replaced by "?", so neither
+the slow-query log nor the diagnostics page ever shows incident data.
+"""
+import contextvars
+import functools
+import logging
+import re
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds, as Prometheus histogram buckets.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Frames from these modules are plumbing, not the helper that asked for the query.
+INFRASTRUCTURE_MODULES = ("instrumentation", "database", "query_cache", "contextlib", "psycopg2")
+# Queries the database module makes on its own behalf (migrations) are
+# tagged with its function; nothing above the Streamlit runtime is a helper.
+OWN_QUERY_MODULES = ("database",)
+
+_page = contextvars.ContextVar("incidents_page", default="-")
+
+
+def set_page(name: str) -> None:
+    """Tags queries made from now on in this thread / context with a page name."""
+    _page.set(name)
+
+
+def current_page() -> str:
+    return _page.get()
+
+
+# ---------------------------
+# Tagging and normalising
+# ---------------------------
+def calling_helper(depth: int = 2) -> str:
+    """module.function of the nearest public, non-plumbing caller."""
+    frame = sys._getframe(depth)
+    fallback = "other"
+    for _ in range(20):
+        if frame is None:
+            break
+        module = frame.f_globals.get("__name__", "")
+        name = frame.f_code.co_name
+        if module.startswith("streamlit"):
+            break
+        if not name.startswith(("_", "<")):
+            if not module.startswith(INFRASTRUCTURE_MODULES):
+                return f"{module}.{name}"
+            if fallback == "other" and module.startswith(OWN_QUERY_MODULES):
+                fallback = f"{module}.{name}"
+        frame = frame.f_back
+    return fallback
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_VALUE_LISTS = re.compile(r"(\([^()]*\))(?:\s*,\s*\([^()]*\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(query) -> str:
+    """The statement with literals replaced by "?" and multi-row VALUES lists collapsed."""
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    elif not isinstance(query, str):
+        query = str(query)  # psycopg2.sql.Composed
+    if len(query) <= 4096:
+        return _normalize_cached(query)
+    return _normalize(query)
+
+
+def _normalize(query: str) -> str:
+    query = _STRING_LITERAL.sub("?", query)
+    query = _NUMBER_LITERAL.sub("?", query)
+    query = _VALUE_LISTS.sub(r"\1, ...", query)
+    return _WHITESPACE.sub(" ", query).strip()[:1000]
+
+
+# Statements with placeholders repeat, so most normalisations are cache hits.
+# Long statements (multi-row INSERTs with inlined values) are never cached.
+_normalize_cached = functools.lru_cache(maxsize=512)(_normalize)
+
+
+def _payload_bytes(rows) -> int:
+    """Approximate size of fetched rows: text and binary lengths, 8 bytes for anything else."""
+    total = 0
+    for row in rows:
+        for value in row:
+            if value is None:
+                continue
+            if isinstance(value, (str, bytes)):
+                total += len(value)
+            elif isinstance(value, memoryview):
+                total += value.nbytes
+            else:
+                total += 8
+    return total
+
+
+# ---------------------------
+# Metrics
+# ---------------------------
+class _Histogram:
+    __slots__ = ("buckets", "count", "total", "max", "rows", "bytes", "errors")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.errors = 0
+
+    def observe(self, seconds: float) -> None:
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (the histogram's resolution)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(LATENCY_BUCKETS, self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class QueryMetrics:
+    """
+    Thread-safe, in-process query statistics. `slow_query_seconds` sets
+    the slow-query log threshold; the last `slow_log_size` slow queries are
+    also kept for the diagnostics page.
+    """
+
+    def __init__(self, slow_query_seconds: float = 0.5, slow_log_size: int = 100):
+        self.slow_query_seconds = slow_query_seconds
+        self._lock = threading.Lock()
+        self._by_helper = {}  # (helper, page) -> _Histogram
+        self._by_statement = {}  # (helper, statement) -> _Histogram
+        self._slow = deque(maxlen=slow_log_size)
+        self._collectors = {}  # name -> callable returning a dict of numbers
+        self._started = time.time()
+
+    def record(self, helper: str, page: str, statement: str, seconds: float, rows: int, error: bool = False) -> tuple:
+        """Records one statement; returns the key later fetches add their rows and bytes to."""
+        key = (helper, page, statement)
+        with self._lock:
+            for hist in (
+                self._by_helper.setdefault((helper, page), _Histogram()),
+                self._by_statement.setdefault((helper, statement), _Histogram()),
+            ):
+                hist.observe(seconds)
+                hist.rows += rows
+                hist.errors += error
+        if seconds >= self.slow_query_seconds:
+            self._slow.append({
+                "At": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "Helper": helper,
+                "Page": page,
+                "ms": round(seconds * 1000, 1),
+                "Rows": rows,
+                "Statement": statement,
+            })
+            logger.warning("Slow query: %.0f ms in %s (page %s), %d rows: %s",
+                           seconds * 1000, helper, page, rows, statement)
+        return key
+
+    def add_fetched(self, key: tuple, rows: int, nbytes: int) -> None:
+        helper, page, statement = key
+        with self._lock:
+            for hist in (self._by_helper.get((helper, page)), self._by_statement.get((helper, statement))):
+                if hist is not None:
+                    hist.rows += rows
+                    hist.bytes += nbytes
+
+    def register_collector(self, name: str, collect) -> None:
+        """Adds a source of gauges (e.g. pool or cache stats) to the Prometheus output."""
+        self._collectors[name] = collect
+
+    def reset(self) -> None:
+        with self._lock:
+            self._by_helper.clear()
+            self._by_statement.clear()
+            self._slow.clear()
+            self._started = time.time()
+
+    # ---------------------------
+    # Reports
+    # ---------------------------
+    def hottest_statements(self, limit: int = 20) -> list[dict]:
+        """Statements by total time spent in them, most expensive first."""
+        with self._lock:
+            items = sorted(self._by_statement.items(), key=lambda kv: kv[1].total, reverse=True)[:limit]
+            return [
+                {
+                    "Helper": helper,
+                    "Calls": h.count,
+                    "Total s": round(h.total, 3),
+                    "Mean ms": round(h.total / h.count * 1000, 2),
+                    "p95 ms ≤": round(h.quantile(0.95) * 1000, 1),
+                    "Max ms": round(h.max * 1000, 1),
+                    "Rows": h.rows,
+                    "KB fetched": round(h.bytes / 1024, 1),
+                    "Errors": h.errors,
+                    "Statement": statement,
+                }
+                for (helper, statement), h in items
+            ]
+
+    def by_page(self) -> list[dict]:
+        """Query time per (page, helper), most expensive first."""
+        with self._lock:
+            items = sorted(self._by_helper.items(), key=lambda kv: kv[1].total, reverse=True)
+            return [
+                {
+                    "Page": page,
+                    "Helper": helper,
+                    "Calls": h.count,
+                    "Total s": round(h.total, 3),
+                    "p50 ms ≤": round(h.quantile(0.5) * 1000, 1),
+                    "p95 ms ≤": round(h.quantile(0.95) * 1000, 1),
+                    "p99 ms ≤": round(h.quantile(0.99) * 1000, 1),
+                    "Rows": h.rows,
+                }
+                for (helper, page), h in items
+            ]
+
+    def slow_queries(self) -> list[dict]:
+        """Most recent first."""
+        return list(reversed(self._slow))
+
+    def collect(self) -> dict[str, dict]:
+        gauges = {}
+        for name, collect in list(self._collectors.items()):
+            try:
+                gauges[name] = collect()
+            except Exception:
+                logger.exception("Metrics collector %s failed", name)
+        return gauges
+
+    def prometheus_text(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP incidents_db_query_duration_seconds Time spent executing statements, by helper and page.",
+            "# TYPE incidents_db_query_duration_seconds histogram",
+        ]
+        with self._lock:
+            helpers = [(helper, page, h) for (helper, page), h in sorted(self._by_helper.items())]
+            for helper, page, h in helpers:
+                labels = f'helper="{_label(helper)}",page="{_label(page)}"'
+                cumulative = 0
+                for bound, n in zip(LATENCY_BUCKETS, h.buckets):
+                    cumulative += n
+                    lines.append(f'incidents_db_query_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'incidents_db_query_duration_seconds_bucket{{{labels},le="+Inf"}} {h.count}')
+                lines.append(f"incidents_db_query_duration_seconds_sum{{{labels}}} {h.total:.6f}")
+                lines.append(f"incidents_db_query_duration_seconds_count{{{labels}}} {h.count}")
+            for metric, attr, help_text in (
+                ("incidents_db_query_rows_total", "rows", "Rows returned or affected."),
+                ("incidents_db_query_bytes_total", "bytes", "Approximate bytes fetched."),
+                ("incidents_db_query_errors_total", "errors", "Statements that raised."),
+            ):
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+                for helper, page, h in helpers:
+                    lines.append(f'{metric}{{helper="{_label(helper)}",page="{_label(page)}"}} {getattr(h, attr)}')
+
+        for name, values in sorted(self.collect().items()):
+            for stat, value in sorted(values.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric = f"incidents_{name}_{stat}"
+                lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# ---------------------------
+# Cursor and connection
+# ---------------------------
+class _CountingFile:
+    """Wraps the file object of a COPY to count the bytes that pass through it."""
+
+    def __init__(self, fileobj):
+        self._file = fileobj
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return self._file.write(data)
+
+    def read(self, size=-1):
+        data = self._file.read(size)
+        self.size += len(data)
+        return data
+
+    def readline(self, size=-1):
+        data = self._file.readline(size)
+        self.size += len(data)
+        return data
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """Cursor that reports each statement to its connection's QueryMetrics."""
+
+    _metrics_key = None
+
+    def _timed(self, query, run, copy_file=None):
+        metrics = self.connection.metrics
+        helper = calling_helper(3)
+        started = time.perf_counter()
+        error = False
+        try:
+            return run()
+        except Exception:
+            error = True
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            # Named cursors only learn their row count as rows are fetched.
+            rows = max(self.rowcount, 0)
+            self._metrics_key = metrics.record(helper, current_page(), normalize_sql(query), seconds, rows, error)
+            if copy_file is not None:
+                metrics.add_fetched(self._metrics_key, 0, copy_file.size)
+
+    def execute(self, query, vars=None):
+        return self._timed(query, lambda: super(TimedCursor, self).execute(query, vars))
+
+    def executemany(self, query, vars_list):
+        return self._timed(query, lambda: super(TimedCursor, self).executemany(query, vars_list))
+
+    def copy_expert(self, sql, file, size=8192):
+        counting = _CountingFile(file)
+        return self._timed(sql, lambda: super(TimedCursor, self).copy_expert(sql, counting, size), counting)
+
+    def _fetched(self, rows):
+        if self._metrics_key is not None and rows:
+            counted = len(rows) if self.name is not None else 0
+            self.connection.metrics.add_fetched(self._metrics_key, counted, _payload_bytes(rows))
+        return rows
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            self._fetched((row,))
+        return row
+
+    def fetchmany(self, size=None):
+        return self._fetched(super().fetchmany(self.arraysize if size is None else size))
+
+    def fetchall(self):
+        return self._fetched(super().fetchall())
+
+    def __iter__(self):
+        # Batches of itersize, so named cursors still fetch in round trips of itersize rows.
+        while True:
+            rows = self.fetchmany(self.itersize)
+            if not rows:
+                return
+            yield from rows
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """Connection whose cursors are TimedCursors; `metrics` is set by the pool."""
+
+    metrics = None
+
+    def __init__(self, dsn, *args, **kwargs):
+        super().__init__(dsn, *args, **kwargs)
+        self.cursor_factory = TimedCursor
+
+
+def connect(dsn: str, metrics: QueryMetrics):
+    conn = psycopg2.connect(dsn, connection_factory=InstrumentedConnection)
+    conn.metrics = metrics
+    return conn
+
+
+# ---------------------------
+# Prometheus endpoint
+# ---------------------------
+def start_metrics_server(metrics: QueryMetrics, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves metrics.prometheus_text() at http://host:port/metrics from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug("metrics: " + format, *args)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,38 @@
+-- =================================================
+-- 0001: Initial schema (previously created by init_db on every rerun)
+-- =================================================
+
+-- -----------------------------
+-- USERS TABLE (AUTHENTICATION)
+-- -----------------------------
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    care_home_id INTEGER NOT NULL,
+    username TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    role TEXT NOT NULL CHECK (role IN ('staff', 'manager')),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- -----------------------------
+-- INCIDENTS TABLE (CORE DATA)
+-- -----------------------------
+CREATE TABLE IF NOT EXISTS incidents (
+    id SERIAL PRIMARY KEY,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    care_home_id INTEGER NOT NULL,
+    incident_type TEXT,
+    description TEXT,
+    completed_by_name TEXT,
+    completed_by_role TEXT
+);
+
+-- -----------------------------
+-- MANAGEMENT REVIEW FIELDS
+-- -----------------------------
+ALTER TABLE incidents
+    ADD COLUMN IF NOT EXISTS reviewed_by TEXT,
+    ADD COLUMN IF NOT EXISTS review_outcome TEXT,
+    ADD COLUMN IF NOT EXISTS signoff_decision TEXT,
+    ADD COLUMN IF NOT EXISTS signed_off_at TIMESTAMP,
+    ADD COLUMN IF NOT EXISTS locked BOOLEAN DEFAULT FALSE;
@@ -0,0 +1,43 @@
+-- =================================================
+-- 0002: Columns read and written by the incident form (app.py)
+-- =================================================
+-- The report form and inspection page use 25 columns that 0001 never
+-- created. Installs that added them by hand may hold dates and times as
+-- TEXT, so the typed columns are normalised with NULLIF(...::text, '')
+-- (blank strings were written for empty sign-off timestamps).
+
+ALTER TABLE incidents
+    ADD COLUMN IF NOT EXISTS incident_id TEXT,
+    ADD COLUMN IF NOT EXISTS incident_date DATE,
+    ADD COLUMN IF NOT EXISTS incident_time TIME,
+    ADD COLUMN IF NOT EXISTS category TEXT,
+    ADD COLUMN IF NOT EXISTS location TEXT,
+    ADD COLUMN IF NOT EXISTS resident_identifier TEXT,
+    ADD COLUMN IF NOT EXISTS resident_dob DATE,
+    ADD COLUMN IF NOT EXISTS resident_room TEXT,
+    ADD COLUMN IF NOT EXISTS incident_account TEXT,
+    ADD COLUMN IF NOT EXISTS immediate_actions_taken TEXT,
+    ADD COLUMN IF NOT EXISTS harm_injury_sustained TEXT,
+    ADD COLUMN IF NOT EXISTS harm_injury_details TEXT,
+    ADD COLUMN IF NOT EXISTS individuals_services_informed TEXT,
+    ADD COLUMN IF NOT EXISTS severity TEXT,
+    ADD COLUMN IF NOT EXISTS reported_by_name TEXT,
+    ADD COLUMN IF NOT EXISTS reported_by_role TEXT,
+    ADD COLUMN IF NOT EXISTS immediate_learning_actions TEXT,
+    ADD COLUMN IF NOT EXISTS audit_integrity_confirmation TEXT,
+    ADD COLUMN IF NOT EXISTS submitted_timestamp TIMESTAMP,
+    ADD COLUMN IF NOT EXISTS management_review_status TEXT DEFAULT 'Pending',
+    ADD COLUMN IF NOT EXISTS management_reviewer_name TEXT,
+    ADD COLUMN IF NOT EXISTS management_reviewer_role TEXT,
+    ADD COLUMN IF NOT EXISTS management_review_outcome TEXT,
+    ADD COLUMN IF NOT EXISTS signoff_timestamp TIMESTAMP;
+
+ALTER TABLE incidents
+    ALTER COLUMN incident_date TYPE DATE USING NULLIF(incident_date::text, '')::date,
+    ALTER COLUMN incident_time TYPE TIME USING NULLIF(incident_time::text, '')::time,
+    ALTER COLUMN resident_dob TYPE DATE USING NULLIF(resident_dob::text, '')::date,
+    ALTER COLUMN submitted_timestamp TYPE TIMESTAMP USING NULLIF(submitted_timestamp::text, '')::timestamp,
+    ALTER COLUMN signoff_timestamp TYPE TIMESTAMP USING NULLIF(signoff_timestamp::text, '')::timestamp;
+
+-- The form does not know which care home it is reporting for yet.
+ALTER TABLE incidents ALTER COLUMN care_home_id DROP NOT NULL;
@@ -0,0 +1,49 @@
+-- =================================================
+-- 0003: Indexes for the paginated inspection listing
+-- =================================================
+-- The inspection page pages through incidents newest first with a keyset
+-- cursor on (submitted_timestamp, id), optionally filtered by review status,
+-- severity and incident date. Keyset pagination needs a non-null sort key.
+
+UPDATE incidents
+SET submitted_timestamp = COALESCE(created_at, CURRENT_TIMESTAMP)
+WHERE submitted_timestamp IS NULL;
+
+ALTER TABLE incidents
+    ALTER COLUMN submitted_timestamp SET DEFAULT CURRENT_TIMESTAMP,
+    ALTER COLUMN submitted_timestamp SET NOT NULL;
+
+CREATE INDEX IF NOT EXISTS incidents_submitted_idx
+    ON incidents (submitted_timestamp DESC, id DESC);
+
+-- Serves status-only filters through its leading column as well.
+CREATE INDEX IF NOT EXISTS incidents_status_severity_submitted_idx
+    ON incidents (management_review_status, severity, submitted_timestamp DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS incidents_severity_submitted_idx
+    ON incidents (severity, submitted_timestamp DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS incidents_incident_date_idx
+    ON incidents (incident_date);
+
+-- -----------------------------
+-- SEARCH BOX (substring match)
+-- -----------------------------
+-- Trigram index for ILIKE '%...%' over ID, resident, location and category.
+-- The expression must match incidents.SEARCH_EXPRESSION. Hosts without
+-- pg_trgm (or without rights to create it) fall back to a filtered scan.
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    EXECUTE $sql$
+        CREATE INDEX IF NOT EXISTS incidents_search_trgm_idx
+        ON incidents USING gin (
+            (coalesce(incident_id, '') || ' ' || coalesce(resident_identifier, '') || ' '
+             || coalesce(location, '') || ' ' || coalesce(category, ''))
+            gin_trgm_ops
+        )
+    $sql$;
+EXCEPTION
+    WHEN feature_not_supported OR undefined_file OR insufficient_privilege THEN
+        RAISE NOTICE 'pg_trgm is unavailable; incident search will not be indexed.';
+END $$;
@@ -0,0 +1,18 @@
+-- =================================================
+-- 0004: Unique incident IDs
+-- =================================================
+-- IDs used to be CSI-YYYYMMDD-HHMMSS, so two submissions in the same second
+-- collided. Existing duplicates keep their first row's ID; later rows get a
+-- numeric suffix (CSI-20240101-101500-2) before the unique index is built.
+
+UPDATE incidents AS i
+SET incident_id = i.incident_id || '-' || d.rn
+FROM (
+    SELECT id, row_number() OVER (PARTITION BY incident_id ORDER BY id) AS rn
+    FROM incidents
+    WHERE incident_id IS NOT NULL
+) AS d
+WHERE i.id = d.id AND d.rn > 1;
+
+CREATE UNIQUE INDEX IF NOT EXISTS incidents_incident_id_key
+    ON incidents (incident_id);
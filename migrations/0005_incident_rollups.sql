@@ -0,0 +1,118 @@
+-- =================================================
+-- 0005: Pre-aggregated daily rollups for the analytics page
+-- =================================================
+-- One row per care home, incident day, category, severity and location,
+-- maintained by triggers as incidents are inserted and reviewed, so the
+-- analytics page reads a few hundred rollup rows instead of scanning
+-- incidents. Rows leaving the hot table (e.g. archiving) are deliberately
+-- not subtracted: the rollups are the long-term history.
+-- care_home_id 0 collects incidents not yet assigned to a home.
+
+CREATE TABLE IF NOT EXISTS incident_daily_rollup (
+    care_home_id INTEGER NOT NULL,
+    day DATE NOT NULL,
+    category TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    location TEXT NOT NULL,
+    incidents INTEGER NOT NULL DEFAULT 0,
+    harm_incidents INTEGER NOT NULL DEFAULT 0,
+    reviews_completed INTEGER NOT NULL DEFAULT 0,
+    review_seconds_total DOUBLE PRECISION NOT NULL DEFAULT 0,
+    PRIMARY KEY (care_home_id, day, category, severity, location)
+);
+
+-- Adds (sign = 1) or removes (sign = -1) one incident's contribution.
+CREATE OR REPLACE FUNCTION incident_rollup_apply(
+    p_care_home_id INTEGER,
+    p_incident_date DATE,
+    p_submitted TIMESTAMP,
+    p_category TEXT,
+    p_severity TEXT,
+    p_location TEXT,
+    p_harm TEXT,
+    p_review_status TEXT,
+    p_signoff TIMESTAMP,
+    p_sign INTEGER
+) RETURNS VOID AS $$
+DECLARE
+    reviewed BOOLEAN := p_review_status = 'Completed' AND p_signoff IS NOT NULL;
+BEGIN
+    INSERT INTO incident_daily_rollup AS r (
+        care_home_id, day, category, severity, location,
+        incidents, harm_incidents, reviews_completed, review_seconds_total
+    )
+    VALUES (
+        coalesce(p_care_home_id, 0),
+        coalesce(p_incident_date, p_submitted::date),
+        coalesce(nullif(trim(p_category), ''), 'Unknown'),
+        coalesce(nullif(trim(p_severity), ''), 'Unknown'),
+        coalesce(nullif(trim(p_location), ''), 'Unknown'),
+        p_sign,
+        CASE WHEN p_harm = 'Yes' THEN p_sign ELSE 0 END,
+        CASE WHEN reviewed THEN p_sign ELSE 0 END,
+        CASE WHEN reviewed THEN p_sign * extract(epoch FROM p_signoff - p_submitted) ELSE 0 END
+    )
+    ON CONFLICT (care_home_id, day, category, severity, location) DO UPDATE SET
+        incidents = r.incidents + EXCLUDED.incidents,
+        harm_incidents = r.harm_incidents + EXCLUDED.harm_incidents,
+        reviews_completed = r.reviews_completed + EXCLUDED.reviews_completed,
+        review_seconds_total = r.review_seconds_total + EXCLUDED.review_seconds_total;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION incident_rollup_trigger() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM incident_rollup_apply(
+            OLD.care_home_id, OLD.incident_date, OLD.submitted_timestamp, OLD.category, OLD.severity,
+            OLD.location, OLD.harm_injury_sustained, OLD.management_review_status, OLD.signoff_timestamp, -1
+        );
+    END IF;
+    PERFORM incident_rollup_apply(
+        NEW.care_home_id, NEW.incident_date, NEW.submitted_timestamp, NEW.category, NEW.severity,
+        NEW.location, NEW.harm_injury_sustained, NEW.management_review_status, NEW.signoff_timestamp, 1
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS incidents_rollup_insert ON incidents;
+CREATE TRIGGER incidents_rollup_insert
+    AFTER INSERT ON incidents
+    FOR EACH ROW EXECUTE FUNCTION incident_rollup_trigger();
+
+DROP TRIGGER IF EXISTS incidents_rollup_update ON incidents;
+CREATE TRIGGER incidents_rollup_update
+    AFTER UPDATE ON incidents
+    FOR EACH ROW
+    WHEN (
+        (OLD.care_home_id, OLD.incident_date, OLD.submitted_timestamp, OLD.category, OLD.severity,
+         OLD.location, OLD.harm_injury_sustained, OLD.management_review_status, OLD.signoff_timestamp)
+        IS DISTINCT FROM
+        (NEW.care_home_id, NEW.incident_date, NEW.submitted_timestamp, NEW.category, NEW.severity,
+         NEW.location, NEW.harm_injury_sustained, NEW.management_review_status, NEW.signoff_timestamp)
+    )
+    EXECUTE FUNCTION incident_rollup_trigger();
+
+-- -----------------------------
+-- BACKFILL FROM EXISTING INCIDENTS
+-- -----------------------------
+TRUNCATE incident_daily_rollup;
+
+INSERT INTO incident_daily_rollup (
+    care_home_id, day, category, severity, location,
+    incidents, harm_incidents, reviews_completed, review_seconds_total
+)
+SELECT
+    coalesce(care_home_id, 0),
+    coalesce(incident_date, submitted_timestamp::date),
+    coalesce(nullif(trim(category), ''), 'Unknown'),
+    coalesce(nullif(trim(severity), ''), 'Unknown'),
+    coalesce(nullif(trim(location), ''), 'Unknown'),
+    count(*),
+    count(*) FILTER (WHERE harm_injury_sustained = 'Yes'),
+    count(*) FILTER (WHERE management_review_status = 'Completed' AND signoff_timestamp IS NOT NULL),
+    coalesce(sum(extract(epoch FROM signoff_timestamp - submitted_timestamp))
+        FILTER (WHERE management_review_status = 'Completed' AND signoff_timestamp IS NOT NULL), 0)
+FROM incidents
+GROUP BY 1, 2, 3, 4, 5;
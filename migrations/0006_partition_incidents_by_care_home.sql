@@ -0,0 +1,175 @@
+-- =================================================
+-- 0006: Tenant scoping and hash partitioning by care home
+-- =================================================
+-- Every query is now filtered by care_home_id, so incidents are split into
+-- 16 hash partitions on that column and each index leads with it. A group
+-- running hundreds of homes then touches one small partition per query.
+-- Requires Postgres 13 or later.
+
+-- -----------------------------
+-- CARE HOMES (previously only in the SQLite admin scripts)
+-- -----------------------------
+CREATE TABLE IF NOT EXISTS care_homes (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Incidents written before the form knew its home (see 0002) belong to the
+-- install's only home: the lowest home any user is attached to, else 1.
+UPDATE incidents
+SET care_home_id = coalesce((SELECT min(care_home_id) FROM users), 1)
+WHERE care_home_id IS NULL;
+
+INSERT INTO care_homes (id, name)
+SELECT DISTINCT care_home_id, 'Care home ' || care_home_id
+FROM (SELECT care_home_id FROM incidents UNION SELECT care_home_id FROM users) AS homes
+WHERE NOT EXISTS (SELECT 1 FROM care_homes WHERE care_homes.id = homes.care_home_id);
+
+SELECT setval(pg_get_serial_sequence('care_homes', 'id'), coalesce((SELECT max(id) FROM care_homes), 0) + 1, false);
+
+-- -----------------------------
+-- PARTITIONED INCIDENTS TABLE
+-- -----------------------------
+ALTER TABLE incidents RENAME TO incidents_unpartitioned;
+
+CREATE TABLE incidents (
+    id INTEGER NOT NULL DEFAULT nextval('incidents_id_seq'),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    care_home_id INTEGER NOT NULL,
+    incident_type TEXT,
+    description TEXT,
+    completed_by_name TEXT,
+    completed_by_role TEXT,
+    reviewed_by TEXT,
+    review_outcome TEXT,
+    signoff_decision TEXT,
+    signed_off_at TIMESTAMP,
+    locked BOOLEAN DEFAULT FALSE,
+    incident_id TEXT,
+    incident_date DATE,
+    incident_time TIME,
+    category TEXT,
+    location TEXT,
+    resident_identifier TEXT,
+    resident_dob DATE,
+    resident_room TEXT,
+    incident_account TEXT,
+    immediate_actions_taken TEXT,
+    harm_injury_sustained TEXT,
+    harm_injury_details TEXT,
+    individuals_services_informed TEXT,
+    severity TEXT,
+    reported_by_name TEXT,
+    reported_by_role TEXT,
+    immediate_learning_actions TEXT,
+    audit_integrity_confirmation TEXT,
+    submitted_timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    management_review_status TEXT DEFAULT 'Pending',
+    management_reviewer_name TEXT,
+    management_reviewer_role TEXT,
+    management_review_outcome TEXT,
+    signoff_timestamp TIMESTAMP,
+    PRIMARY KEY (care_home_id, id),
+    UNIQUE (care_home_id, incident_id)
+) PARTITION BY HASH (care_home_id);
+
+DO $$
+BEGIN
+    FOR i IN 0..15 LOOP
+        EXECUTE format(
+            'CREATE TABLE incidents_p%s PARTITION OF incidents FOR VALUES WITH (MODULUS 16, REMAINDER %s)',
+            lpad(i::text, 2, '0'), i
+        );
+    END LOOP;
+END $$;
+
+INSERT INTO incidents (
+    id, created_at, care_home_id, incident_type, description, completed_by_name, completed_by_role,
+    reviewed_by, review_outcome, signoff_decision, signed_off_at, locked,
+    incident_id, incident_date, incident_time, category, location, resident_identifier, resident_dob,
+    resident_room, incident_account, immediate_actions_taken, harm_injury_sustained, harm_injury_details,
+    individuals_services_informed, severity, reported_by_name, reported_by_role, immediate_learning_actions,
+    audit_integrity_confirmation, submitted_timestamp, management_review_status, management_reviewer_name,
+    management_reviewer_role, management_review_outcome, signoff_timestamp
+)
+SELECT
+    id, created_at, care_home_id, incident_type, description, completed_by_name, completed_by_role,
+    reviewed_by, review_outcome, signoff_decision, signed_off_at, locked,
+    incident_id, incident_date, incident_time, category, location, resident_identifier, resident_dob,
+    resident_room, incident_account, immediate_actions_taken, harm_injury_sustained, harm_injury_details,
+    individuals_services_informed, severity, reported_by_name, reported_by_role, immediate_learning_actions,
+    audit_integrity_confirmation, submitted_timestamp, management_review_status, management_reviewer_name,
+    management_reviewer_role, management_review_outcome, signoff_timestamp
+FROM incidents_unpartitioned;
+
+-- The id sequence belongs to the old table's column; move it before dropping.
+ALTER SEQUENCE incidents_id_seq OWNED BY incidents.id;
+DROP TABLE incidents_unpartitioned;
+
+-- -----------------------------
+-- INDEXES (created on every partition)
+-- -----------------------------
+CREATE INDEX incidents_home_submitted_idx
+    ON incidents (care_home_id, submitted_timestamp DESC, id DESC);
+
+CREATE INDEX incidents_home_status_severity_submitted_idx
+    ON incidents (care_home_id, management_review_status, severity, submitted_timestamp DESC, id DESC);
+
+CREATE INDEX incidents_home_severity_submitted_idx
+    ON incidents (care_home_id, severity, submitted_timestamp DESC, id DESC);
+
+CREATE INDEX incidents_home_incident_date_idx
+    ON incidents (care_home_id, incident_date);
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX incidents_search_trgm_idx
+        ON incidents USING gin (
+            (coalesce(incident_id, '') || ' ' || coalesce(resident_identifier, '') || ' '
+             || coalesce(location, '') || ' ' || coalesce(category, ''))
+            gin_trgm_ops
+        );
+    END IF;
+END $$;
+
+-- -----------------------------
+-- ROLLUP TRIGGERS (see 0005) AND REBUILT ROLLUPS
+-- -----------------------------
+CREATE TRIGGER incidents_rollup_insert
+    AFTER INSERT ON incidents
+    FOR EACH ROW EXECUTE FUNCTION incident_rollup_trigger();
+
+CREATE TRIGGER incidents_rollup_update
+    AFTER UPDATE ON incidents
+    FOR EACH ROW
+    WHEN (
+        (OLD.care_home_id, OLD.incident_date, OLD.submitted_timestamp, OLD.category, OLD.severity,
+         OLD.location, OLD.harm_injury_sustained, OLD.management_review_status, OLD.signoff_timestamp)
+        IS DISTINCT FROM
+        (NEW.care_home_id, NEW.incident_date, NEW.submitted_timestamp, NEW.category, NEW.severity,
+         NEW.location, NEW.harm_injury_sustained, NEW.management_review_status, NEW.signoff_timestamp)
+    )
+    EXECUTE FUNCTION incident_rollup_trigger();
+
+-- Rows previously bucketed under care home 0 now have a real home.
+TRUNCATE incident_daily_rollup;
+
+INSERT INTO incident_daily_rollup (
+    care_home_id, day, category, severity, location,
+    incidents, harm_incidents, reviews_completed, review_seconds_total
+)
+SELECT
+    care_home_id,
+    coalesce(incident_date, submitted_timestamp::date),
+    coalesce(nullif(trim(category), ''), 'Unknown'),
+    coalesce(nullif(trim(severity), ''), 'Unknown'),
+    coalesce(nullif(trim(location), ''), 'Unknown'),
+    count(*),
+    count(*) FILTER (WHERE harm_injury_sustained = 'Yes'),
+    count(*) FILTER (WHERE management_review_status = 'Completed' AND signoff_timestamp IS NOT NULL),
+    coalesce(sum(extract(epoch FROM signoff_timestamp - submitted_timestamp))
+        FILTER (WHERE management_review_status = 'Completed' AND signoff_timestamp IS NOT NULL), 0)
+FROM incidents
+GROUP BY 1, 2, 3, 4, 5;
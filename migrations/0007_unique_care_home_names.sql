@@ -0,0 +1,16 @@
+-- =================================================
+-- 0007: Unique care home names
+-- =================================================
+-- admin.py provisions care homes by name, so a manifest can be re-run
+-- without creating a second home. Any existing duplicates keep the name on
+-- their lowest ID; later rows get the ID appended ("Oak House (12)").
+
+UPDATE care_homes AS h
+SET name = h.name || ' (' || h.id || ')'
+FROM (
+    SELECT id, row_number() OVER (PARTITION BY name ORDER BY id) AS rn
+    FROM care_homes
+) AS d
+WHERE h.id = d.id AND d.rn > 1;
+
+ALTER TABLE care_homes ADD CONSTRAINT care_homes_name_key UNIQUE (name);
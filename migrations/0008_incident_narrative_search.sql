@@ -0,0 +1,49 @@
+-- =================================================
+-- 0008: Full-text search over incident narratives
+-- =================================================
+-- narrative_tsv holds the English text-search vector of the four free-text
+-- narrative fields, weighted so matches in the incident account rank
+-- highest. A BEFORE trigger keeps it current (row triggers on partitioned
+-- tables need Postgres 13), and a GIN index on each partition serves
+-- incidents.search_incident_narratives.
+
+ALTER TABLE incidents ADD COLUMN IF NOT EXISTS narrative_tsv tsvector;
+
+CREATE OR REPLACE FUNCTION incident_narrative_tsv(
+    p_incident_account TEXT,
+    p_immediate_actions_taken TEXT,
+    p_harm_injury_details TEXT,
+    p_immediate_learning_actions TEXT
+) RETURNS tsvector
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT setweight(to_tsvector('english', coalesce(p_incident_account, '')), 'A')
+        || setweight(to_tsvector('english', coalesce(p_harm_injury_details, '')), 'B')
+        || setweight(to_tsvector('english', coalesce(p_immediate_actions_taken, '')), 'C')
+        || setweight(to_tsvector('english', coalesce(p_immediate_learning_actions, '')), 'C')
+$$;
+
+CREATE OR REPLACE FUNCTION incident_narrative_tsv_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.narrative_tsv := incident_narrative_tsv(
+        NEW.incident_account, NEW.immediate_actions_taken,
+        NEW.harm_injury_details, NEW.immediate_learning_actions
+    );
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS incidents_narrative_tsv ON incidents;
+CREATE TRIGGER incidents_narrative_tsv
+    BEFORE INSERT OR UPDATE OF incident_account, immediate_actions_taken,
+        harm_injury_details, immediate_learning_actions
+    ON incidents
+    FOR EACH ROW EXECUTE FUNCTION incident_narrative_tsv_trigger();
+
+UPDATE incidents
+SET narrative_tsv = incident_narrative_tsv(
+    incident_account, immediate_actions_taken, harm_injury_details, immediate_learning_actions
+);
+
+CREATE INDEX IF NOT EXISTS incidents_narrative_tsv_idx
+    ON incidents USING gin (narrative_tsv);
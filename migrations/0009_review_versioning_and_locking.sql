@@ -0,0 +1,42 @@
+-- =================================================
+-- 0009: Versioned management reviews and locked sign-offs
+-- =================================================
+-- row_version is incremented by every management review update; a review
+-- only applies if the row still has the version the reviewer loaded
+-- (incidents.update_management_review). An "Accepted" sign-off sets
+-- locked, after which the incident's recorded content cannot change.
+
+ALTER TABLE incidents ADD COLUMN IF NOT EXISTS row_version INTEGER NOT NULL DEFAULT 1;
+
+UPDATE incidents SET locked = FALSE WHERE locked IS NULL;
+ALTER TABLE incidents ALTER COLUMN locked SET NOT NULL;
+
+UPDATE incidents
+SET locked = TRUE
+WHERE management_review_status = 'Completed' AND signoff_decision = 'Accepted' AND NOT locked;
+
+-- Guards every writer, not just the app: derived columns (search vectors,
+-- rollups) may still be maintained, but nothing a reviewer or reporter
+-- recorded may change, and a lock cannot be lifted, once locked is set.
+CREATE OR REPLACE FUNCTION incident_locked_guard() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    RAISE EXCEPTION 'incident % is signed off and locked', OLD.incident_id
+        USING ERRCODE = 'object_not_in_prerequisite_state';
+END;
+$$;
+
+DROP TRIGGER IF EXISTS incidents_locked_guard ON incidents;
+CREATE TRIGGER incidents_locked_guard
+    BEFORE UPDATE OF
+        care_home_id, incident_id, incident_date, incident_time, category, location,
+        resident_identifier, resident_dob, resident_room, incident_account,
+        immediate_actions_taken, harm_injury_sustained, harm_injury_details,
+        individuals_services_informed, severity, reported_by_name, reported_by_role,
+        immediate_learning_actions, audit_integrity_confirmation, submitted_timestamp,
+        management_review_status, management_reviewer_name, management_reviewer_role,
+        management_review_outcome, signoff_decision, signoff_timestamp, locked
+    ON incidents
+    FOR EACH ROW
+    WHEN (OLD.locked)
+    EXECUTE FUNCTION incident_locked_guard();
@@ -0,0 +1,216 @@
+-- =================================================
+-- 0010: Append-only, hash-chained incident event log
+-- =================================================
+-- Every insert of an incident, and every update that changes what was
+-- recorded, appends an event to incident_events in the same transaction.
+-- The event's payload is the full recorded content of the incident after
+-- the change, and row_digest a compact digest of the same content. Each
+-- event's hash covers both and the previous event's hash for the same
+-- incident, so altering, removing or reordering any event breaks the
+-- chain; audit_log.py verifies the chains.
+--
+--   hash = sha256_hex(prev_hash || E'\n' || row_digest || E'\n' || payload)
+--
+-- The first event of a chain has prev_hash = 64 zeros. Incidents that
+-- existed before this migration start with a "baseline" event. Legacy rows
+-- stored without an incident ID cannot be chained or looked up, so they
+-- get no events (audit_log.py skips them too).
+
+CREATE TABLE IF NOT EXISTS incident_events (
+    id BIGSERIAL,
+    care_home_id INTEGER NOT NULL,
+    incident_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    event_type TEXT NOT NULL,
+    occurred_at TIMESTAMP NOT NULL,
+    actor TEXT NOT NULL,
+    row_digest TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    prev_hash TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (care_home_id, id),
+    UNIQUE (care_home_id, incident_id, seq)
+) PARTITION BY HASH (care_home_id);
+
+DO $$
+BEGIN
+    FOR i IN 0..15 LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS incident_events_p%s PARTITION OF incident_events '
+            'FOR VALUES WITH (MODULUS 16, REMAINDER %s)',
+            lpad(i::text, 2, '0'), i
+        );
+    END LOOP;
+END $$;
+
+-- -----------------------------
+-- RECORDED CONTENT OF AN INCIDENT
+-- -----------------------------
+-- Derived columns (search vectors, row_version) are deliberately left out
+-- of both the snapshot and the digest.
+CREATE OR REPLACE FUNCTION incident_snapshot(i incidents) RETURNS jsonb
+LANGUAGE sql STABLE AS $$
+    SELECT jsonb_build_object(
+        'care_home_id', i.care_home_id,
+        'incident_id', i.incident_id,
+        'incident_date', i.incident_date,
+        'incident_time', i.incident_time,
+        'category', i.category,
+        'location', i.location,
+        'resident_identifier', i.resident_identifier,
+        'resident_dob', i.resident_dob,
+        'resident_room', i.resident_room,
+        'incident_account', i.incident_account,
+        'immediate_actions_taken', i.immediate_actions_taken,
+        'harm_injury_sustained', i.harm_injury_sustained,
+        'harm_injury_details', i.harm_injury_details,
+        'individuals_services_informed', i.individuals_services_informed,
+        'severity', i.severity,
+        'reported_by_name', i.reported_by_name,
+        'reported_by_role', i.reported_by_role,
+        'immediate_learning_actions', i.immediate_learning_actions,
+        'audit_integrity_confirmation', i.audit_integrity_confirmation,
+        'submitted_timestamp', i.submitted_timestamp,
+        'management_review_status', i.management_review_status,
+        'management_reviewer_name', i.management_reviewer_name,
+        'management_reviewer_role', i.management_reviewer_role,
+        'management_review_outcome', i.management_review_outcome,
+        'signoff_decision', i.signoff_decision,
+        'signoff_timestamp', i.signoff_timestamp,
+        'locked', i.locked
+    )
+$$;
+
+-- md5 of the recorded columns, with dates and times formatted explicitly
+-- so the result does not depend on the session's DateStyle. Verifying a
+-- home compares this against each chain's newest event; it is several
+-- times cheaper to compute than incident_snapshot().
+CREATE OR REPLACE FUNCTION incident_row_digest(i incidents) RETURNS TEXT
+LANGUAGE sql STABLE AS $$
+    SELECT md5(ROW(
+        i.care_home_id, i.incident_id,
+        to_char(i.incident_date, 'YYYY-MM-DD'), to_char(i.incident_time, 'HH24:MI:SS.US'),
+        i.category, i.location, i.resident_identifier,
+        to_char(i.resident_dob, 'YYYY-MM-DD'), i.resident_room, i.incident_account,
+        i.immediate_actions_taken, i.harm_injury_sustained, i.harm_injury_details,
+        i.individuals_services_informed, i.severity, i.reported_by_name, i.reported_by_role,
+        i.immediate_learning_actions, i.audit_integrity_confirmation,
+        to_char(i.submitted_timestamp, 'YYYY-MM-DD HH24:MI:SS.US'),
+        i.management_review_status, i.management_reviewer_name, i.management_reviewer_role,
+        i.management_review_outcome, i.signoff_decision,
+        to_char(i.signoff_timestamp, 'YYYY-MM-DD HH24:MI:SS.US'), i.locked
+    )::text)
+$$;
+
+CREATE OR REPLACE FUNCTION incident_event_hash(p_prev_hash TEXT, p_row_digest TEXT, p_payload TEXT) RETURNS TEXT
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT encode(sha256(convert_to(p_prev_hash || E'\n' || p_row_digest || E'\n' || p_payload, 'UTF8')), 'hex')
+$$;
+
+-- -----------------------------
+-- APPENDING EVENTS
+-- -----------------------------
+-- The writer holds the incident's row lock while this runs, so events for
+-- one incident are appended strictly one after another.
+CREATE OR REPLACE FUNCTION incident_events_append() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    digest TEXT := incident_row_digest(NEW);
+    event_type TEXT := 'created';
+    actor TEXT := coalesce(nullif(current_setting('incidents.actor', true), ''), session_user);
+    prev RECORD;
+    payload TEXT;
+BEGIN
+    IF NEW.incident_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'UPDATE' THEN
+        IF digest = incident_row_digest(OLD) THEN
+            RETURN NULL;
+        END IF;
+        event_type := CASE WHEN NEW.locked AND NOT OLD.locked THEN 'signed_off' ELSE 'updated' END;
+    END IF;
+
+    SELECT seq, hash INTO prev
+    FROM incident_events
+    WHERE care_home_id = NEW.care_home_id AND incident_id = NEW.incident_id
+    ORDER BY seq DESC
+    LIMIT 1;
+
+    payload := jsonb_build_object(
+        'incident_id', NEW.incident_id,
+        'seq', coalesce(prev.seq, 0) + 1,
+        'event', event_type,
+        'at', localtimestamp,
+        'actor', actor,
+        'row', incident_snapshot(NEW)
+    )::text;
+
+    INSERT INTO incident_events (
+        care_home_id, incident_id, seq, event_type, occurred_at, actor, row_digest, payload, prev_hash, hash
+    ) VALUES (
+        NEW.care_home_id, NEW.incident_id, coalesce(prev.seq, 0) + 1, event_type, localtimestamp, actor,
+        digest, payload, coalesce(prev.hash, repeat('0', 64)),
+        incident_event_hash(coalesce(prev.hash, repeat('0', 64)), digest, payload)
+    );
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS incidents_events_insert ON incidents;
+CREATE TRIGGER incidents_events_insert
+    AFTER INSERT ON incidents
+    FOR EACH ROW EXECUTE FUNCTION incident_events_append();
+
+DROP TRIGGER IF EXISTS incidents_events_update ON incidents;
+CREATE TRIGGER incidents_events_update
+    AFTER UPDATE ON incidents
+    FOR EACH ROW EXECUTE FUNCTION incident_events_append();
+
+-- -----------------------------
+-- APPEND-ONLY
+-- -----------------------------
+CREATE OR REPLACE FUNCTION incident_events_immutable() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    RAISE EXCEPTION 'incident_events is append-only'
+        USING ERRCODE = 'insufficient_privilege';
+END;
+$$;
+
+DROP TRIGGER IF EXISTS incident_events_no_change ON incident_events;
+CREATE TRIGGER incident_events_no_change
+    BEFORE UPDATE OR DELETE ON incident_events
+    FOR EACH ROW EXECUTE FUNCTION incident_events_immutable();
+
+DROP TRIGGER IF EXISTS incident_events_no_truncate ON incident_events;
+CREATE TRIGGER incident_events_no_truncate
+    BEFORE TRUNCATE ON incident_events
+    FOR EACH STATEMENT EXECUTE FUNCTION incident_events_immutable();
+
+-- -----------------------------
+-- BASELINE EVENTS FOR EXISTING INCIDENTS
+-- -----------------------------
+INSERT INTO incident_events (
+    care_home_id, incident_id, seq, event_type, occurred_at, actor, row_digest, payload, prev_hash, hash
+)
+SELECT care_home_id, incident_id, 1, 'baseline', localtimestamp, 'migration 0010',
+       row_digest, payload, repeat('0', 64), incident_event_hash(repeat('0', 64), row_digest, payload)
+FROM (
+    SELECT i.care_home_id, i.incident_id,
+           incident_row_digest(i) AS row_digest,
+           jsonb_build_object(
+               'incident_id', i.incident_id,
+               'seq', 1,
+               'event', 'baseline',
+               'at', localtimestamp,
+               'actor', 'migration 0010',
+               'row', incident_snapshot(i)
+           )::text AS payload
+    FROM incidents AS i
+    WHERE i.incident_id IS NOT NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM incident_events AS e
+          WHERE e.care_home_id = i.care_home_id AND e.incident_id = i.incident_id
+      )
+) AS baseline;
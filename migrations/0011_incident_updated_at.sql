@@ -0,0 +1,35 @@
+-- =================================================
+-- 0011: Change tracking for incremental page sync
+-- =================================================
+-- updated_at is stamped on every insert and on every update that changes
+-- the row, so a session holding a copy of an inspection page can fetch just
+-- the incidents changed since its last sync (incidents.sync_incidents_page)
+-- instead of reloading the page. clock_timestamp() rather than now(), so the
+-- stamp is taken as close to commit as possible.
+--
+-- Existing rows count as unchanged since long before any session synced
+-- (a constant default, so adding the column does not rewrite the table).
+
+ALTER TABLE incidents ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT '-infinity';
+ALTER TABLE incidents ALTER COLUMN updated_at SET DEFAULT now();
+
+CREATE OR REPLACE FUNCTION incident_updated_at_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW IS NOT DISTINCT FROM OLD THEN
+        RETURN NEW;
+    END IF;
+    NEW.updated_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$;
+
+-- Named to fire after the other BEFORE triggers (they run in name order),
+-- so derived columns they set are part of the comparison above.
+DROP TRIGGER IF EXISTS incidents_updated_at ON incidents;
+CREATE TRIGGER incidents_updated_at
+    BEFORE INSERT OR UPDATE ON incidents
+    FOR EACH ROW EXECUTE FUNCTION incident_updated_at_trigger();
+
+CREATE INDEX IF NOT EXISTS incidents_updated_idx
+    ON incidents (care_home_id, updated_at);
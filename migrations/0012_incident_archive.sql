@@ -0,0 +1,171 @@
+-- =================================================
+-- 0012: Archive tier for old signed-off incidents
+-- =================================================
+-- archive.py moves locked incidents older than the retention window from
+-- incidents into incidents_archive, one care home and month per
+-- transaction, so the hot table and its indexes only hold recent and open
+-- incidents. The archive keeps just the recorded columns and the indexes
+-- the listing and evidence packs need, and compresses rows more eagerly.
+--
+-- Readers that must see every incident (listing and page sync, incident
+-- record, CSV export, evidence packs, audit verification) select from all_incidents.
+-- Postgres plans it as a UNION ALL of the two tables, with each query's
+-- filters and column list pushed into both sides and partitions pruned on
+-- care_home_id; the listing becomes a merge of two index scans.
+
+CREATE TABLE IF NOT EXISTS incidents_archive (
+    id INTEGER NOT NULL,
+    care_home_id INTEGER NOT NULL,
+    incident_id TEXT NOT NULL,
+    incident_date DATE,
+    incident_time TIME,
+    category TEXT,
+    location TEXT,
+    resident_identifier TEXT,
+    resident_dob DATE,
+    resident_room TEXT,
+    incident_account TEXT,
+    immediate_actions_taken TEXT,
+    harm_injury_sustained TEXT,
+    harm_injury_details TEXT,
+    individuals_services_informed TEXT,
+    severity TEXT,
+    reported_by_name TEXT,
+    reported_by_role TEXT,
+    immediate_learning_actions TEXT,
+    audit_integrity_confirmation TEXT,
+    submitted_timestamp TIMESTAMP NOT NULL,
+    management_review_status TEXT,
+    management_reviewer_name TEXT,
+    management_reviewer_role TEXT,
+    management_review_outcome TEXT,
+    signoff_decision TEXT,
+    signoff_timestamp TIMESTAMP,
+    row_version INTEGER NOT NULL,
+    locked BOOLEAN NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (care_home_id, incident_id)
+) PARTITION BY HASH (care_home_id);
+
+-- toast_tuple_target: compress any row over 128 bytes, not just those over 2kB.
+DO $$
+BEGIN
+    FOR i IN 0..15 LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS incidents_archive_p%s PARTITION OF incidents_archive '
+            'FOR VALUES WITH (MODULUS 16, REMAINDER %s) WITH (toast_tuple_target = 128)',
+            lpad(i::text, 2, '0'), i
+        );
+    END LOOP;
+END $$;
+
+-- lz4 compresses the narratives faster than the default pglz; servers
+-- built without it keep pglz.
+DO $$
+BEGIN
+    ALTER TABLE incidents_archive
+        ALTER COLUMN incident_account SET COMPRESSION lz4,
+        ALTER COLUMN immediate_actions_taken SET COMPRESSION lz4,
+        ALTER COLUMN harm_injury_details SET COMPRESSION lz4,
+        ALTER COLUMN individuals_services_informed SET COMPRESSION lz4,
+        ALTER COLUMN immediate_learning_actions SET COMPRESSION lz4,
+        ALTER COLUMN management_review_outcome SET COMPRESSION lz4;
+EXCEPTION
+    WHEN feature_not_supported THEN
+        RAISE NOTICE 'lz4 is unavailable; the incident archive is compressed with pglz.';
+END $$;
+
+-- Listing (keyset order, optionally by severity; every archived incident
+-- is Completed) and evidence packs / date filters.
+CREATE INDEX IF NOT EXISTS incidents_archive_home_submitted_idx
+    ON incidents_archive (care_home_id, submitted_timestamp DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS incidents_archive_home_severity_submitted_idx
+    ON incidents_archive (care_home_id, severity, submitted_timestamp DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS incidents_archive_home_incident_date_idx
+    ON incidents_archive (care_home_id, incident_date);
+
+-- Page syncs (incidents.sync_incidents_page) look for changes in both tiers:
+-- an incident reviewed and then archived between two syncs is only here.
+CREATE INDEX IF NOT EXISTS incidents_archive_home_updated_idx
+    ON incidents_archive (care_home_id, updated_at);
+
+-- Archived incidents are locked: the guard from 0009 rejects any change.
+DROP TRIGGER IF EXISTS incidents_archive_locked_guard ON incidents_archive;
+CREATE TRIGGER incidents_archive_locked_guard
+    BEFORE UPDATE ON incidents_archive
+    FOR EACH ROW EXECUTE FUNCTION incident_locked_guard();
+
+-- -----------------------------
+-- INCIDENT IDS STAY UNIQUE ACROSS TIERS
+-- -----------------------------
+-- An insert of an incident ID the home has archived is skipped, as if it
+-- had hit the unique constraint with ON CONFLICT DO NOTHING; writers count
+-- it as already stored. The other BEFORE INSERT triggers only fill in
+-- derived columns, so the order they fire in relative to this one (name
+-- order) does not matter; AFTER triggers never see a skipped row.
+CREATE OR REPLACE FUNCTION incident_archived_skip() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM incidents_archive
+        WHERE care_home_id = NEW.care_home_id AND incident_id = NEW.incident_id
+    ) THEN
+        RETURN NULL;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS incidents_archived_skip ON incidents;
+CREATE TRIGGER incidents_archived_skip
+    BEFORE INSERT ON incidents
+    FOR EACH ROW EXECUTE FUNCTION incident_archived_skip();
+
+-- -----------------------------
+-- AUDIT VERIFICATION
+-- -----------------------------
+-- Same digest as incident_row_digest(incidents) in 0010, so chains verify
+-- unchanged whichever tier the incident is in.
+CREATE OR REPLACE FUNCTION incident_row_digest(i incidents_archive) RETURNS TEXT
+LANGUAGE sql STABLE AS $$
+    SELECT md5(ROW(
+        i.care_home_id, i.incident_id,
+        to_char(i.incident_date, 'YYYY-MM-DD'), to_char(i.incident_time, 'HH24:MI:SS.US'),
+        i.category, i.location, i.resident_identifier,
+        to_char(i.resident_dob, 'YYYY-MM-DD'), i.resident_room, i.incident_account,
+        i.immediate_actions_taken, i.harm_injury_sustained, i.harm_injury_details,
+        i.individuals_services_informed, i.severity, i.reported_by_name, i.reported_by_role,
+        i.immediate_learning_actions, i.audit_integrity_confirmation,
+        to_char(i.submitted_timestamp, 'YYYY-MM-DD HH24:MI:SS.US'),
+        i.management_review_status, i.management_reviewer_name, i.management_reviewer_role,
+        i.management_review_outcome, i.signoff_decision,
+        to_char(i.signoff_timestamp, 'YYYY-MM-DD HH24:MI:SS.US'), i.locked
+    )::text)
+$$;
+
+-- -----------------------------
+-- READING BOTH TIERS
+-- -----------------------------
+CREATE OR REPLACE VIEW all_incidents AS
+    SELECT
+        id, care_home_id, incident_id, incident_date, incident_time, category, location,
+        resident_identifier, resident_dob, resident_room, incident_account,
+        immediate_actions_taken, harm_injury_sustained, harm_injury_details,
+        individuals_services_informed, severity, reported_by_name, reported_by_role,
+        immediate_learning_actions, audit_integrity_confirmation, submitted_timestamp,
+        management_review_status, management_reviewer_name, management_reviewer_role,
+        management_review_outcome, signoff_decision, signoff_timestamp, row_version, locked, updated_at
+    FROM incidents
+    UNION ALL
+    SELECT
+        id, care_home_id, incident_id, incident_date, incident_time, category, location,
+        resident_identifier, resident_dob, resident_room, incident_account,
+        immediate_actions_taken, harm_injury_sustained, harm_injury_details,
+        individuals_services_informed, severity, reported_by_name, reported_by_role,
+        immediate_learning_actions, audit_integrity_confirmation, submitted_timestamp,
+        management_review_status, management_reviewer_name, management_reviewer_role,
+        management_review_outcome, signoff_decision, signoff_timestamp, row_version, locked, updated_at
+    FROM incidents_archive;
@@ -0,0 +1,16 @@
+-- =================================================
+-- 0013: API keys for integrations (api.py)
+-- =================================================
+-- Each key belongs to one care home and acts with a role, like a user.
+-- Only the SHA-256 of the key is stored; keys are 256-bit random tokens,
+-- so a fast hash is enough (unlike passwords, which use bcrypt).
+
+CREATE TABLE IF NOT EXISTS api_keys (
+    id SERIAL PRIMARY KEY,
+    care_home_id INTEGER NOT NULL REFERENCES care_homes (id),
+    name TEXT NOT NULL,
+    role TEXT NOT NULL CHECK (role IN ('staff', 'manager')),
+    key_hash TEXT NOT NULL UNIQUE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    revoked_at TIMESTAMP
+);
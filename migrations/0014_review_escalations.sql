@@ -0,0 +1,33 @@
+-- =================================================
+-- 0014: Review deadlines and escalations (escalation.py)
+-- =================================================
+-- Each severity has a review deadline counted from submission. Once a
+-- pending incident passes it, the escalation scheduler records it here and
+-- sends its care home a digest of the incidents newly overdue.
+
+-- Only pending incidents, across every care home: the scheduler asks, for
+-- each severity, which were submitted before that severity's cutoff. The
+-- index stays as small as the review backlog however many homes there are,
+-- and answers the query without visiting the table.
+CREATE INDEX IF NOT EXISTS incidents_pending_severity_submitted_idx
+    ON incidents (severity, submitted_timestamp)
+    INCLUDE (care_home_id, incident_id)
+    WHERE management_review_status = 'Pending';
+
+-- One row per overdue incident. notified_at stays empty until the digest
+-- holding it has been delivered, so a failed delivery is retried.
+CREATE TABLE IF NOT EXISTS incident_escalations (
+    id BIGSERIAL PRIMARY KEY,
+    care_home_id INTEGER NOT NULL REFERENCES care_homes (id),
+    incident_id TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    submitted_timestamp TIMESTAMP NOT NULL,
+    due_at TIMESTAMP NOT NULL,
+    escalated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    notified_at TIMESTAMPTZ,
+    UNIQUE (care_home_id, incident_id)
+);
+
+CREATE INDEX IF NOT EXISTS incident_escalations_unnotified_idx
+    ON incident_escalations (care_home_id, id)
+    WHERE notified_at IS NULL;
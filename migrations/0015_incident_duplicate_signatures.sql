@@ -0,0 +1,65 @@
+-- =================================================
+-- 0015: Duplicate detection at submission (duplicates.py)
+-- =================================================
+-- account_signature is a MinHash sketch of the incident account: the 64
+-- smallest distinct hashes of its two-word shingles (lower-cased,
+-- punctuation dropped); short shingles still match when two reporters word
+-- the same event differently. Two sketches estimate how much of their wording
+-- two accounts share, so the report form can compare a new account with a
+-- resident's recent incidents without reading or comparing the narratives.
+-- A BEFORE trigger keeps it current, as for narrative_tsv (0008).
+
+ALTER TABLE incidents ADD COLUMN IF NOT EXISTS account_signature INTEGER[];
+
+CREATE OR REPLACE FUNCTION incident_account_signature(account TEXT) RETURNS INTEGER[]
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT coalesce(array_agg(h ORDER BY h), '{}')
+    FROM (
+        SELECT DISTINCT hashtext(array_to_string(w.words[i:i + 1], ' ')) AS h
+        FROM (SELECT array_remove(regexp_split_to_array(lower(coalesce(account, '')), '[^a-z0-9]+'), '') AS words) w,
+             generate_series(1, greatest(cardinality(w.words) - 1, 1)) AS i
+        WHERE cardinality(w.words) > 0
+        ORDER BY h
+        LIMIT 64
+    ) bottom
+$$;
+
+-- Estimated Jaccard similarity (0-1) of the two accounts' shingle sets:
+-- the share of the 64 smallest hashes of both sketches found in each.
+CREATE OR REPLACE FUNCTION incident_account_similarity(a INTEGER[], b INTEGER[]) RETURNS REAL
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT coalesce(avg((u.h = ANY (a) AND u.h = ANY (b))::int), 0)::real
+    FROM (
+        SELECT h FROM unnest(a) AS h
+        UNION
+        SELECT h FROM unnest(b) AS h
+        ORDER BY h
+        LIMIT 64
+    ) u
+$$;
+
+CREATE OR REPLACE FUNCTION incident_account_signature_trigger() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.account_signature := incident_account_signature(NEW.incident_account);
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS incidents_account_signature ON incidents;
+CREATE TRIGGER incidents_account_signature
+    BEFORE INSERT OR UPDATE OF incident_account
+    ON incidents
+    FOR EACH ROW EXECUTE FUNCTION incident_account_signature_trigger();
+
+-- The signature is derived and never shown, so filling it in is not a change
+-- page syncs (0011) need to fetch; the audit log skips it as unchanged.
+ALTER TABLE incidents DISABLE TRIGGER incidents_updated_at;
+UPDATE incidents
+SET account_signature = incident_account_signature(incident_account)
+WHERE account_signature IS NULL;
+ALTER TABLE incidents ENABLE TRIGGER incidents_updated_at;
+
+-- Candidates are the same resident's incidents dated around the new one.
+CREATE INDEX IF NOT EXISTS incidents_home_resident_date_idx
+    ON incidents (care_home_id, lower(resident_identifier), incident_date);
@@ -0,0 +1,13 @@
+-- =================================================
+-- 0016: Lock accepted sign-offs stored unlocked
+-- =================================================
+-- Until insert_incidents() set locked itself, incidents imported or
+-- submitted through the API already signed off "Accepted" were stored
+-- unlocked. Lock them as 0009 did for the incidents before it; each gets
+-- a "signed_off" event in the audit log (0010).
+
+SELECT set_config('incidents.actor', 'migration 0016', true);
+
+UPDATE incidents
+SET locked = TRUE
+WHERE signoff_decision = 'Accepted' AND NOT locked;
@@ -0,0 +1,14 @@
+-- =================================================
+-- 0017: Withdraw undelivered escalations once reviewed
+-- =================================================
+-- An escalation whose digest could not be delivered is retried each
+-- cycle. If its incident has been reviewed (or archived) in the meantime,
+-- the escalation scheduler sets withdrawn_at instead, and it is no longer
+-- sent.
+
+ALTER TABLE incident_escalations ADD COLUMN IF NOT EXISTS withdrawn_at TIMESTAMPTZ;
+
+DROP INDEX IF EXISTS incident_escalations_unnotified_idx;
+CREATE INDEX IF NOT EXISTS incident_escalations_unsent_idx
+    ON incident_escalations (care_home_id, id)
+    WHERE notified_at IS NULL AND withdrawn_at IS NULL;
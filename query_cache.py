@@ -0,0 +1,220 @@
+# query_cache.py
+"""
+Short-TTL, LRU query cache for the incident read helpers.
+
+Entries are keyed by (scope, helper name, arguments), where scope identifies
+the care home whose data the result came from. Each scope has its own
+generation, so a write to one home does not stop others caching. Writers invalidate the cache
+after committing; with QUERY_CACHE_NOTIFY enabled they also send a Postgres
+NOTIFY so every app replica drops its stale entries.
+"""
+import functools
+import inspect
+import logging
+import select
+import threading
+import time
+from collections import OrderedDict
+
+import streamlit as st
+import psycopg2
+
+from database import get_query_metrics, get_setting
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "incidents_changed"
+
+_MISSING = object()
+
+
+class QueryCache:
+    """Thread-safe cache with a per-entry time-to-live and LRU eviction."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 30.0):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._clock = 0  # counts invalidations
+        self._cleared_at = 0  # clock value of the last full invalidation
+        self._generations = {}  # scope -> clock value of its last invalidation
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value
+                del self._entries[key]
+                self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            return default
+
+    def _generation(self, scope) -> int:
+        return max(self._cleared_at, self._generations.get(scope, 0))
+
+    def generation(self, scope) -> int:
+        """Changes whenever `scope` is invalidated, alone or with everything else."""
+        with self._lock:
+            return self._generation(scope)
+
+    def set(self, key, value, generation: int | None = None) -> None:
+        """
+        Stores a value. Passing the generation of the key's scope read before
+        the value was loaded discards it if that scope was invalidated in
+        between, so a slow read can never re-cache data that a concurrent
+        write made stale.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation(key[0]):
+                return
+            self._entries[key] = (time.monotonic() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, scope=_MISSING) -> None:
+        """Drops every entry, or only those whose key starts with `scope`."""
+        with self._lock:
+            self._clock += 1
+            if scope is _MISSING:
+                self._entries.clear()
+                self._cleared_at = self._clock
+                self._generations.clear()
+            else:
+                for key in [k for k in self._entries if k[0] == scope]:
+                    del self._entries[key]
+                self._generations[scope] = self._clock
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> dict:
+        """Snapshot of hit / miss counters."""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "size": len(self._entries),
+                "max": self._maxsize,
+                "ttl_seconds": self._ttl,
+                "hit_ratio": self._stats["hits"] / lookups if lookups else 0.0,
+                **self._stats,
+            }
+
+
+# =================================================
+# CROSS-REPLICA INVALIDATION (LISTEN / NOTIFY)
+# =================================================
+def notify_enabled() -> bool:
+    return str(get_setting("QUERY_CACHE_NOTIFY", "false")).lower() in ("1", "true", "yes")
+
+
+def notify_change(cur, care_home_id: int) -> None:
+    """
+    Queues a change notification for one care home on the writer's
+    transaction. Postgres delivers it to listening replicas only if the
+    transaction commits.
+    """
+    if notify_enabled():
+        cur.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, str(care_home_id)))
+
+
+def _listen_for_changes(cache: QueryCache, dsn: str) -> None:
+    """Background thread: invalidates the cache whenever another replica writes."""
+    backoff = 1.0
+    while True:
+        conn = None
+        try:
+            conn = psycopg2.connect(dsn)
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            # Anything written while we were disconnected went unannounced.
+            cache.invalidate()
+            backoff = 1.0
+
+            while True:
+                if select.select([conn], [], [], 60.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    payload = conn.notifies.pop(0).payload
+                    if payload.isdigit():
+                        cache.invalidate(int(payload))
+                    else:
+                        cache.invalidate()
+        except (psycopg2.Error, OSError):
+            logger.warning("Query cache listener lost its connection; retrying in %.0fs", backoff, exc_info=True)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+        finally:
+            if conn is not None and not conn.closed:
+                conn.close()
+
+
+@st.cache_resource
+def get_query_cache() -> QueryCache:
+    """
+    Returns the process-wide query cache, sized by QUERY_CACHE_SIZE (entries)
+    and QUERY_CACHE_TTL (seconds). Starts the LISTEN thread when
+    QUERY_CACHE_NOTIFY is enabled.
+    """
+    cache = QueryCache(
+        maxsize=int(get_setting("QUERY_CACHE_SIZE", 256)),
+        ttl=float(get_setting("QUERY_CACHE_TTL", 30)),
+    )
+    get_query_metrics().register_collector("query_cache", cache.stats)
+    if notify_enabled():
+        threading.Thread(
+            target=_listen_for_changes,
+            args=(cache, get_setting("DATABASE_URL")),
+            name="query-cache-listener",
+            daemon=True,
+        ).start()
+    return cache
+
+
+def cached_read(func):
+    """
+    Caches a read helper's result under (care home, name, arguments). The
+    helper's first argument must be the care home ID, so a write to one home
+    invalidates only that home's entries. Results are shared between
+    sessions, so callers must treat them as read-only.
+
+    Arguments are bound to the helper's signature, defaults included, so
+    positional and keyword calls for the same arguments share an entry.
+    """
+    signature = inspect.signature(func)
+
+    def cache_key(care_home_id, *args, **kwargs) -> tuple:
+        bound = signature.bind(care_home_id, *args, **kwargs)
+        bound.apply_defaults()
+        return (care_home_id, func.__name__, tuple(bound.arguments.values())[1:])
+
+    @functools.wraps(func)
+    def wrapper(care_home_id, *args, **kwargs):
+        cache = get_query_cache()
+        key = cache_key(care_home_id, *args, **kwargs)
+        value = cache.get(key)
+        if value is _MISSING:
+            generation = cache.generation(care_home_id)
+            value = func(care_home_id, *args, **kwargs)
+            cache.set(key, value, generation)
+        return value
+
+    wrapper.uncached = func
+    wrapper.cache_key = cache_key
+    return wrapper
+
+
+def prime(func, care_home_id: int, args: tuple, value, generation: int) -> None:
+    """
+    Stores `value` as the cached result of a `cached_read` helper called
+    with `args`. `generation` is the care home's generation read before
+    `value` was loaded, as in cached_read.
+    """
+    get_query_cache().set(func.cache_key(care_home_id, *args), value, generation)
@@ -0,0 +1,155 @@
+"""
+Cold-start and page render timing for the Streamlit app.
+
+Drives app.py headlessly with Streamlit's AppTest in this (fresh) process,
+as one browser session would: the cold first run showing the sign-in
+page, signing in, then for each page the first visit and a plain rerun,
+which is what every widget interaction on that page costs. Each step
+reports its wall time and which heavy libraries it was the first to import.
+
+Usage:
+    python startup_timing.py --username jsmith [--reruns 5] [-o startup.json]
+        [--compare before.json]
+
+The password is read from STARTUP_PASSWORD, or prompted for. Sign in to a
+test database: the pages run their real queries. DATABASE_URL and the
+other settings are read as the app reads them. Pass an earlier run's file
+to --compare to show each step before and after a change.
+"""
+import argparse
+import getpass
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+
+from streamlit.testing.v1 import AppTest
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Libraries worth deferring: each adds tens to hundreds of milliseconds to the first import.
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "reportlab", "bcrypt", "psycopg2")
+
+
+@dataclass
+class StepTiming:
+    step: str
+    ms: float
+    imported: list = field(default_factory=list)  # heavy modules first imported by this step
+
+    def summary(self) -> str:
+        loaded = f"  (imports {', '.join(self.imported)})" if self.imported else ""
+        return f"{self.step:<60} {self.ms:>9.1f} ms{loaded}"
+
+
+class AppSession:
+    """One headless browser session on app.py, timing each run."""
+
+    def __init__(self, timeout: float):
+        self.app = AppTest.from_file(os.path.join(APP_DIR, "app.py"), default_timeout=timeout)
+        self.steps = []
+
+    def run(self, step: str, repeat: int = 1) -> StepTiming:
+        before = {name for name in HEAVY_MODULES if name in sys.modules}
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            self.app.run()
+            times.append((time.perf_counter() - started) * 1000)
+            if self.app.exception:
+                raise RuntimeError(f"{step}: {self.app.exception[0].message}")
+        imported = [name for name in HEAVY_MODULES if name in sys.modules and name not in before]
+        timing = StepTiming(step, statistics.median(times), imported)
+        self.steps.append(timing)
+        print(timing.summary())
+        return timing
+
+    def sign_in(self, username: str, password: str) -> None:
+        self.app.text_input[0].input(username)
+        self.app.text_input[1].input(password)
+        self.app.button[0].click()
+        self.run("sign in")
+        if self.app.error:
+            raise RuntimeError(f"sign in: {self.app.error[0].value}")
+
+    def pages(self) -> list[str]:
+        return list(self.app.sidebar.radio[0].options)
+
+    def open_page(self, page: str, reruns: int) -> None:
+        self.app.sidebar.radio[0].set_value(page)
+        self.run(f"{page}: first visit")
+        self.run(f"{page}: rerun (median of {reruns})", repeat=reruns)
+
+
+def compare(steps: list[dict], baseline: list[dict]) -> list[str]:
+    """A line per step also in the baseline, with its time before and now."""
+    before = {s["step"].split(" (median")[0]: s for s in baseline}
+    lines = []
+    for s in steps:
+        old = before.get(s["step"].split(" (median")[0])
+        if old and old["ms"]:
+            lines.append(f"{s['step']:<60} {old['ms']:>9.1f} -> {s['ms']:>9.1f} ms ({s['ms'] / old['ms'] - 1:+.0%})")
+    return lines
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=APP_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time the app's cold start and page renders.")
+    parser.add_argument("--username", required=True, help="account to sign in with (on a test database)")
+    parser.add_argument("--pages", help="comma-separated page names (default every page the user can open)")
+    parser.add_argument("--reruns", type=int, default=5, help="reruns timed per page")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds allowed per run")
+    parser.add_argument("-o", "--output", default="startup.json", help="JSON results file")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    password = os.environ.get("STARTUP_PASSWORD") or getpass.getpass(f"Password for {args.username}: ")
+    already = [name for name in HEAVY_MODULES if name in sys.modules]
+    if already:
+        print(f"❌ {', '.join(already)} already imported; run this script in a fresh interpreter.")
+        return 2
+
+    print("=== App Startup Timing ===")
+    session = AppSession(args.timeout)
+    try:
+        session.run("cold start (sign-in page)")
+        session.sign_in(args.username, password)
+        pages = args.pages.split(",") if args.pages else session.pages()
+        for page in pages:
+            session.open_page(page.strip(), args.reruns)
+    except RuntimeError as exc:
+        print(f"❌ {exc}")
+        return 1
+
+    steps = [asdict(s) for s in session.steps]
+    with open(args.output, "w") as f:
+        json.dump(
+            {"started_at": datetime.now().isoformat(timespec="seconds"), "git_commit": _git_commit(), "steps": steps},
+            f,
+            indent=2,
+        )
+    print(f"\n✅ {len(steps)} steps written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            lines = compare(steps, json.load(f)["steps"])
+        print("\n=== Compared with " + args.compare + " ===")
+        for line in lines:
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+"""Manifest validation for `admin.py provision` (no database)."""
+from admin import StaffEntry, validate_entries
+
+
+def test_valid_manifest_has_no_errors():
+    entries = [
+        StaffEntry("Home A", "alice", "pw123456", "manager"),
+        StaffEntry("Home A", "bob", "pw123456", "staff"),
+    ]
+    assert validate_entries(entries) == []
+
+
+def test_usernames_differing_only_by_whitespace_are_duplicates():
+    entries = [
+        StaffEntry("Home A", "bob ", "pw123456", "staff"),
+        StaffEntry("Home B", "bob", "pw123456", "staff"),
+    ]
+    assert validate_entries(entries) == ["entry 2: username 'bob' is already used by entry 1."]
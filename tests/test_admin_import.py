@@ -0,0 +1,93 @@
+"""Row reading and normalisation for the bulk importer (dry runs only; no database)."""
+import csv
+import json
+from datetime import date, datetime, time
+
+from admin_import import import_incidents, normalise_row, read_rows
+
+VALID_ROW = {
+    "Incident ID": "IMP-1",
+    "Incident date": "31/01/2024",
+    "Incident time": "14:05",
+    "Category": "Fall",
+    "Location": "Lounge",
+    "Resident identifier": "Resident 7",
+    "Incident account": "Found on the floor beside the chair.",
+    "Harm / injury sustained": "no",
+    "Severity": "Low",
+    "Reported by (name)": "A. Carer",
+    "Reported by (role)": "Carer",
+    "Audit integrity confirmation": "yes",
+}
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(VALID_ROW))
+        writer.writeheader()
+        writer.writerows(rows)
+    return str(path)
+
+
+def test_normalise_row_parses_and_fills_form_defaults():
+    record, errors = normalise_row(VALID_ROW)
+
+    assert errors == []
+    assert record["Incident date"] == date(2024, 1, 31)
+    assert record["Incident time"] == time(14, 5)
+    assert record["Submitted timestamp"] == datetime(2024, 1, 31, 14, 5)
+    assert record["Harm / injury sustained"] == "No"
+    assert record["Harm / injury details"] == "No harm or injury sustained"
+    assert record["Audit integrity confirmation"] == "Confirmed"
+    assert record["Management review status"] == "Pending"
+
+
+def test_missing_ids_are_derived_from_the_row_so_reruns_match():
+    record, _ = normalise_row({**VALID_ROW, "Incident ID": ""})
+    again, _ = normalise_row({**VALID_ROW, "Incident ID": "", "Severity": "High"})
+    other, _ = normalise_row({**VALID_ROW, "Incident ID": "", "Location": "Garden"})
+
+    assert record["Incident ID"].startswith("CSI-20240131-140500-")
+    assert len(record["Incident ID"]) == len("CSI-20240131-140500-") + 5
+    assert again["Incident ID"] == record["Incident ID"]
+    assert other["Incident ID"] != record["Incident ID"]
+
+
+def test_normalise_row_reports_unparseable_and_missing_values():
+    _, errors = normalise_row({**VALID_ROW, "Incident time": "25:99", "Management review status": "Done"})
+    assert errors == [
+        "Incident time: Time '25:99' is not in a recognised format.",
+        "Management review status must be Pending or Completed.",
+    ]
+    _, errors = normalise_row({**VALID_ROW, "Incident date": ""})
+    assert errors == ["Incident date is required."]
+
+
+def test_blank_incident_time_is_accepted():
+    record, errors = normalise_row({**VALID_ROW, "Incident time": ""})
+    assert errors == []
+    assert record["Incident time"] is None
+    assert record["Submitted timestamp"] == datetime(2024, 1, 31)
+
+
+def test_read_rows_reports_malformed_jsonl_lines(tmp_path):
+    path = tmp_path / "incidents.jsonl"
+    path.write_text(json.dumps(VALID_ROW) + "\n\n" + '{"Incident ID": \n' + "[1, 2]\n", encoding="utf-8")
+
+    rows = list(read_rows(str(path)))
+    assert [(line_no, error is None) for line_no, _, error in rows] == [(1, True), (3, False), (4, False)]
+    assert rows[0][1] == VALID_ROW
+    assert rows[1][2].startswith("Not valid JSON")
+
+
+def test_dry_run_counts_valid_invalid_and_duplicate_rows(tmp_path):
+    path = write_csv(tmp_path / "incidents.csv", [
+        VALID_ROW,
+        {**VALID_ROW, "Incident ID": "IMP-2", "Incident time": ""},
+        {**VALID_ROW, "Incident ID": "IMP-3", "Severity": "Extreme"},
+        VALID_ROW,
+    ])
+
+    report = import_incidents(1, path, dry_run=True)
+    assert (report.rows_read, report.invalid, report.duplicates_in_file, report.inserted) == (4, 1, 1, 0)
+    assert [(line_no, incident_id) for line_no, incident_id, _ in report.errors] == [(4, "IMP-3")]
@@ -0,0 +1,85 @@
+"""
+Request validation in the integration API. Requests are sent to the ASGI
+app directly and rejected before any query runs, so no database is needed.
+"""
+import json
+
+import anyio
+import pytest
+
+import api
+from auth import ApiKey
+
+
+async def _call(method: str, path: str, chunks: list[bytes], headers: dict) -> tuple[int, dict]:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in headers.items()],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    pending = [{"type": "http.request", "body": chunk, "more_body": n < len(chunks) - 1}
+               for n, chunk in enumerate(chunks)] or [{"type": "http.request", "body": b"", "more_body": False}]
+    sent = []
+
+    async def receive():
+        return pending.pop(0) if pending else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    await api.app(scope, receive, send)
+    status = next(m["status"] for m in sent if m["type"] == "http.response.start")
+    body = b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+    return status, json.loads(body)
+
+
+def post(path: str, chunks: list[bytes], headers: dict | None = None) -> tuple[int, dict]:
+    return anyio.run(_call, "POST", path, chunks, {"content-type": "application/json", **(headers or {})})
+
+
+@pytest.fixture(autouse=True)
+def manager_key(monkeypatch):
+    async def authenticate(request, page):
+        return ApiKey(1, "test", "manager", 1)
+
+    monkeypatch.setattr(api, "authenticate", authenticate)
+
+
+def test_review_fields_must_be_strings():
+    review = {
+        "row_version": 1,
+        "reviewer_name": 5,
+        "reviewer_role": ["Manager"],
+        "review_outcome": "Reviewed",
+        "signoff_decision": "Accepted",
+    }
+    status, body = post("/v1/incidents/CSI-1/review", [json.dumps(review).encode()])
+
+    assert status == 422
+    assert body["errors"] == ["reviewer_name must be a string.", "reviewer_role must be a string."]
+
+
+def test_review_fields_are_required():
+    status, body = post("/v1/incidents/CSI-1/review", [b'{"row_version": 1, "signoff_decision": "Accepted"}'])
+
+    assert status == 422
+    assert body["errors"] == ["reviewer_name is required.", "reviewer_role is required.", "review_outcome is required."]
+
+
+def test_declared_oversized_body_is_refused_before_reading():
+    status, _ = post("/v1/incidents", [], {"content-length": str(api.MAX_BODY_BYTES + 1)})
+    assert status == 413
+
+
+def test_streamed_body_is_refused_once_past_the_limit():
+    chunk = b" " * (api.MAX_BODY_BYTES // 4)
+    status, _ = post("/v1/incidents", [b"{"] + [chunk] * 5 + [b"}"])
+    assert status == 413
@@ -0,0 +1,39 @@
+"""Hash-chain verification of incident events (no database)."""
+from audit_log import GENESIS_HASH, chain_problems, event_hash
+
+
+def make_chain(payloads):
+    events, prev = [], GENESIS_HASH
+    for seq, payload in enumerate(payloads, start=1):
+        digest = f"digest-{seq}"
+        stored = event_hash(prev, digest, payload)
+        events.append((seq, digest, payload, prev, stored))
+        prev = stored
+    return events
+
+
+def test_intact_chain_has_no_problems():
+    assert chain_problems(make_chain(["created", "updated", "signed_off"])) == []
+
+
+def test_altered_payload_is_reported():
+    events = make_chain(["created", "updated"])
+    seq, digest, _, prev, stored = events[1]
+    events[1] = (seq, digest, "updated differently", prev, stored)
+    assert chain_problems(events) == ["event 2 was altered after it was recorded"]
+
+
+def test_removed_event_is_reported():
+    events = make_chain(["created", "updated", "signed_off"])
+    del events[1]
+    assert chain_problems(events) == [
+        "event 2 is missing (next event is 3)",
+        "event 3 does not follow on from the event before it",
+    ]
+
+
+def test_rehashed_event_still_breaks_the_link_to_its_successor():
+    events = make_chain(["created", "updated", "signed_off"])
+    seq, digest, _, prev, _ = events[1]
+    events[1] = (seq, digest, "forged", prev, event_hash(prev, digest, "forged"))
+    assert chain_problems(events) == ["event 3 does not follow on from the event before it"]
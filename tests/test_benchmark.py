@@ -0,0 +1,28 @@
+"""Result helpers of the benchmark (no database)."""
+from benchmark import compare, percentile
+
+
+def run(operation, p95, size=1000, concurrency=1):
+    return {"operation": operation, "size": size, "concurrency": concurrency, "latency_ms": {"p95": p95}}
+
+
+def test_percentile_is_nearest_rank():
+    values = [float(n) for n in range(1, 101)]
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 95) == 95.0
+    assert percentile(values, 100) == 100.0
+    assert percentile([7.0], 99) == 7.0
+    assert percentile([], 50) == 0.0
+
+
+def test_compare_flags_only_p95_regressions_beyond_tolerance():
+    baseline = [run("list_page", 10.0), run("get_record", 2.0), run("export_csv", 0.0)]
+    results = [
+        run("list_page", 12.4),  # +24%: within tolerance
+        run("get_record", 3.0),  # +50%
+        run("export_csv", 5.0),  # no usable baseline
+        run("review", 9.0),  # not in the baseline
+    ]
+    lines = compare(results, baseline, tolerance=0.25)
+    assert len(lines) == 1
+    assert lines[0].startswith("get_record at 1,000 incidents x1: p95 2.00 -> 3.00 ms")
@@ -0,0 +1,17 @@
+"""Which address the per-IP sign-in limiter counts (no database)."""
+from auth import client_address
+
+
+def test_header_is_ignored_without_trusted_proxies():
+    assert client_address("203.0.113.9", "198.51.100.1", trusted_proxies=0) == "203.0.113.9"
+
+
+def test_takes_the_hop_added_by_the_outermost_trusted_proxy():
+    forwarded = "198.51.100.1, 192.0.2.44, 10.0.0.2"  # first entry supplied by the client
+    assert client_address("10.0.0.3", forwarded, trusted_proxies=1) == "10.0.0.2"
+    assert client_address("10.0.0.3", forwarded, trusted_proxies=2) == "192.0.2.44"
+
+
+def test_falls_back_to_the_peer_when_the_header_is_short_or_missing():
+    assert client_address("10.0.0.3", "192.0.2.44", trusted_proxies=2) == "10.0.0.3"
+    assert client_address("10.0.0.3", None, trusted_proxies=1) == "10.0.0.3"
@@ -0,0 +1,124 @@
+"""ConnectionPool checkout, return and timeout behaviour, with fake connections (no Postgres needed)."""
+import threading
+import time
+
+import psycopg2
+import pytest
+
+import database
+from database import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.autocommit = True
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections(monkeypatch):
+    opened = []
+
+    def connect(dsn):
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    monkeypatch.setattr(database.psycopg2, "connect", connect)
+    return opened
+
+
+def test_rejects_invalid_sizes(connections):
+    with pytest.raises(ValueError):
+        ConnectionPool("dsn", minconn=3, maxconn=2)
+    with pytest.raises(ValueError):
+        ConnectionPool("dsn", minconn=0, maxconn=0)
+
+
+def test_opens_minconn_up_front_and_reuses_returned_connections(connections):
+    pool = ConnectionPool("dsn", minconn=1, maxconn=2)
+    assert len(connections) == 1
+
+    conn = pool.getconn()
+    assert conn is connections[0]
+    assert conn.autocommit is False
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert pool.stats()["connects"] == 1
+
+
+def test_times_out_when_exhausted(connections):
+    pool = ConnectionPool("dsn", minconn=0, maxconn=2, timeout=0.05)
+    pool.getconn()
+    pool.getconn()
+
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert time.monotonic() - started >= 0.05
+    stats = pool.stats()
+    assert (stats["size"], stats["in_use"], stats["timeouts"]) == (2, 2, 1)
+
+
+def test_waiting_checkout_gets_the_next_returned_connection(connections):
+    pool = ConnectionPool("dsn", minconn=0, maxconn=1, timeout=5)
+    held = pool.getconn()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.getconn()))
+    waiter.start()
+    while pool.stats()["waiting"] == 0:
+        time.sleep(0.001)
+
+    pool.putconn(held)
+    waiter.join(timeout=5)
+    assert got == [held]
+    assert pool.stats()["waits"] == 1
+
+
+def test_discarded_connection_frees_its_slot(connections):
+    pool = ConnectionPool("dsn", minconn=0, maxconn=1, timeout=0.05)
+    conn = pool.getconn()
+    pool.putconn(conn, close=True)
+
+    assert conn.closed
+    assert pool.getconn() is not conn
+    assert pool.stats()["discarded"] == 1
+
+
+def test_connection_returned_mid_transaction_is_rolled_back(connections):
+    pool = ConnectionPool("dsn", minconn=0, maxconn=1)
+    conn = pool.getconn()
+    conn.status = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+    pool.putconn(conn)
+
+    assert conn.rollbacks == 1
+    assert pool.getconn() is conn
+
+
+def test_closed_idle_connection_is_replaced(connections):
+    pool = ConnectionPool("dsn", minconn=1, maxconn=1)
+    connections[0].closed = 1
+
+    conn = pool.getconn()
+    assert conn is connections[1]
+    assert pool.stats()["reconnects"] == 1
+
+
+def test_closed_pool_refuses_checkouts(connections):
+    pool = ConnectionPool("dsn", minconn=1, maxconn=1)
+    pool.close()
+
+    assert connections[0].closed
+    with pytest.raises(psycopg2.InterfaceError):
+        pool.getconn()
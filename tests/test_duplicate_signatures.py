@@ -0,0 +1,63 @@
+"""
+MinHash account signatures (migrations/0015). These run in Postgres, so
+the tests need TEST_DATABASE_URL pointing at a migrated test database and
+are skipped without it.
+"""
+import os
+
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+@pytest.fixture(scope="module")
+def cur():
+    conn = psycopg2.connect(TEST_DATABASE_URL)
+    try:
+        with conn.cursor() as cur:
+            yield cur
+    finally:
+        conn.close()
+
+
+def similarity(cur, a: str, b: str) -> float:
+    cur.execute(
+        "SELECT incident_account_similarity(incident_account_signature(%s), incident_account_signature(%s))",
+        (a, b),
+    )
+    return cur.fetchone()[0]
+
+
+def test_signature_ignores_case_and_punctuation(cur):
+    assert similarity(cur, "Found on the floor.", "found ON the floor") == 1.0
+
+
+def test_signature_is_bounded_and_sorted(cur):
+    cur.execute("SELECT incident_account_signature(%s)", (" ".join(f"word{n}" for n in range(500)),))
+    signature = cur.fetchone()[0]
+    assert len(signature) == 64
+    assert signature == sorted(signature)
+
+
+def test_paraphrase_scores_above_the_duplicate_threshold_and_unrelated_below(cur):
+    from duplicates import DUPLICATE_SIMILARITY
+
+    report = (
+        "Resident found on the floor beside the bed at 14:00, helped up by two carers, "
+        "no injury seen, family informed"
+    )
+    paraphrase = (
+        "At 14:00 the resident was found on the floor beside the bed. "
+        "Helped up by two carers; no injury seen and family informed."
+    )
+    unrelated = "Evening medication was given an hour late because the trolley was locked"
+    assert similarity(cur, report, paraphrase) >= DUPLICATE_SIMILARITY
+    assert similarity(cur, report, unrelated) < DUPLICATE_SIMILARITY
+
+
+def test_empty_accounts_have_no_similarity(cur):
+    assert similarity(cur, "", "") == 0.0
+    assert similarity(cur, "", "Found on the floor") == 0.0
@@ -0,0 +1,131 @@
+"""QueryCache TTL, LRU and generation handling, and the cached_read / prime helpers."""
+import pytest
+
+import query_cache
+from query_cache import QueryCache, cached_read, prime
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_cache.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(monkeypatch, clock):
+    cache = QueryCache(maxsize=3, ttl=30.0)
+    monkeypatch.setattr(query_cache, "get_query_cache", lambda: cache)
+    return cache
+
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.set((1, "f", ()), "value")
+    clock.now += 29
+    assert cache.get((1, "f", ())) == "value"
+    clock.now += 2
+    assert cache.get((1, "f", ()), None) is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    for n in range(3):
+        cache.set((1, "f", (n,)), n)
+    cache.get((1, "f", (0,)))  # 1 is now the least recently used
+    cache.set((1, "f", (3,)), 3)
+
+    assert cache.get((1, "f", (1,)), None) is None
+    assert cache.get((1, "f", (0,))) == 0
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_drops_only_the_scope(cache):
+    cache.set((1, "f", ()), "home 1")
+    cache.set((2, "f", ()), "home 2")
+    cache.invalidate(1)
+
+    assert cache.get((1, "f", ()), None) is None
+    assert cache.get((2, "f", ())) == "home 2"
+
+
+def test_set_from_an_older_generation_is_dropped(cache):
+    generation = cache.generation(1)
+    cache.invalidate(1)  # a write committed while the value was being read
+    cache.set((1, "f", ()), "stale", generation)
+
+    assert cache.get((1, "f", ()), None) is None
+    cache.set((1, "f", ()), "fresh", cache.generation(1))
+    assert cache.get((1, "f", ())) == "fresh"
+
+
+def test_invalidating_one_scope_keeps_other_scopes_generations(cache):
+    home_2 = cache.generation(2)
+    cache.invalidate(1)
+    cache.set((2, "f", ()), "home 2", home_2)
+    assert cache.get((2, "f", ())) == "home 2"
+
+    home_2 = cache.generation(2)
+    cache.invalidate()  # a full invalidation covers every scope
+    cache.set((2, "f", ()), "stale", home_2)
+    assert cache.get((2, "f", ()), None) is None
+
+
+def test_cached_read_calls_through_once_until_invalidated(cache):
+    calls = []
+
+    @cached_read
+    def lookup(care_home_id, incident_id):
+        calls.append(incident_id)
+        return f"{care_home_id}:{incident_id}"
+
+    assert lookup(1, "A") == lookup(1, "A") == "1:A"
+    assert calls == ["A"]
+    cache.invalidate(1)
+    assert lookup(1, "A") == "1:A"
+    assert calls == ["A", "A"]
+    assert lookup.uncached(1, "A") == "1:A"
+
+
+def test_positional_keyword_and_default_calls_share_an_entry(cache):
+    calls = []
+
+    @cached_read
+    def page(care_home_id, status="open", limit=50):
+        calls.append((status, limit))
+        return len(calls)
+
+    assert page(1) == page(1, "open") == page(1, status="open", limit=50) == page(1, limit=50) == 1
+    assert page(1, limit=10) == 2
+    assert calls == [("open", 50), ("open", 10)]
+
+
+def test_cached_read_does_not_cache_a_read_raced_by_a_write(cache):
+    @cached_read
+    def lookup(care_home_id):
+        cache.invalidate(care_home_id)
+        return "stale"
+
+    lookup(1)
+    assert cache.stats()["size"] == 0
+
+
+def test_prime_respects_the_generation(cache):
+    @cached_read
+    def get_record(care_home_id, incident_id):
+        return "loaded"
+
+    generation = cache.generation(1)
+    cache.invalidate(1)
+    prime(get_record, 1, ("A",), "stale", generation)
+    assert cache.get((1, "get_record", ("A",)), None) is None
+
+    prime(get_record, 1, ("A",), "primed", cache.generation(1))
+    assert get_record(1, "A") == "primed"
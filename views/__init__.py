@@ -0,0 +1,48 @@
+# views/__init__.py
+"""
+The app's pages, one module each. A page's module is imported the first
+time a session opens it, so its libraries (pandas for tables and charts,
+reportlab for evidence packs) load only once someone needs them, and the
+sign-in page and report form start without them. Each module's
+render(user) draws the page; app.py calls it on every rerun.
+"""
+import importlib
+from typing import NamedTuple
+
+from auth import UserSession, can_view_diagnostics
+
+
+class Page(NamedTuple):
+    title: str
+    module: str  # views.<module>
+    roles: tuple[str, ...]
+
+
+PAGES = (
+    Page("Report a clinical / safety incident", "report", ("staff", "manager")),
+    Page("Inspection evidence & audit integrity", "inspection", ("manager",)),
+    Page("Search incident narratives", "narrative_search", ("manager",)),
+    Page("Incident analytics", "incident_analytics", ("manager",)),
+)
+
+# Not a role: DIAGNOSTICS_USERS lists who may open it (see auth.can_view_diagnostics).
+DIAGNOSTICS = Page("Diagnostics", "diagnostics", ())
+
+
+def pages_for(user: UserSession) -> list[Page]:
+    """The pages `user` may open, in navigation order."""
+    pages = [page for page in PAGES if user.role in page.roles]
+    if can_view_diagnostics(user):
+        pages.append(DIAGNOSTICS)
+    return pages
+
+
+MARKDOWN_SPECIAL = str.maketrans({c: "\\" + c for c in "\\`*_{}[]()#+-.!|<>$~"})
+
+
+def escape_markdown(text) -> str:
+    return str(text).translate(MARKDOWN_SPECIAL)
+
+
+def render(page: Page, user: UserSession) -> None:
+    importlib.import_module(f"views.{page.module}").render(user)
@@ -0,0 +1,54 @@
+# views/diagnostics.py
+"""Page: query statistics for this app process (DIAGNOSTICS_USERS only)."""
+import streamlit as st
+
+from auth import UserSession
+from database import get_query_metrics
+from write_queue import get_write_queue
+
+
+def render(user: UserSession) -> None:
+    st.title("🩺 Diagnostics")
+    st.caption(
+        "Query statistics for this app process, across all care homes. "
+        "Statements are shown with their values removed."
+    )
+    metrics = get_query_metrics()
+    get_write_queue()  # registers its stats with the metrics if no one has submitted yet
+    gauges = metrics.collect()
+
+    pool_stats = gauges.get("db_pool", {})
+    cache_stats = gauges.get("query_cache", {})
+    queue_stats = gauges.get("write_queue", {})
+    d1, d2, d3, d4 = st.columns(4)
+    d1.metric("Connections in use", f"{pool_stats.get('in_use', 0)} / {pool_stats.get('max', 0)}")
+    d2.metric("Pool waits", pool_stats.get("waits", 0), help=f"{pool_stats.get('timeouts', 0)} timed out")
+    d3.metric("Query cache hit ratio", f"{cache_stats.get('hit_ratio', 0.0):.0%}")
+    d4.metric("Submissions queued", queue_stats.get("pending", 0), help=f"{queue_stats.get('failed_rows', 0)} failed")
+
+    st.markdown("### Hottest statements")
+    st.dataframe(metrics.hottest_statements(), use_container_width=True, hide_index=True)
+
+    st.markdown("### Query time by page")
+    st.dataframe(metrics.by_page(), use_container_width=True, hide_index=True)
+
+    st.markdown(f"### Slow queries (over {metrics.slow_query_seconds * 1000:.0f} ms)")
+    slow = metrics.slow_queries()
+    if slow:
+        st.dataframe(slow, use_container_width=True, hide_index=True)
+    else:
+        st.info("No slow queries since the app started.")
+
+    c1, c2 = st.columns(2)
+    with c1:
+        st.download_button(
+            "Download Prometheus metrics",
+            data=metrics.prometheus_text,
+            file_name="metrics.txt",
+            mime="text/plain",
+            on_click="ignore",
+        )
+    with c2:
+        if st.button("Reset query statistics"):
+            metrics.reset()
+            st.rerun()
@@ -0,0 +1,66 @@
+# views/incident_analytics.py
+"""Page: incident trends from the daily rollups (managers)."""
+from datetime import date
+
+import streamlit as st
+
+import analytics
+from auth import UserSession
+
+
+def render(user: UserSession) -> None:
+    care_home_id = user.care_home_id
+
+    st.title("📈 Incident analytics")
+
+    st.markdown(
+        "Trends for **learning and service improvement**. Figures come from daily rollups "
+        "that are updated as incidents are submitted and reviewed."
+    )
+
+    today = date.today()
+    window = st.date_input(
+        "Incident date range",
+        value=(today.replace(year=today.year - 1, day=1), today),
+        format="YYYY-MM-DD",
+    )
+    if len(window) != 2:
+        st.info("Select a start and end date.")
+        st.stop()
+    date_from, date_to = window
+
+    totals = analytics.incident_totals(care_home_id, date_from, date_to)
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Incidents", f"{int(totals['incidents']):,}")
+    m2.metric("With harm / injury", f"{int(totals['harm_incidents']):,}")
+    m3.metric("Reviews completed", f"{int(totals['reviews_completed']):,}")
+    avg_hours = totals["average_review_hours"]
+    m4.metric("Average review turnaround", "–" if avg_hours is None else f"{avg_hours:.1f} h")
+
+    if not totals["incidents"]:
+        st.info("No clinical / safety incidents were recorded in this period.")
+        st.stop()
+
+    st.markdown("### Incidents per month by category")
+    by_category = analytics.monthly_counts_by_category(care_home_id, date_from, date_to)
+    category_choice = st.selectbox("Category", ["All categories"] + list(by_category.columns))
+    if category_choice == "All categories":
+        st.bar_chart(by_category)
+    else:
+        st.bar_chart(by_category[[category_choice]])
+
+    st.markdown("### Severity mix by location")
+    by_location = analytics.severity_by_location(care_home_id, date_from, date_to)
+    st.bar_chart(by_location.head(20), horizontal=True)
+    all_locations = st.expander("All locations", key="analytics_all_locations_open", on_change="rerun")
+    if all_locations.open:
+        with all_locations:
+            st.dataframe(by_location, use_container_width=True)
+
+    st.markdown("### Management review turnaround")
+    turnaround = analytics.monthly_review_turnaround(care_home_id, date_from, date_to)
+    if turnaround.empty or not turnaround["reviews_completed"].any():
+        st.info("No management reviews were completed for incidents in this period.")
+    else:
+        st.line_chart(turnaround[["average_review_hours"]])
+        st.dataframe(turnaround, use_container_width=True)
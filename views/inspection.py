@@ -0,0 +1,291 @@
+# views/inspection.py
+"""
+Page: inspection evidence & audit integrity (managers).
+
+Filters are applied together from a form, and the listing, review and
+export each sit in a tab that only runs while it is open: the export tab
+never fetches the listing, and an incident's details and audit trail are
+loaded only when their expander is opened.
+"""
+import tempfile
+from datetime import datetime
+
+import streamlit as st
+
+from audit_log import incident_history
+from auth import UserSession
+from incidents import (
+    SEVERITIES,
+    SIGNOFF_DECISIONS,
+    IncidentFilters,
+    ReviewConflict,
+    StoredIncident,
+    SyncedPage,
+    export_incidents_csv,
+    get_incident_record,
+    require_text,
+    sync_incidents_page,
+    update_management_review,
+)
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def _filter_form() -> tuple[IncidentFilters, int]:
+    # Filters (applied in SQL, see incidents.sync_incidents_page)
+    with st.form("inspection_filters_form", border=False):
+        f1, f2, f3, f4, f5 = st.columns([1, 1, 1, 2, 1])
+        with f1:
+            status_filter = st.selectbox("Management review status", ["All", "Pending", "Completed"], index=0)
+        with f2:
+            severity_filter = st.selectbox("Severity", ["All"] + SEVERITIES, index=0)
+        with f3:
+            date_range = st.date_input("Incident date range", value=(), format="YYYY-MM-DD")
+        with f4:
+            search_text = st.text_input("Search (resident, location, category, ID)")
+        with f5:
+            page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1)
+        st.form_submit_button("Apply filters")
+
+    filters = IncidentFilters(
+        status=None if status_filter == "All" else status_filter,
+        severity=None if severity_filter == "All" else severity_filter,
+        date_from=date_range[0] if len(date_range) > 0 else None,
+        date_to=date_range[1] if len(date_range) > 1 else None,
+        search=search_text.strip(),
+    )
+    return filters, page_size
+
+
+def _synced_page(care_home_id: int, filters: IncidentFilters, page_size: int) -> SyncedPage:
+    # Keyset pagination: one cursor per visited page, reset when the filters change.
+    if st.session_state.get("inspection_filters") != (filters, page_size):
+        st.session_state["inspection_filters"] = (filters, page_size)
+        st.session_state["inspection_cursors"] = [None]
+    cursors = st.session_state["inspection_cursors"]
+
+    # The session keeps its copy of the page; reruns fetch only incidents changed since.
+    synced_page = sync_incidents_page(
+        care_home_id, filters, after=cursors[-1], limit=page_size, page=st.session_state.get("inspection_page")
+    )
+    st.session_state["inspection_page"] = synced_page
+    return synced_page
+
+
+def _nothing_submitted(synced_page: SyncedPage) -> bool:
+    return not synced_page.rows and synced_page.filters == IncidentFilters() and synced_page.after is None
+
+
+def _listing(synced_page: SyncedPage) -> None:
+    if _nothing_submitted(synced_page):
+        st.info("No clinical / safety incidents have been submitted.")
+        return
+
+    cursors = st.session_state["inspection_cursors"]
+    st.markdown("### Clinical / safety incidents")
+    st.dataframe(synced_page.table(), use_container_width=True)
+
+    p1, p2, p3 = st.columns([1, 1, 4])
+    with p1:
+        if st.button("◀ Previous page", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with p2:
+        if st.button("Next page ▶", disabled=synced_page.next_cursor is None):
+            cursors.append(synced_page.next_cursor)
+            st.rerun()
+    with p3:
+        st.caption(f"Page {len(cursors)}")
+
+
+def _incident_label(stored: StoredIncident) -> str:
+    i = stored.incident
+    return f"{i.incident_id} · {i.incident_date} · {i.category} · {i.severity} · {i.management_review_status}"
+
+
+def _review(user: UserSession, synced_page: SyncedPage) -> None:
+    care_home_id = user.care_home_id
+    if _nothing_submitted(synced_page):
+        st.info("No clinical / safety incidents have been submitted.")
+        return
+
+    labels = {stored.incident.incident_id: _incident_label(stored) for _, stored in synced_page.rows.values()}
+    if not labels:
+        st.info("No incidents match the current filters.")
+        return
+
+    selected_id = st.selectbox(
+        "Select incident for management review (from the current page)", list(labels), format_func=labels.get
+    )
+
+    current = get_incident_record(care_home_id, selected_id)
+    if not current:
+        st.error("Selected incident could not be found.")
+        return
+
+    details = st.expander("View incident details", key="inspection_details_open", on_change="rerun")
+    if details.open:
+        with details:
+            st.json(current.to_record())
+
+    trail = st.expander("Audit trail", key="inspection_audit_trail_open", on_change="rerun")
+    if trail.open:
+        with trail:
+            events, chain_problems = incident_history(care_home_id, selected_id)
+            if chain_problems:
+                for problem in chain_problems:
+                    st.error(f"Audit chain broken: {problem}")
+            else:
+                st.caption("Hash chain intact: none of these events has been altered or removed.")
+            st.dataframe(events, use_container_width=True, hide_index=True)
+
+    if current.locked:
+        st.info(
+            f"Signed off and locked by {current.incident.management_reviewer_name} at "
+            f"{current.incident.signoff_timestamp}. Locked incidents can no longer be changed."
+        )
+        return
+
+    # The version this review started from, kept across reruns until it is saved,
+    # so a review saved by someone else in the meantime is detected.
+    review_versions = st.session_state.setdefault("review_versions", {})
+    base_version = review_versions.setdefault(selected_id, current.row_version)
+
+    with st.form("management_review_form"):
+        mr1, mr2 = st.columns(2)
+        with mr1:
+            reviewer_name = st.text_input("Reviewer name", value=current.incident.management_reviewer_name or "")
+        with mr2:
+            reviewer_role = st.text_input("Reviewer role", value=current.incident.management_reviewer_role or "")
+
+        review_outcome = st.text_area(
+            "Management review outcome",
+            value=current.incident.management_review_outcome or "",
+            height=120,
+            placeholder="Summary of review, findings, contributing factors, and required actions.",
+        )
+
+        signoff_decision = st.selectbox(
+            "Sign-off decision",
+            ["", *SIGNOFF_DECISIONS],
+            index=0,
+        )
+
+        evidence_ready = st.checkbox(
+            "Mark as suitable for inspection evidence (complete, reviewed, and signed off where appropriate).",
+            value=False,
+        )
+
+        complete_review = st.form_submit_button("Complete management review and sign-off")
+
+    if complete_review:
+        review_errors = []
+        if not require_text(reviewer_name):
+            review_errors.append("Reviewer name is required.")
+        if not require_text(reviewer_role):
+            review_errors.append("Reviewer role is required.")
+        if not require_text(review_outcome):
+            review_errors.append("Management review outcome is required.")
+        if not require_text(signoff_decision):
+            review_errors.append("A sign-off decision is required.")
+
+        if review_errors:
+            for e in review_errors:
+                st.error(e)
+        else:
+            ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            status = "Completed"  # evidence_ready currently just a checkbox, status remains Completed either way
+
+            # ✅ UPDATE IN POSTGRES (only if nobody else reviewed it meanwhile)
+            try:
+                update_management_review(
+                    care_home_id=care_home_id,
+                    incident_id=selected_id,
+                    expected_version=base_version,
+                    reviewer_name=reviewer_name.strip(),
+                    reviewer_role=reviewer_role.strip(),
+                    review_outcome=review_outcome.strip(),
+                    signoff_decision=signoff_decision,
+                    signoff_timestamp=ts,
+                    management_review_status=status,
+                    actor=user.username,
+                )
+            except ReviewConflict as e:
+                review_versions.pop(selected_id, None)
+                st.error(str(e))
+            else:
+                review_versions.pop(selected_id, None)
+                st.success("Management review and sign-off completed.")
+                st.rerun()
+
+
+def _export(care_home_id: int, filters: IncidentFilters) -> None:
+    st.caption("The export includes every incident matching the filters above, not just the current page.")
+
+    def build_export_file():
+        # Runs only when the download is requested; rows stream from
+        # Postgres to a temporary file rather than being held in memory.
+        export_file = tempfile.TemporaryFile()
+        export_incidents_csv(care_home_id, export_file, filters)
+        export_file.seek(0)
+        return export_file
+
+    st.download_button(
+        "Download incident dataset (CSV)",
+        data=build_export_file,
+        file_name=f"clinical_safety_incidents_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv",
+        on_click="ignore",
+    )
+
+    st.markdown("#### Evidence pack (PDF)")
+    if not (filters.date_from and filters.date_to):
+        st.caption("Choose an incident date range above to build a PDF evidence pack of signed-off incidents.")
+    else:
+        st.caption(
+            f"Every signed-off incident dated {filters.date_from} to {filters.date_to}, one PDF each, "
+            "with an index. Incidents rendered for an earlier pack are reused."
+        )
+
+        def build_pack_file():
+            # reportlab is only loaded once someone builds a pack.
+            from evidence_pack import build_evidence_pack
+
+            pack_file = tempfile.TemporaryFile()
+            build_evidence_pack(care_home_id, filters.date_from, filters.date_to, pack_file)
+            pack_file.seek(0)
+            return pack_file
+
+        st.download_button(
+            "Download evidence pack (ZIP of PDFs)",
+            data=build_pack_file,
+            file_name=f"evidence_pack_{filters.date_from}_{filters.date_to}.zip",
+            mime="application/zip",
+            on_click="ignore",
+        )
+
+
+def render(user: UserSession) -> None:
+    st.title("🧾 Inspection evidence & audit integrity")
+
+    st.markdown(
+        "This section supports **inspection evidence**, **audit integrity**, and **management review and sign-off**. "
+        "Use the filters below to find incidents requiring review."
+    )
+
+    filters, page_size = _filter_form()
+
+    listing_tab, review_tab, export_tab = st.tabs(
+        ["Clinical / safety incidents", "✅ Management review and sign-off", "Export for inspection evidence"],
+        key="inspection_tab",
+        on_change="rerun",
+    )
+    if listing_tab.open:
+        with listing_tab:
+            _listing(_synced_page(user.care_home_id, filters, page_size))
+    elif review_tab.open:
+        with review_tab:
+            _review(user, _synced_page(user.care_home_id, filters, page_size))
+    elif export_tab.open:
+        with export_tab:
+            _export(user.care_home_id, filters)
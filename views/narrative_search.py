@@ -0,0 +1,57 @@
+# views/narrative_search.py
+"""Page: full-text search of incident narratives (managers)."""
+import streamlit as st
+
+from auth import UserSession
+from incidents import HIGHLIGHT_START, HIGHLIGHT_STOP, search_incident_narratives
+from views import escape_markdown
+
+
+def highlighted_markdown(snippet: str) -> str:
+    """Escapes a search snippet and bolds the words ts_headline marked."""
+    return escape_markdown(snippet).replace(HIGHLIGHT_START, "**").replace(HIGHLIGHT_STOP, "**")
+
+
+def render(user: UserSession) -> None:
+    care_home_id = user.care_home_id
+
+    st.title("🔎 Search incident narratives")
+
+    st.markdown(
+        "Searches the **incident account**, **harm / injury details**, **immediate actions** and "
+        "**immediate learning** of every incident. Use quotes for a phrase (\"bed rails\"), "
+        "`or` for alternatives and `-` to exclude a word (fall -bathroom)."
+    )
+
+    query = st.text_input("Search narratives", placeholder='e.g. "bed rails" or wrong dose').strip()
+    if st.session_state.get("narrative_query") != query:
+        st.session_state["narrative_query"] = query
+        st.session_state["narrative_page"] = 0
+    results_page = st.session_state["narrative_page"]
+
+    if not query:
+        st.info("Enter words or a phrase to search for.")
+    else:
+        results, has_more = search_incident_narratives(care_home_id, query, page=results_page)
+        if results.empty:
+            st.info("No incidents match this search.")
+        for hit in results.to_dict("records"):
+            st.markdown(
+                f"**{escape_markdown(hit['Incident ID'])}** · {hit['Incident date']} · "
+                f"{escape_markdown(hit['Category'])} · {escape_markdown(hit['Severity'])} · "
+                f"{escape_markdown(hit['Resident identifier'])} · review {escape_markdown(hit['Management review status'])}"
+            )
+            st.markdown(highlighted_markdown(hit["Snippet"]))
+            st.markdown("---")
+
+        s1, s2, s3 = st.columns([1, 1, 4])
+        with s1:
+            if st.button("◀ Previous results", disabled=results_page == 0):
+                st.session_state["narrative_page"] -= 1
+                st.rerun()
+        with s2:
+            if st.button("More results ▶", disabled=not has_more):
+                st.session_state["narrative_page"] += 1
+                st.rerun()
+        with s3:
+            st.caption(f"Page {results_page + 1}. Best matches among the most recent matching incidents.")
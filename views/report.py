@@ -0,0 +1,175 @@
+# views/report.py
+"""Page: report a clinical / safety incident (staff and managers)."""
+from datetime import date, datetime, time
+
+import streamlit as st
+
+from auth import UserSession
+from database import TRANSIENT_ERRORS
+from duplicates import PossibleDuplicate, find_possible_duplicates
+from incidents import INCIDENT_CATEGORIES, SEVERITIES, Incident, generate_incident_id, validate_incident
+from views import escape_markdown
+from write_queue import get_write_queue
+
+
+def possible_duplicates(care_home_id: int, record: dict) -> list[PossibleDuplicate]:
+    # Reporting never waits for Postgres (see write_queue.py): while it is unreachable, skip the check.
+    try:
+        return find_possible_duplicates(care_home_id, Incident.from_record(record))
+    except TRANSIENT_ERRORS:
+        return []
+
+
+def render(user: UserSession) -> None:
+    care_home_id = user.care_home_id
+
+    st.title("🧾 Clinical / Safety Incident Reporting")
+
+    st.markdown(
+        "Use this form to report a **clinical / safety incident** in a clear, factual manner. "
+        "The aim is **resident safety**, **audit integrity**, and appropriate **management review and sign-off**."
+    )
+
+    with st.form("incident_form"):
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            incident_date = st.date_input("Date of incident", value=date.today())
+        with c2:
+            incident_time = st.time_input("Time of incident", value=time(12, 0))
+        with c3:
+            incident_category = st.selectbox("Incident category", INCIDENT_CATEGORIES)
+
+        location = st.text_input("Location (e.g. Room 12, Lounge)")
+
+        st.markdown("### Resident details")
+        r1, r2, r3 = st.columns([2, 1, 1])
+        with r1:
+            resident_identifier = st.text_input("Resident name / identifier")
+        with r2:
+            resident_dob = st.date_input("Date of birth")
+        with r3:
+            resident_room = st.text_input("Room number (if applicable)")
+
+        st.markdown("### Incident account (factual)")
+        incident_account = st.text_area(
+            "What happened?",
+            height=160,
+            placeholder="Provide a clear, factual account of events in chronological order.",
+        )
+
+        immediate_actions = st.text_area(
+            "Immediate actions taken",
+            height=120,
+            placeholder="First aid, observations, escalation, medical review requested, environment made safe, etc.",
+        )
+
+        st.markdown("### Harm / injury")
+        harm_occurred = st.radio("Was harm or injury sustained?", ["No", "Yes"], horizontal=True)
+        if harm_occurred == "Yes":
+            harm_details = st.text_area(
+                "Harm / injury details and care provided",
+                height=110,
+                placeholder="Describe injuries, observations, treatment, and any onward referral.",
+            )
+        else:
+            harm_details = "No harm or injury sustained"
+
+        st.markdown("### Escalation and notifications")
+        informed = st.multiselect(
+            "Individuals / services informed",
+            [
+                "Nurse in charge",
+                "Registered manager",
+                "GP",
+                "Family / next of kin",
+                "Safeguarding team",
+                "Emergency services",
+                "Other professional (specify in free text)",
+            ],
+        )
+
+        severity = st.selectbox("Severity classification", SEVERITIES)
+
+        st.markdown("---")
+        st.subheader("✍️ Incident reported by")
+        reported_by_name = st.text_input("Name", placeholder="Full name")
+        reported_by_role = st.text_input("Role", placeholder="Job title / role")
+
+        st.markdown("### Immediate learning / actions to reduce recurrence (optional)")
+        learning_actions = st.text_area(
+            "Learning / actions",
+            height=100,
+            placeholder="If known: contributing factors, immediate learning, and practical actions taken.",
+        )
+
+        st.markdown("---")
+        st.subheader("🧾 Audit integrity confirmation")
+        audit_statement = st.checkbox(
+            "I confirm this incident account is accurate to the best of my knowledge and recorded in good faith.",
+            value=False,
+        )
+
+        submitted = st.form_submit_button("Submit clinical / safety incident")
+
+    if submitted:
+        record = {
+            "Incident ID": generate_incident_id(),
+            "Incident date": str(incident_date),
+            "Incident time": str(incident_time),
+            "Category": incident_category,
+            "Location": location.strip(),
+            "Resident identifier": resident_identifier.strip(),
+            "Date of birth": str(resident_dob),
+            "Room": resident_room.strip(),
+            "Incident account": incident_account.strip(),
+            "Immediate actions taken": immediate_actions.strip(),
+            "Harm / injury sustained": harm_occurred,
+            "Harm / injury details": harm_details.strip() if isinstance(harm_details, str) else str(harm_details),
+            "Individuals / services informed": ", ".join(informed),
+            "Severity": severity,
+            "Reported by (name)": reported_by_name.strip(),
+            "Reported by (role)": reported_by_role.strip(),
+            "Immediate learning / actions": learning_actions.strip(),
+            "Audit integrity confirmation": "Confirmed" if audit_statement else "",
+            "Submitted timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            # Management fields start blank until sign-off:
+            "Management review status": "Pending",
+            "Management reviewer (name)": "",
+            "Management reviewer (role)": "",
+            "Management review outcome": "",
+            "Sign-off decision": "",
+            "Sign-off timestamp": "",
+        }
+
+        # Same rules as the bulk importer (incidents.validate_incident)
+        errors = validate_incident(record)
+
+        if errors:
+            for e in errors:
+                st.error(e)
+        else:
+            # A report resembling a stored incident (duplicates.py) is held back once so the
+            # reporter can check it; submitting the same report again records it.
+            duplicates = possible_duplicates(care_home_id, record)
+            held = (record["Resident identifier"], record["Incident date"], record["Incident account"])
+            if duplicates and st.session_state.get("duplicate_warning_for") != held:
+                st.session_state["duplicate_warning_for"] = held
+                st.warning("This incident may already have been reported:")
+                for duplicate in duplicates:
+                    st.markdown(f"- {escape_markdown(duplicate.summary())}")
+                st.caption("If this is a separate incident, submit the form again to record it.")
+                return
+            st.session_state.pop("duplicate_warning_for", None)
+
+            # ✅ SAVE: queued on local disk, written to Postgres in the background (write_queue.py)
+            write_queue = get_write_queue()
+            write_queue.enqueue(care_home_id, record)
+
+            st.success("Clinical / safety incident submitted. Management review and sign-off can now be completed.")
+            if write_queue.last_error:
+                st.info(
+                    "The incident database is not reachable at the moment. This submission is saved "
+                    "and will be stored automatically as soon as the database is back."
+                )
+            with st.expander("View submitted incident (for verification)"):
+                st.json(record)
@@ -0,0 +1,222 @@
+# write_queue.py
+"""
+Durable local queue for incident submissions.
+
+The report form appends each submission to a SQLite spool on local disk
+and returns immediately; a background thread drains the spool into
+Postgres in batches. Each batch is deleted from the spool only after its
+INSERT has committed. Inserts skip incident IDs the care home already has,
+so a batch retried after an uncertain commit is never stored twice.
+Submissions made while Postgres is unreachable wait in the spool, across
+app restarts, until it comes back.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import psycopg2
+import streamlit as st
+
+from database import TRANSIENT_ERRORS, get_connection, get_query_metrics, get_setting
+from incidents import Incident, insert_incidents
+from query_cache import QueryCache, get_query_cache
+
+logger = logging.getLogger(__name__)
+
+SPOOL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    care_home_id INTEGER NOT NULL,
+    incident_id TEXT NOT NULL,
+    record TEXT NOT NULL,
+    enqueued_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS failed (
+    seq INTEGER PRIMARY KEY,
+    care_home_id INTEGER NOT NULL,
+    incident_id TEXT NOT NULL,
+    record TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    failed_at REAL NOT NULL,
+    error TEXT NOT NULL
+);
+"""
+
+
+class WriteQueue:
+    """
+    SQLite-backed FIFO of (care home, incident record) with one drain thread.
+    Rows that Postgres rejects outright (bad data, not an outage) are moved
+    to the `failed` table instead of blocking the queue.
+    """
+
+    def __init__(self, path: str, cache: QueryCache | None = None, batch_size: int = 200, max_backoff: float = 30.0):
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.executescript(SPOOL_SCHEMA)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._cache = cache
+        self._batch_size = batch_size
+        self._max_backoff = max_backoff
+        self._stats = {"enqueued": 0, "written": 0, "already_stored": 0, "failed": 0, "retries": 0}
+        self._last_error = None
+        self._thread = None
+
+    # ---------------------------
+    # Producer side (Streamlit threads)
+    # ---------------------------
+    def enqueue(self, care_home_id: int, record: dict) -> None:
+        """Durably records a submission. Returns once it is on disk."""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO pending (care_home_id, incident_id, record, enqueued_at) VALUES (?, ?, ?, ?)",
+                (care_home_id, record["Incident ID"], json.dumps(record, default=str), time.time()),
+            )
+            self._stats["enqueued"] += 1
+        self._wake.set()
+
+    def pending_count(self, care_home_id: int | None = None) -> int:
+        with self._lock:
+            if care_home_id is None:
+                return self._db.execute("SELECT count(*) FROM pending").fetchone()[0]
+            return self._db.execute(
+                "SELECT count(*) FROM pending WHERE care_home_id = ?", (care_home_id,)
+            ).fetchone()[0]
+
+    @property
+    def last_error(self) -> str | None:
+        """Why the last drain attempt failed, or None once the queue is draining again."""
+        return self._last_error
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending, oldest = self._db.execute("SELECT count(*), min(enqueued_at) FROM pending").fetchone()
+            failed = self._db.execute("SELECT count(*) FROM failed").fetchone()[0]
+            return {
+                "pending": pending,
+                "oldest_pending_seconds": time.time() - oldest if oldest else 0.0,
+                "failed_rows": failed,
+                "last_error": self._last_error,
+                **self._stats,
+            }
+
+    # ---------------------------
+    # Drain thread
+    # ---------------------------
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="incident-write-queue", daemon=True)
+            self._thread.start()
+
+    def _next_batch(self) -> list[tuple]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT seq, care_home_id, record FROM pending ORDER BY seq LIMIT ?", (self._batch_size,)
+            ).fetchall()
+
+    def _remove(self, seqs: list[int]) -> None:
+        with self._lock:
+            self._db.execute(f"DELETE FROM pending WHERE seq IN ({', '.join('?' * len(seqs))})", seqs)
+
+    def _mark_failed(self, seq: int, error: str) -> None:
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.execute(
+                """
+                INSERT INTO failed (seq, care_home_id, incident_id, record, enqueued_at, failed_at, error)
+                SELECT seq, care_home_id, incident_id, record, enqueued_at, ?, ? FROM pending WHERE seq = ?
+                """,
+                (time.time(), error, seq),
+            )
+            self._db.execute("DELETE FROM pending WHERE seq = ?", (seq,))
+            self._db.execute("COMMIT")
+            self._stats["failed"] += 1
+
+    def _write(self, care_home_id: int, incidents: list[Incident]) -> int:
+        with get_connection(timeout=5.0) as conn, conn.cursor() as cur:
+            inserted = insert_incidents(cur, care_home_id, incidents, skip_existing=True)
+        if self._cache is not None:
+            self._cache.invalidate(care_home_id)
+        self._stats["written"] += len(inserted)
+        self._stats["already_stored"] += len(incidents) - len(inserted)
+        return len(inserted)
+
+    def drain_once(self) -> int:
+        """
+        Writes the next batch, one INSERT per care home. Returns the number
+        of spool rows handled; raises on a transient database error.
+        """
+        batch = self._next_batch()
+        by_home = {}
+        for seq, care_home_id, record in batch:
+            try:
+                incident = Incident.from_record(json.loads(record))
+            except ValueError as exc:
+                logger.error("Queued incident %s cannot be read: %s", seq, exc)
+                self._mark_failed(seq, str(exc))
+                continue
+            by_home.setdefault(care_home_id, []).append((seq, incident))
+
+        for care_home_id, items in by_home.items():
+            try:
+                self._write(care_home_id, [incident for _, incident in items])
+            except TRANSIENT_ERRORS:
+                raise
+            except psycopg2.Error:
+                # Find the offending rows one at a time; the rest still go in.
+                for seq, incident in items:
+                    try:
+                        self._write(care_home_id, [incident])
+                    except TRANSIENT_ERRORS:
+                        raise
+                    except psycopg2.Error as exc:
+                        logger.error("Incident %s rejected by the database: %s", incident.incident_id, exc)
+                        self._mark_failed(seq, str(exc).strip())
+                    else:
+                        self._remove([seq])
+                continue
+            self._remove([seq for seq, _ in items])
+        return len(batch)
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                # Cleared before draining, so a submission made mid-drain wakes the next round.
+                self._wake.clear()
+                while self.drain_once():
+                    pass
+                self._last_error = None
+                backoff = 1.0
+                self._wake.wait(timeout=5.0)
+            except TRANSIENT_ERRORS as exc:
+                self._last_error = str(exc).strip() or type(exc).__name__
+                self._stats["retries"] += 1
+                logger.warning("Incident write queue cannot reach Postgres; retrying in %.0fs", backoff)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self._max_backoff)
+            except Exception:
+                logger.exception("Incident write queue drain failed; retrying")
+                time.sleep(backoff)
+
+
+@st.cache_resource
+def get_write_queue() -> WriteQueue:
+    """
+    Returns the process-wide write queue and starts its drain thread. The
+    spool lives at WRITE_QUEUE_PATH (default .write_queue.sqlite3 next to
+    the app); each app replica needs its own.
+    """
+    path = get_setting(
+        "WRITE_QUEUE_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".write_queue.sqlite3"),
+    )
+    queue = WriteQueue(path, cache=get_query_cache())
+    queue.start()
+    get_query_metrics().register_collector("write_queue", queue.stats)
+    return queue